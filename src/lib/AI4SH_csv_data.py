@@ -13,9 +13,19 @@ Updated 27 Nov 2025 - cleaned code using GitHub Copilot
 from copy import deepcopy
 
 # Package application imports
-from src.lib import Coordinates_fix, Data_read
+from src.lib import Data_read
 
-from .common import common_json_db
+from .common import common_json_db, INDICATOR_D
+
+from .json_sink import json_sink
+
+from .build_manifest import Set_build_manifest
+
+from .coordinate_store import Set_coordinate_store
+
+from .row_workers import Loop_csv_rows, Close_outputs
+
+from .spectra_block import Numeric_column_row_blocks
 
 # Default variables
 AI4SH_Key_L = ["pilot_site",
@@ -35,6 +45,138 @@ AI4SH_Key_L = ["pilot_site",
 
 SINGLE_METHOD_INSTRUMENTS = ['digit-soil-sear','slakes','soil-cylinder-drying@105c','microbiometer','single-ring-infiltration']
 
+# Instrument and method metadata set per indicator, see ai4sh_row_plan
+INSTRUMENT_METHOD_ITEM_L = ['procedure','analysis_method__name','instrument_brand__name','instrument_model__name','instrument_id']
+
+class ai4sh_row_plan:
+    """
+    @class ai4sh_row_plan
+    @brief Compiled plan of the rows of an AI4SH csv data file, built once per file.
+
+    @details
+    All structures that only depend on the column header, the method definition and the process parameters are
+    the same for all rows of the file. The plan sets them once, each row then only fills in its values:
+    - indicator_in_L: the observation columns as they appear in the csv file.
+    - indicator_L: the standardized indicator names, in the same order.
+    - indicator_D: maps the indicator names to the csv header names.
+    - indicator_method_D: maps the indicator names to the method columns.
+    - column_index_L: the index of the csv column of each indicator (see Numeric_column_row_blocks).
+    - unit_D and name_D: the unit and the parameter name of each indicator.
+    - metadata_D: {item: {indicator: value}} for the items in INSTRUMENT_METHOD_ITEM_L.
+    - observation_key_L: (indicator, indicator__name, method name) of each observation.
+    - method_name_L: the method names of the equipment -> method skeleton (see _Equipment_method_skeleton).
+    """
+
+    def __init__(self, json_db_C):
+        """
+        @brief Constructor for the ai4sh_row_plan class, compiles the plan from a json_db instance.
+
+        @param json_db_C json_db instance with the column header set and the parameter dictionaries distilled.
+
+        @return None
+        """
+
+        self.equipment = json_db_C.process_parameters.procedure
+
+        column_index_D = {column: i for i, column in enumerate(json_db_C.column_L)}
+
+        self.indicator_in_L = list(json_db_C.equipment_D.keys())
+
+        self.indicator_L = [json_db_C.parameter_D[key] for key in self.indicator_in_L]
+
+        self.indicator_D = dict(zip(self.indicator_L, self.indicator_in_L))
+
+        self.method_L = list(json_db_C.method_D.keys())
+
+        self.indicator_method_D = dict(zip(self.indicator_L, self.method_L))
+
+        self.column_index_L = [column_index_D[key] for key in self.indicator_in_L]
+
+        self.unit_D = {json_db_C.parameter_D[key]: json_db_C.unit_D[key] for key in self.indicator_in_L}
+
+        self.name_D = {json_db_C.parameter_D[key]: json_db_C.parameter_D[key] for key in self.indicator_in_L}
+
+        self.method_name_L = list(dict.fromkeys(json_db_C.method_D.values()))
+
+        self.observation_key_L = [(ind, '%s_%s' %(self.equipment, INDICATOR_D[ind]), json_db_C.method_D[self.indicator_method_D[ind]])
+                                  for ind in self.indicator_L]
+
+        self.metadata_D = {item: {} for item in INSTRUMENT_METHOD_ITEM_L}
+
+        for ind in self.indicator_L:
+
+            for item in INSTRUMENT_METHOD_ITEM_L:
+
+                self.metadata_D[item][ind] = self._Instrument_method_item(json_db_C, ind, item)
+
+    def _Instrument_method_item(self, json_db_C, ind, item):
+        """
+        @brief Returns the instrument or method metadata of an indicator.
+
+        @details
+        Single method instruments (SINGLE_METHOD_INSTRUMENTS) take the metadata from the process parameters, other
+        instruments from the method definition. Values set to 'unknown' or 'null' are replaced by the process
+        parameter of the same name, if given.
+
+        @param json_db_C json_db instance with the distilled parameter dictionaries.
+        @param ind The indicator name.
+        @param item One of INSTRUMENT_METHOD_ITEM_L.
+
+        @return The metadata value, None if not defined.
+        """
+
+        process_parameters = json_db_C.process_parameters
+
+        try:
+
+            if item == 'procedure':
+
+                value = process_parameters.procedure
+
+            elif process_parameters.procedure in SINGLE_METHOD_INSTRUMENTS:
+
+                if item == 'analysis_method__name':
+
+                    value = process_parameters.procedure
+
+                else:
+
+                    value = getattr(process_parameters, item)
+
+            elif item in ['analysis_method__name', 'instrument_brand__name']:
+
+                value = '%s-%s' %(json_db_C.method_D[self.indicator_D[ind]], ind)
+
+            elif item == 'instrument_model__name':
+
+                value = json_db_C.equipment_model_D[self.indicator_D[ind]]
+
+            else:
+
+                value = json_db_C.equipment_id_D[self.indicator_D[ind]]
+
+        except (KeyError, AttributeError):
+
+            # The item is not defined for the indicator or in the process parameters
+            value = None
+
+        if value is not None and value.lower() in ['unknown', 'null']:
+
+            if item in json_db_C.process_parameters_D:
+
+                value = json_db_C.process_parameters_D[item]
+
+        return value
+
+    def _Equipment_method_skeleton(self):
+        """
+        @brief Returns a new equipment -> method dictionary with empty observation lists, filled in for each row.
+
+        @return Dictionary {equipment: {method name: []}}.
+        """
+
+        return {self.equipment: {method: [] for method in self.method_name_L}}
+
 def Parameters_fix(project_FP,method_src_FPN):
     """
     @brief Extracts parameter, unit, method, and equipment dictionaries from a method definition CSV file.
@@ -172,7 +314,7 @@ class json_db(common_json_db):
     @see Process_ai4sh_csv() for the main processing workflow using this class
     """
 
-    def __init__(self, project_FP,process, coordinate_D):
+    def __init__(self, project_FP,process, coordinate_C):
         """
     @brief Constructor for the json_db class that initializes AI4SH-specific JSON database processing.
 
@@ -194,14 +336,14 @@ class json_db(common_json_db):
     @param process (object): Object containing process parameters and configuration settings, expected to have
                            a 'parameters' attribute with processing-specific settings like procedure type,
                            file paths, and analysis parameters.
-    @param coordinate_D (dict): Dictionary containing coordinate and location data for sample points,
-                              typically loaded from a separate CSV file containing point names, positions,
+    @param coordinate_C (coordinate_store): Indexed store of the coordinate and location data for sample points,
+                              loaded from a separate CSV file containing point names, positions,
                               sample dates, and geographic coordinates.
 
     @return None: Constructor does not return a value but initializes the instance with inherited attributes
                  from common_json_db including process parameters, coordinate data, and base functionality.
 
-    @note This constructor must be called with valid coordinate data already loaded. The coordinate_D
+    @note This constructor must be called with valid coordinate data already loaded. The coordinate_C
           parameter should contain all necessary location and timing information for the sample points
           being processed.
 
@@ -209,10 +351,10 @@ class json_db(common_json_db):
                or missing required data structures.
 
     @see common_json_db.__init__() for the actual initialization implementation.
-    @see Coordinates_fix() for loading coordinate data from CSV files.
+    @see Set_coordinate_store() for loading coordinate data from CSV files.
     """
 
-        common_json_db.__init__(self, project_FP,process, coordinate_D)
+        common_json_db.__init__(self, project_FP,process, coordinate_C)
 
     def _Distill_parameters(self, dict_D, parameter_id):
         """
@@ -325,7 +467,7 @@ class json_db(common_json_db):
 
         return [item.lower() if isinstance(item, str) else item for item in data_row]
 
-    def _Row_data_to_dict(self, row_data):
+    def _Row_data_to_dict(self, row_data, value_L):
         """
     @brief Converts a row of data into a dictionary using column headers as keys and adds default parameters.
 
@@ -338,6 +480,8 @@ class json_db(common_json_db):
 
     @param row_data (list): List of values representing a single row of data from the CSV file.
                            The length should match the number of columns in self.column_L.
+    @param value_L (tuple): The indicator values (float or None) of the row in the order of self.indicator_L,
+                           parsed by Numeric_column_row_blocks.
 
     @return None: The function modifies the instance by creating self.record_D dictionary.
                  Does not return a value but stores the result in the instance attribute.
@@ -360,6 +504,9 @@ class json_db(common_json_db):
 
         self.record_D['n_repetitions'] = 1
 
+        # The indicator values of the row converted to float for the complete block of rows, see _Set_row_plan
+        self.indicator_value_L = value_L
+
     def _Rearrange_row_data_2_record(self):
         """
         @brief Restructures row data dictionary into a hierarchical record format for observation processing.
@@ -368,12 +515,12 @@ class json_db(common_json_db):
         This method transforms the flat row data dictionary (created by _Row_data_to_dict) into a hierarchical 
         structure suitable for AI4SH JSON format. It performs the following operations:
         - Creates nested dictionaries for observation data (value, standard_deviation, units, etc.).
-        - Processes numerical values from CSV, handling decimal comma notation by converting to dot notation.
-        - Converts numeric strings to float values, setting None for invalid conversions.
+        - Sets the numerical values of the row, converted to float per block of rows by Numeric_column_row_blocks
+          (decimal comma notation converted to dot notation, None for invalid conversions).
         - Maps observation data to standardized parameter names and units.
         - Normalizes location identifiers (pilot_country, pilot_site, sample_id, point_id).
-        - Sets instrument and method metadata for each observation indicator.
-        - Applies fallback values from process parameters when equipment data is unknown.
+        - Sets instrument and method metadata for each observation indicator, copied from the compiled row plan
+          (fallback values from process parameters when equipment data is unknown are applied in the plan).
 
         The function creates the following hierarchical structure in self.record_D:
         - 'value': Dictionary mapping indicators to numerical measurement values
@@ -391,141 +538,42 @@ class json_db(common_json_db):
         @note This function must be called after:
             - _Row_data_to_dict() has created the initial record dictionary
             - _Distill_parameters() has populated the parameter mapping dictionaries
-            - _Set_equipment_method() has created the indicator mapping structures
-            
-            The function handles European decimal notation (comma) by converting to standard dot notation.
-
-        @exception Does not raise exceptions but handles ValueError and TypeError when converting strings to float,
-                setting problematic values to None. Handles KeyError when accessing dictionary mappings,
-                setting missing values to None.
+            - _Set_row_plan() has compiled the indicator mapping structures and metadata
 
         @see _Row_data_to_dict() for creating the initial record dictionary structure.
         @see _Distill_parameters() for setting up parameter mapping dictionaries.
-        @see _Set_equipment_method() for creating indicator mapping structures.
-        
-        @warning This function assumes that self.indicator_L, self.indicator_D, and related mapping dictionaries
-                have been properly initialized. Missing mappings will result in KeyError exceptions.
+        @see ai4sh_row_plan for the indicator mapping structures and metadata.
         """
 
-        self.record_D['value'] = {}
-
-        self.record_D['standard_deviation'] = {}
-
-        self.record_D['unit__name'] = {}
-
-        self.record_D['indicator__name'] = {}
-
-        self.record_D['procedure'] = {}
-
-        self.record_D['analysis_method__name'] = {}
-
-        self.record_D['instrument_brand__name'] = {}
-
-        self.record_D['instrument_model__name'] = {}; 
-
-        self.record_D['instrument_id'] = {}
-
-        for ind in self.indicator_L:
-
-            if ',' in self.record_D[self.indicator_D[ind]]:
-                                    
-                self.record_D[self.indicator_D[ind] ] = self.record_D[self.indicator_D[ind]].replace(',','.')
-                          
-            try:
-
-                self.record_D['value'][ind] = float(self.record_D[self.indicator_D[ind]])
+        row_plan_C = self.row_plan_C
 
-            except (ValueError, TypeError):
+        # The values are converted to float (None if not a number) per block of rows, see Numeric_column_row_blocks
+        self.record_D['value'] = dict(zip(row_plan_C.indicator_L, self.indicator_value_L))
 
-                self.record_D['value'][ind] = None
+        self.record_D['standard_deviation'] = dict.fromkeys(row_plan_C.indicator_L)
 
-            self.record_D['standard_deviation'][ind] = None
+        # The units and indicator names are the same for all rows, see ai4sh_row_plan
+        self.record_D['unit__name'] = dict(row_plan_C.unit_D)
 
-            self.record_D['unit__name'][ind] = self.unit_D[self.indicator_D[ind]]
+        self.record_D['indicator__name'] = dict(row_plan_C.name_D)
 
-            self.record_D['indicator__name'][ind] = self.parameter_D[self.indicator_D[ind]]
+        if 'pilot_country' in self.record_D:
 
-            if 'pilot_country' in self.record_D:
+            # Convert pilot_country, pilot_site and sample_id to lower case and replace spaces with '-'
+            self.record_D['pilot_country'] = self.record_D['pilot_country'].lower().replace(' ','-')
 
-                # Convert pilot_country, pilot_site and sample_id to lower case and replace spaces with '-'
-                self.record_D['pilot_country'] = self.record_D['pilot_country'].lower().replace(' ','-')
-
-            if 'pilot_site' in self.record_D:
-                
-                self.record_D['pilot_site'] = self.record_D['pilot_site'].lower().replace(' ','-')
+        if 'pilot_site' in self.record_D:
             
-            if not 'point_id' in self.record_D:
-                
-                self.record_D['point_id'] = self.record_D['sample_id'].lower().replace(' ','-')
-
-            for item in ['procedure','analysis_method__name','instrument_brand__name','instrument_model__name','instrument_id']:
-                
-                if self.process_parameters.procedure in SINGLE_METHOD_INSTRUMENTS:
-                    try:
-
-                        if item == 'procedure':
-
-                            self.record_D[item][ind] = self.process_parameters.procedure
-
-                        if item == 'analysis_method__name':
-
-                            self.record_D[item][ind] = self.process_parameters.procedure
-                    
-                        elif item == 'instrument_brand__name':
-
-                            self.record_D[item][ind] = self.process_parameters.instrument_brand__name
-                    
-                        elif item == 'instrument_model__name':
-
-                            self.record_D[item][ind] = self.process_parameters.instrument_model__name
-                        
-                        elif item == 'instrument_id':
-
-                            self.record_D[item][ind] = self.process_parameters.instrument_id
-
-                    except KeyError:
-
-                        self.record_D[item][ind] = None
-
-                    if self.record_D[item][ind].lower() in ['unknown', 'null']:
-
-                        if item in self.process_parameters_D:
-                                
-                            self.record_D[item][ind] = self.process_parameters_D[item]
-
-                else:
-
-                    try:
-
-                        if item == 'procedure':
-
-                            self.record_D[item][ind] = self.process_parameters.procedure
-
-                        if item == 'analysis_method__name':
-
-                            self.record_D[item][ind] = '%s-%s' %(self.method_D[self.indicator_D[ind]],ind)
-                    
-                        elif item == 'instrument_brand__name':
-
-                            self.record_D[item][ind] = '%s-%s' %(self.method_D[self.indicator_D[ind]],ind)
-                    
-                        elif item == 'instrument_model__name':
-
-                            self.record_D[item][ind] = self.equipment_model_D[self.indicator_D[ind]]
-                        
-                        elif item == 'instrument_id':
-
-                            self.record_D[item][ind] = self.equipment_id_D[self.indicator_D[ind]]
-
-                    except KeyError:
-
-                        self.record_D[item][ind] = None
+            self.record_D['pilot_site'] = self.record_D['pilot_site'].lower().replace(' ','-')
+        
+        if not 'point_id' in self.record_D:
+            
+            self.record_D['point_id'] = self.record_D['sample_id'].lower().replace(' ','-')
 
-                    if self.record_D[item][ind].lower() in ['unknown', 'null']:
+        # The instrument and method metadata of each indicator are compiled once per file
+        for item in INSTRUMENT_METHOD_ITEM_L:
 
-                        if item in self.process_parameters_D:
-                                
-                            self.record_D[item][ind] = self.process_parameters_D[item]
+            self.record_D[item] = dict(row_plan_C.metadata_D[item])
 
     def _Sample_name_parameters_ktima_wetlab(self):
         """
@@ -579,40 +627,26 @@ class json_db(common_json_db):
         
         return True
         
-    def _Set_equipment_method(self):
+    def _Set_row_plan(self):
         """
-        @brief Initializes the equipment-method mapping dictionary and related data structures for processing observations.
+        @brief Compiles the plan of the csv rows (see ai4sh_row_plan), the same for all rows of the file.
 
         @details
-        This method performs several critical setup operations for processing CSV data:
-        - Validates that all observations use a single equipment type (requirement for AI4SH format).
-        - Creates a hierarchical equipment-method dictionary structure where each equipment maps to its associated methods.
-        - Initializes empty lists for each method to store observations.
-        - Builds mapping dictionaries between indicators, methods, and CSV column headers.
-        - Sets up data structures needed for subsequent observation processing.
-
-        The function creates the following instance attributes:
+        Validates that all observations use a single equipment type (requirement for AI4SH format) and compiles
+        the row plan. The following instance attributes are set from the plan:
+        - self.row_plan_C: The compiled ai4sh_row_plan.
         - self.equipment: Set to the procedure name from process parameters.
-        - self.equipment_method_D: Hierarchical dictionary {equipment: {method: []}} for storing observations.
         - self.indicator_in_L: List of observation column names as they appear in the CSV file.
         - self.indicator_L: List of standardized indicator names from parameter dictionary.
         - self.indicator_D: Maps standardized indicator names to CSV column names.
         - self.method_L: List of method column names from the CSV file.
         - self.indicator_method_D: Maps standardized indicator names to their corresponding methods.
+        - self.indicator_column_index_L: Index of the csv column of each indicator, used by Numeric_column_row_blocks.
 
-        @return bool: Returns True if setup is successful, None if validation fails.
-                    Returns None specifically when multiple equipment types are detected in a single record,
-                    which violates the AI4SH data format requirement.
-
-        @note This function must be called after _Distill_parameters() has populated the method_D, equipment_D, 
-            and parameter_D dictionaries. The AI4SH format requires that each record contains observations 
-            from only one equipment type.
-
-        @exception Prints error message and returns None if multiple equipment types are found in the same record.
-                This is a validation failure that prevents further processing of the current data row.
+        @return bool: Returns True if setup is successful, None if multiple equipment types are found.
 
-        @see _Distill_parameters() for setting up the required dictionaries.
-        @see _Get_observation_measurements_AI4SH() for using the equipment_method_D structure.
+        @note This function must be called after _Distill_parameters() has populated the method_D, equipment_D,
+            and parameter_D dictionaries.
         """
 
         unique_equipment_set = set(self.equipment_D.values())
@@ -623,27 +657,37 @@ class json_db(common_json_db):
 
             return None
 
-        self.equipment = self.process_parameters.procedure
+        self.row_plan_C = ai4sh_row_plan(self)
 
-        self.equipment_method_D = {self.equipment: {}}
-        
-        for key in self.method_D:
+        self.equipment = self.row_plan_C.equipment
 
-            self.equipment_method_D[self.equipment][self.method_D[key]] = []
-                
-        # Create a list of the observations as they appear in the csv file
-        self.indicator_in_L = list(self.equipment_D.keys())
+        self.indicator_in_L = self.row_plan_C.indicator_in_L
 
-        # Conver the list of observations to the correct indicator name as given in the csv header file
-        self.indicator_L = [self.parameter_D[key] for key in self.indicator_in_L]
-            
-        # Create a dictionary to map the indicator names to the csv header names
-        self.indicator_D = dict(zip(self.indicator_L,self.indicator_in_L))
+        self.indicator_L = self.row_plan_C.indicator_L
+
+        self.indicator_D = self.row_plan_C.indicator_D
 
-        self.method_L = list(self.method_D.keys())
+        self.method_L = self.row_plan_C.method_L
 
-        # Create a dictionary to map the method names to the indicator names
-        self.indicator_method_D = dict(zip(self.indicator_L,self.method_L))
+        self.indicator_method_D = self.row_plan_C.indicator_method_D
+
+        self.indicator_column_index_L = self.row_plan_C.column_index_L
+
+        return True
+
+    def _Set_equipment_method(self):
+        """
+        @brief Initializes the equipment-method mapping dictionary of a row from the compiled row plan.
+
+        @details
+        Creates self.equipment_method_D, a hierarchical dictionary {equipment: {method: []}} with empty lists for
+        storing the observations of the row (see _Get_observation_measurements_AI4SH). Must be called for each row
+        after _Set_row_plan().
+
+        @return bool: Returns True.
+        """
+
+        self.equipment_method_D = self.row_plan_C._Equipment_method_skeleton()
 
         return True
 
@@ -675,7 +719,7 @@ class json_db(common_json_db):
 
         self._Write_OSSL_csv('ai4sh', header_L, self.ossl_values_L)
 
-def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, std_row = None):
+def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, std_row = None, job_cache_C=None):
     """
     @brief Processes CSV data records and exports them to hierarchical JSON format for AI4SH in-situ data management.
 
@@ -709,7 +753,7 @@ def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, u
     @param project_FP (str): The project file path used for file operations and data reading.
     @param process (object): Object containing process parameters, expected to have a 'parameters' attribute.
     @param column_L (list): List of column header strings from the CSV file.
-    @param data_L_L (list): List of lists, each representing a row of data from the CSV file.
+    @param data_L_L (list): List (or iterator, see Data_read) of lists, each representing a row of data from the CSV file.
     @param all_parameter_D (dict): Dictionary mapping column headers to parameter names.
     @param unit_D (dict): Dictionary mapping column headers to unit names.
     @param method_D (dict): Dictionary mapping column headers to method names.
@@ -717,6 +761,7 @@ def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, u
     @param equipment_model_D (dict): Dictionary mapping column headers to equipment model names.
     @param equipment_id_D (dict): Dictionary mapping column headers to equipment ID values.
     @param std_row (optional): Standard deviation row or index, if available. Defaults to None.
+    @param job_cache_C (optional): job_cache shared by the processes of the run. Defaults to None.
 
     @return None: The function does not return a value but creates JSON files for each sample event.
                Returns None immediately if any critical error occurs during processing (e.g., coordinate file reading fails,
@@ -733,9 +778,10 @@ def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, u
         - File I/O errors during JSON export
     """
 
-    coordinate_D = Coordinates_fix(project_FP,process.parameters.point_name_position_sampledate_FPN)
+    # Coordinate store of the point name, position and sample date file, shared by the processes of the job
+    coordinate_C = Set_coordinate_store(project_FP, process, job_cache_C)
 
-    if not coordinate_D:
+    if not coordinate_C:
 
         print ('❌  ERROR - reading the location, setting, sample date and coordinate csv file failed.')
 
@@ -744,7 +790,7 @@ def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, u
         return None
             
     # Initiate the json_db class
-    json_db_C = json_db(project_FP,process, coordinate_D)
+    json_db_C = json_db(project_FP,process, coordinate_C)
 
     # Initialize the ossl values list - only  if the output data is to be used in OSSl format
     json_db_C.ossl_values_L = []
@@ -777,21 +823,68 @@ def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, u
     # Add compulsary parameters with default values if they are not set in the csv data file
     json_db_C._Add_compulsary_default_parameters()
 
-    # Loop all the data records in the csv data file
-    for data_row in  data_L_L:
+    # Compile the row plan of the header derived mappings and metadata, the same for all rows
+    result = json_db_C._Set_row_plan()
+
+    if not result:
+
+        return None
+
+    # Set the sink that receives the assembled sample events
+    json_db_C.json_sink_C = json_sink(process)
+
+    # Set the manifest of sources and outputs (only in incremental mode)
+    json_db_C.manifest_C = Set_build_manifest(project_FP, process, json_db_C.json_sink_C, process.parameters.data_src_FPN,
+                                              [process.parameters.method_src_FPN, process.parameters.point_name_position_sampledate_FPN])
+
+    result = None
+
+    try:
+
+        if json_db_C.manifest_C and json_db_C.manifest_C._Check_source_unchanged(process.parameters.data_src_FPN):
+
+            result = True
+
+        else:
+
+            # Loop the rows, sharded across worker processes if the process parameter <workers> is set
+            result = Loop_csv_rows(project_FP, process, json_db_C, data_L_L, Loop_ai4sh_csv_rows)
+
+    finally:
+
+        # Close the outputs, also when the loop stopped on an error
+        Close_outputs(json_db_C, result)
+
+    return result
+
+def Loop_ai4sh_csv_rows(project_FP, process, json_db_C, data_L_L):
+    """
+    @brief Loops all the data records in the AI4SH csv data file and exports each sample event.
+
+    @param project_FP (str): The project file path.
+    @param process (object): Object containing process parameters.
+    @param json_db_C (json_db): Initiated json_db instance with the distilled parameters and an open json sink.
+    @param data_L_L (list): List (or iterator, see Data_read) of lists, each representing a row of data from the CSV file.
+
+    @return True if all records were looped, None if an error occurred.
+    """
+
+    # Loop all the data records in the csv data file, the indicator columns are converted to float in blocks of rows
+    for data_row, value_L in Numeric_column_row_blocks(data_L_L, json_db_C.indicator_column_index_L):
+
+        # Skip rows that are unchanged since the previous run (only in incremental mode)
+        if json_db_C.manifest_C and json_db_C.manifest_C._Check_row_unchanged(data_row):
+
+            continue
 
         # Create a hierarchical dictionary to hold equipment -> methods (must be recreated in each loop)
         data_row = json_db_C._Convert_to_lower(data_row)
 
         # Create a hierarchical dictionary to hold equipment -> methods (must be recreated in each loop)
-        success = json_db_C._Set_equipment_method()
-
-        if not success:
-
-            return None
+        json_db_C._Set_equipment_method()
 
         # Convert the csv data row to a dict using the csv header records as keys
-        json_db_C._Row_data_to_dict(data_row)
+        json_db_C._Row_data_to_dict(data_row, value_L)
 
         # Rearrange the initial dictionary to hold the observations in a sub dictionary
         json_db_C._Rearrange_row_data_2_record()
@@ -900,6 +993,8 @@ def Process_ai4sh_csv(project_FP,process, column_L, data_L_L, all_parameter_D, u
         #    position_date_F.write(items_str + "\n")
         #    '''      
 
+    return True
+
     #if json_db_C.process_parameters_D['procedure'] == 'wetlab':
 
     #    sample_event_OSSL = json_db_C._Convert_wetlab_to_OSSL()
@@ -7,15 +7,34 @@ Updated 24 Nove 2025 - divided subprocesses to single objectives, removed commen
 
 @author: thomasgumbricht
 '''
-from copy import deepcopy
-
 # Package application imports
 
-from src.lib import Coordinates_fix, Interpolate_spectra
+from .spectra_2_OSSL import Get_spectra_resampler
 
 from .common import common_json_db
 
+from .json_sink import json_sink
+
+from .build_manifest import Set_build_manifest
+
+from .coordinate_store import Set_coordinate_store
+
+from .row_workers import Loop_csv_rows, Close_outputs
+
+from .spectra_store import Set_spectra_store
+
+from .ossl_csv import Set_ossl_csv_writer
+
+from .spectra_block import Spectra_row_blocks, Set_spectra_transform
+
 # Default variables
+
+# Index of the first spectral column in the csv data file
+SPECTRA_FIRST_COLUMN = 4
+
+# OSSL wavelength grid (nm) of the interpolated spectra
+OSSL_MIN_WL, OSSL_MAX_WL, OSSL_WL_STEP = 1350, 2550, 2
+
 COMPULSARY_DATA_RECORDS = ['pilot_country','pilot_site','point_id','min_depth','max_depth','sample_date',
                                 'sample_preparation__name','subsample','replicate','sample_analysis_date','sample_preservation__name',
                                 'sample_transport__name','transport_duration_h','sample_storage__name','user_analysis__email',
@@ -67,7 +86,7 @@ class json_db(common_json_db):
     - Write sample event data to JSON files.
     """
 
-    def __init__(self, project_FP,process, coordinate_D):
+    def __init__(self, project_FP,process, coordinate_C):
         """
         @brief Constructor for the json_db class, recursively initializes a Struct object from a dictionary.
    
@@ -80,7 +99,7 @@ class json_db(common_json_db):
         @return None
         """
 
-        common_json_db.__init__(self, project_FP,process, coordinate_D)
+        common_json_db.__init__(self, project_FP,process, coordinate_C)
 
     def _Set_column_L(self, column_L):
         """
@@ -174,11 +193,11 @@ class json_db(common_json_db):
         """
         self.wavelength_L = []
 
-        for w in range(4,len(column_L)):
+        for w in range(SPECTRA_FIRST_COLUMN,len(column_L)):
 
             self.wavelength_L.append(float(column_L[w].strip()))
 
-    def _Row_data_to_dict(self, row_data):
+    def _Row_data_to_dict(self, row_data, spectra_A):
         """
         @brief Converts a row of data into a dictionary using column headers as keys.
 
@@ -187,15 +206,16 @@ class json_db(common_json_db):
         The resulting dictionary is assigned to self.record_D.
 
         @param row_data List of values representing a single row of data.
+        @param spectra_A Array of the spectral columns of the row parsed by Spectra_row_blocks, None if not parsed.
 
         @return None. The resulting dictionary is stored in self.record_D.
         """
 
-        self.record_D = dict(zip(self.column_L[0:4], row_data[0:4]))
+        self.record_D = dict(zip(self.column_L[0:SPECTRA_FIRST_COLUMN], row_data[0:SPECTRA_FIRST_COLUMN]))
 
         self.record_D['n_repetitions'] = 3
    
-        self.record_D['spectra'] = row_data[4:]
+        self.record_D['spectra'] = spectra_A
 
     def _Rearrange_row_data_2_record(self):
 
@@ -209,17 +229,8 @@ class json_db(common_json_db):
 
         for ind in self.indicator_L:
 
-            if ',' in self.record_D[ind][0]:
-
-                self.record_D[ind] = [c.replace(',','.')for c in self.record_D[ind]] 
-
-            try:
-
-                self.record_D['value'][ind] = [float(c)/100 for c in self.record_D[ind]]
-
-            except (ValueError, TypeError):
-
-                self.record_D['value'][ind] = None
+            # The spectra are parsed to float and converted from percent to reflectance in blocks of rows, see Spectra_row_blocks
+            self.record_D['value'][ind] = self.record_D[ind]
 
             self.record_D['unit__name'][ind] = self.process_parameters.unit__name
 
@@ -610,33 +621,33 @@ class json_db(common_json_db):
 
         return True
 
-    def _Assemble_ossl_csv(self):
+    def _Assemble_ossl_csv(self, interpolated_ns_array):
+        """
+        @brief Writes the current record with its spectra resampled to the OSSL grid as a row of the OSSL csv.
+
+        @param interpolated_ns_array Row view of the resampled block matrix (see Spectra_row_blocks), None if not resampled.
+
+        @return True if the row was written, None if the spectra could not be resampled.
+        """
 
         self.record_D['license'] = 'only for use by AI4SH'
         self.record_D['doi'] = "not_yet_published"
         self.record_D['instrument_setting'] = "not recorded"
         self.record_D['depth'] = '%s-%s' %(self.record_D['min_depth'],self.record_D['max_depth'])
-    
-        #foss_csv_value_L = [self.record_D[item] for item in AI4SH_Key_L]
-        neon_csv_value_L = [self.record_D[item] for item in AI4SH_Key_L]
-
-        interpolated_ns_array = Interpolate_spectra(self.wavelength_L, self.record_D['value']['spectra'], 1350, 2550, 2, True)[0]
 
-        neon_csv_value_L.extend(interpolated_ns_array.tolist())
+        # The spectra are resampled to the OSSL grid for the complete block of rows, see Spectra_row_blocks
+        if interpolated_ns_array is None:
 
-        self.neon_values_L.append(neon_csv_value_L)
+            print(' ❌ ERROR - spectra interpolation failed for sample_id: %s' %(self.record_D['sample_id']))
 
-    def _Convert_spectra_to_OSSL(self):
-
-        header_L = deepcopy(AI4SH_Key_L)
-
-        for i in range(1350, 2551, 2):
+            return None
 
-            header_L.append("wl.%d" % (i))
+        # Stream the row to the OSSL csv
+        self.ossl_csv_C._Write_row(self._OSSL_csv_FN('ai4sh'), self.record_D, interpolated_ns_array)
 
-        self._Write_OSSL_csv('ai4sh', header_L, self.neon_values_L)
+        return True
 
-def Process_neospectra_csv(project_FP,process, column_L, data_L_L, all_parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, std_row = None):
+def Process_neospectra_csv(project_FP,process, column_L, data_L_L, all_parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, std_row = None, job_cache_C=None):
     """
     @brief Processes CSV data records and exports them to hierarchical JSON format for AI4SH in-situ data management.
 
@@ -662,19 +673,21 @@ def Process_neospectra_csv(project_FP,process, column_L, data_L_L, all_parameter
 
     @param process Object containing process parameters, expected to have a 'parameters' attribute.
     @param column_L List of column header strings from the CSV file.
-    @param data_L_L List of lists, each representing a row of data from the CSV file.
+    @param data_L_L List (or iterator, see Data_read) of lists, each representing a row of data from the CSV file.
     @param all_parameter_D Dictionary mapping column headers to parameter names.
     @param unit_D Dictionary mapping column headers to unit names.
     @param method_D Dictionary mapping column headers to method names.
     @param equipment_D Dictionary mapping column headers to equipment names.
     @param std_row (Optional) Standard deviation row or index, if available.
+    @param job_cache_C (Optional) job_cache shared by the processes of the run.
 
     @return None if any error occurs during processing, otherwise creates JSON files for each sample event.
     """
 
-    coordinate_D = Coordinates_fix(project_FP,process.parameters.point_name_position_sampledate_FPN)
+    # Coordinate store of the point name, position and sample date file, shared by the processes of the job
+    coordinate_C = Set_coordinate_store(project_FP, process, job_cache_C)
 
-    if not coordinate_D:
+    if not coordinate_C:
 
         print ('❌  ERROR - reading the location, setting, sample date and coordinate csv file failed.')
 
@@ -683,7 +696,7 @@ def Process_neospectra_csv(project_FP,process, column_L, data_L_L, all_parameter
         return None
             
     # Initiate the json_db class
-    json_db_C = json_db(project_FP,process, coordinate_D)
+    json_db_C = json_db(project_FP,process, coordinate_C)
 
     json_db_C.equipment = process.parameters.procedure
 
@@ -709,13 +722,68 @@ def Process_neospectra_csv(project_FP,process, column_L, data_L_L, all_parameter
     # Add compulsary parameters with default values if they are not set in the csv data file
     json_db_C._Add_compulsary_default_parameters()
 
-    json_db_C.neon_values_L = []
+    # Set the sink that receives the assembled sample events
+    json_db_C.json_sink_C = json_sink(process)
+
+    # Set the binary store for the spectra (only if spectra_store is set)
+    json_db_C.spectra_store_C = Set_spectra_store(project_FP, process)
+
+    # Set the streaming OSSL csv writer (only if ossl_csv is set)
+    json_db_C.ossl_csv_C = Set_ossl_csv_writer(project_FP, process, AI4SH_Key_L, range(OSSL_MIN_WL, OSSL_MAX_WL+1, OSSL_WL_STEP))
+
+    if json_db_C.ossl_csv_C:
+
+        # Interpolation indices and weights from the csv wavelengths to the OSSL grid, shared by all rows
+        json_db_C.ossl_resampler_C = Get_spectra_resampler(json_db_C.wavelength_L, OSSL_MIN_WL, OSSL_MAX_WL, OSSL_WL_STEP, True)
+
+    # Set the manifest of sources and outputs (only in incremental mode)
+    json_db_C.manifest_C = Set_build_manifest(project_FP, process, json_db_C.json_sink_C, process.parameters.data_src_FPN,
+                                              [process.parameters.method_src_FPN, process.parameters.point_name_position_sampledate_FPN])
+
+    result = None
+
+    try:
+
+        if json_db_C.manifest_C and json_db_C.manifest_C._Check_source_unchanged(process.parameters.data_src_FPN):
+
+            result = True
+
+        else:
+
+            # Loop the rows, sharded across worker processes if the process parameter <workers> is set
+            result = Loop_csv_rows(project_FP, process, json_db_C, data_L_L, Loop_neospectra_csv_rows)
+
+    finally:
+
+        # Close the outputs, also when the loop stopped on an error
+        Close_outputs(json_db_C, result)
+
+    return result
+
+def Loop_neospectra_csv_rows(project_FP, process, json_db_C, data_L_L):
+    """
+    @brief Loops all the data records in the NeoSpectra csv data file and exports each sample event.
+
+    @param project_FP (str): The project file path.
+    @param process (object): Object containing process parameters.
+    @param json_db_C (json_db): Initiated json_db instance with the distilled parameters and an open json sink.
+    @param data_L_L (list): List (or iterator, see Data_read) of lists, each representing a row of data from the CSV file.
+
+    @return True if all records were looped, None if an error occurred.
+    """
+
+    # Loop all the data records in the csv data file, the spectra are parsed in blocks of rows
+    for data_row, spectra_A, ossl_spectra_A in Spectra_row_blocks(data_L_L, SPECTRA_FIRST_COLUMN, Set_spectra_transform(process, 'percent'),
+                                                                   resampler_C=json_db_C.ossl_resampler_C,
+                                                                   dtype=json_db_C._Spectra_parse_dtype('spectra_value')):
+
+        # Skip rows that are unchanged since the previous run (only in incremental mode)
+        if json_db_C.manifest_C and json_db_C.manifest_C._Check_row_unchanged(data_row):
 
-    # Loop all the data records in the csv data file
-    for data_row in  data_L_L:
+            continue
 
         # Convert the csv data row to a dict using the csv header records as keys
-        json_db_C._Row_data_to_dict(data_row)
+        json_db_C._Row_data_to_dict(data_row, spectra_A)
 
         # Rearrange the initial dictionary to hold the observations in a sub dictionary
         json_db_C._Rearrange_row_data_2_record()
@@ -840,6 +908,8 @@ def Process_neospectra_csv(project_FP,process, column_L, data_L_L, all_parameter
 
             print('❌ Error creating xspectre JSON post')
 
-        #json_db_C._Assemble_ossl_csv()
+        if json_db_C.ossl_csv_C:
+
+            json_db_C._Assemble_ossl_csv(ossl_spectra_A)
 
-    #sample_event_OSSL = json_db_C._Convert_spectra_to_OSSL()
\ No newline at end of file
+    return True
\ No newline at end of file
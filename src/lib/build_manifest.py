@@ -0,0 +1,408 @@
+'''
+Created on 17 October 2026
+
+Manifest of sources and derived outputs for incremental re-imports
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from os import path, remove, stat
+
+from hashlib import sha1
+
+import json
+
+# Package application imports
+from src.utils import Csv_row_bytes, Dump_json, Full_path_locate, Read_json, Struct
+
+from .version import __version__
+
+# Default variables
+
+# Process parameters that only set how a run is executed, the outputs are the same; not part of the configuration digest
+CONFIG_DIGEST_IGNORE_L = ['workers', 'worker_shard_size', 'writer_workers', 'writer_mode', 'writer_queue_size',
+                          'csv_chunk_size', 'csv_reader', 'white_reference_cache']
+
+def File_digest(FPN, block_size=1 << 20):
+    """
+    @brief Calculates the sha1 hex digest of a file.
+
+    @param FPN Full path name of the file.
+    @param block_size Number of bytes read at a time.
+
+    @return The hex digest, or None if the file does not exist.
+    """
+
+    if not FPN or not path.isfile(FPN):
+
+        return None
+
+    digest = sha1()
+
+    with open(FPN, 'rb') as infile:
+
+        for block in iter(lambda: infile.read(block_size), b''):
+
+            digest.update(block)
+
+    return digest.hexdigest()
+
+def Config_json_default(value):
+    """
+    @brief Converts the values of the process parameters that json can not encode, used for the configuration digest.
+
+    @details
+    Nested parameters (Struct) are converted to their dictionaries and sets to sorted lists, the encoding is thus
+    the same in every run. Any other value is converted to its string.
+
+    @param value The value to convert.
+
+    @return The converted value.
+    """
+
+    if isinstance(value, Struct):
+
+        return value.__dict__
+
+    if isinstance(value, (set, frozenset)):
+
+        return sorted(value, key=str)
+
+    return str(value)
+
+class build_manifest:
+    """
+    @class build_manifest
+    @brief Records the sources of a process and the output files derived from each of them.
+
+    @details
+    With the optional process parameter <incremental> set to true, a manifest is kept for each process in the
+    folder <manifest> next to the ai4sh and xspectre destination folders. The manifest holds:
+    - a configuration digest of the process parameters, the package version and the content of the
+      dependency files (method source file, coordinate file, white references);
+    - for each source file (csv data file or xspectre json file) its path, size, mtime and sha1 digest and the
+      output files derived from it; for csv files the outputs are recorded per row (keyed by the row digest).
+
+    In a re-run only new or changed sources (or csv rows) are processed, and output files that were derived from
+    sources (or rows) that no longer exist are removed. A changed configuration reprocesses all sources.
+    The manifest is only updated (and orphans only removed) if the process completed.
+    """
+
+    def __init__(self, project_FP, process, source_FP, dependency_FPN_L):
+        """
+        @brief Constructor for the build_manifest class, reads the manifest of the previous run.
+
+        @param project_FP The project folder path.
+        @param process An object containing process parameters, expected to have a 'parameters' attribute.
+        @param source_FP The data source file or folder of the process, used for naming the manifest.
+        @param dependency_FPN_L List of files that the outputs depend on in addition to the sources.
+
+        @return None
+        """
+
+        self.project_FP = project_FP
+
+        self.verbose = process.verbose
+
+        dst_FP, method_FP = path.split(process.parameters.dst_FP)
+
+        manifest_FP = Full_path_locate(project_FP, path.join(dst_FP, 'manifest'), True)
+
+        self.manifest_FPN = path.join(manifest_FP, '%s_%s.json' %(method_FP, sha1(source_FP.encode('utf-8')).hexdigest()[:10]))
+
+        self.old_D = {}
+
+        if path.exists(self.manifest_FPN):
+
+            self.old_D = Read_json(self.manifest_FPN) or {}
+
+        self.new_D = {'config_digest': self._Config_digest(process, dependency_FPN_L), 'sources': {}}
+
+        # Sources and rows are only reused if the configuration is unchanged
+        if self.old_D.get('config_digest') != self.new_D['config_digest']:
+
+            if self.old_D and self.verbose:
+
+                print (' ⚠️ Configuration changed since the previous run, all sources are reprocessed')
+
+            self.old_sources_D = {}
+
+        else:
+
+            self.old_sources_D = self.old_D['sources']
+
+        self.source_D = None
+
+        self.output_L = None
+
+        self.count_D = {'unchanged': 0, 'processed': 0, 'removed': 0}
+
+    def _Config_digest(self, process, dependency_FPN_L):
+        """
+        @brief Calculates the digest of the process parameters, the package version and the dependency files.
+
+        @details
+        The runtime settings in CONFIG_DIGEST_IGNORE_L (worker processes, background writers, csv reading and
+        the white reference cache) are left out, changing them does not reprocess the sources.
+
+        @return The hex digest.
+        """
+
+        digest = sha1(__version__.encode('utf-8'))
+
+        parameters_D = {key: value for key, value in process.parameters.__dict__.items() if key not in CONFIG_DIGEST_IGNORE_L}
+
+        digest.update(json.dumps(parameters_D, sort_keys=True, default=Config_json_default).encode('utf-8'))
+
+        for FPN in dependency_FPN_L:
+
+            digest.update(str(File_digest(self._Locate(FPN))).encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def _Locate(self, FPN):
+        """
+        @brief Returns the full path of a source or dependency file, without creating it.
+
+        @return The full path, or None if it does not exist.
+        """
+
+        if not FPN:
+
+            return None
+
+        if path.exists(FPN):
+
+            return FPN
+
+        return Full_path_locate(self.project_FP, FPN)
+
+    def _Outputs_exist(self, output_L):
+        """
+        @brief Checks that all the recorded outputs still exist.
+
+        @return True if all exist, False otherwise.
+        """
+
+        return all(path.exists(FPN) for FPN in output_L)
+
+    def _Check_source_unchanged(self, source_FPN):
+        """
+        @brief Checks if a source is unchanged since the previous run, and starts recording it otherwise.
+
+        @details
+        A source is unchanged if its size and mtime (or, if these differ, its sha1 digest) are the same as in the
+        previous run, the configuration is unchanged and all its outputs still exist. Unchanged sources are
+        carried over to the new manifest. For a changed source a new entry is started, the outputs written
+        until the next call are recorded for this source (see _Add_output).
+
+        @param source_FPN Full path name of the source file.
+
+        @return True if the source is unchanged (and can be skipped), False otherwise.
+        """
+
+        source_FPN = self._Locate(source_FPN)
+
+        source_stat = stat(source_FPN)
+
+        old_source_D = self.old_sources_D.get(source_FPN)
+
+        source_D = {'size': source_stat.st_size, 'mtime': source_stat.st_mtime, 'sha1': None, 'outputs': [], 'rows': {}}
+
+        if old_source_D and old_source_D['size'] == source_D['size']:
+
+            if old_source_D['mtime'] == source_D['mtime']:
+
+                source_D['sha1'] = old_source_D['sha1']
+
+            else:
+
+                source_D['sha1'] = File_digest(source_FPN)
+
+            if source_D['sha1'] == old_source_D['sha1'] and self._Outputs_exist(old_source_D['outputs']):
+
+                self.new_D['sources'][source_FPN] = {**old_source_D, 'mtime': source_D['mtime']}
+
+                self.source_D = None
+
+                self.output_L = None
+
+                self.count_D['unchanged'] += 1
+
+                if self.verbose > 1:
+
+                    print ('✅ Unchanged since previous run: %s' %(source_FPN))
+
+                return True
+
+        if not source_D['sha1']:
+
+            source_D['sha1'] = File_digest(source_FPN)
+
+        self.new_D['sources'][source_FPN] = source_D
+
+        self.source_D = source_D
+
+        self.old_source_D = old_source_D if old_source_D else {'rows': {}}
+
+        self.output_L = source_D['outputs']
+
+        self.count_D['processed'] += 1
+
+        return False
+
+    def _Check_row_unchanged(self, data_row):
+        """
+        @brief Checks if a csv row of the current source is unchanged since the previous run, and starts recording it otherwise.
+
+        @param data_row List of the values in the csv row (or a csv_numeric_row, see Csv_row_bytes).
+
+        @return True if the row is unchanged (and can be skipped), False otherwise.
+        """
+
+        row_digest = sha1(Csv_row_bytes(data_row)).hexdigest()
+
+        old_output_L = self.old_source_D['rows'].get(row_digest)
+
+        if old_output_L and self._Outputs_exist(old_output_L):
+
+            self.source_D['rows'][row_digest] = old_output_L
+
+            self.output_L = None
+
+            return True
+
+        self.output_L = self.source_D['rows'].setdefault(row_digest, [])
+
+        return False
+
+    def _Discard_source(self):
+        """
+        @brief Marks the current source as failed, it is then reprocessed in the next run.
+
+        @details
+        The outputs of the previous run are kept for the failed source and thus not removed as orphans.
+
+        @return None
+        """
+
+        if self.source_D is None:
+
+            return None
+
+        self.source_D['size'] = -1
+
+        self.source_D['sha1'] = None
+
+        if 'outputs' in self.old_source_D:
+
+            self.source_D['outputs'].extend([FPN for FPN in self.old_source_D['outputs'] if FPN not in self.source_D['outputs']])
+
+        self.source_D = None
+
+        self.output_L = None
+
+    def _Add_output(self, dst_FPN):
+        """
+        @brief Records an output file for the current source (or row), called by the json sink.
+
+        @return None
+        """
+
+        if self.output_L is not None and dst_FPN not in self.output_L:
+
+            self.output_L.append(dst_FPN)
+
+    def _Close(self, completed):
+        """
+        @brief Removes orphaned outputs and writes the manifest, if the process completed.
+
+        @param completed True if the process looped all sources without errors.
+
+        @return None
+        """
+
+        if not completed:
+
+            print (' ⚠️ Process not completed, the manifest is not updated: %s' %(self.manifest_FPN))
+
+            return None
+
+        new_output_S = set()
+
+        for source_D in self.new_D['sources'].values():
+
+            for output_L in source_D['rows'].values():
+
+                for FPN in output_L:
+
+                    if FPN not in source_D['outputs']:
+
+                        source_D['outputs'].append(FPN)
+
+            new_output_S.update(source_D['outputs'])
+
+        # Remove outputs from sources or rows that no longer exist (or produced other outputs)
+        if 'sources' in self.old_D:
+
+            for source_D in self.old_D['sources'].values():
+
+                for FPN in source_D['outputs']:
+
+                    if FPN not in new_output_S and path.exists(FPN):
+
+                        remove(FPN)
+
+                        new_output_S.add(FPN)
+
+                        self.count_D['removed'] += 1
+
+        Dump_json(self.manifest_FPN, self.new_D, indent=None, compact=True, atomic=True)
+
+        if self.verbose:
+
+            print ('✅ Manifest: %(unchanged)s unchanged sources, %(processed)s processed, %(removed)s orphaned outputs removed' %(self.count_D))
+
+def Set_build_manifest(project_FP, process, json_sink_C, source_FP, dependency_FPN_L):
+    """
+    @brief Creates the manifest of a process if the process parameter <incremental> is true.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters.
+    @param json_sink_C The json sink of the process, the manifest is attached to record the outputs.
+    @param source_FP The data source file or folder of the process.
+    @param dependency_FPN_L List of files that the outputs depend on in addition to the sources.
+
+    @return The build_manifest instance, or None if not incremental.
+    """
+
+    if not ('incremental' in process.parameters.__dict__ and process.parameters.incremental):
+
+        return None
+
+    if json_sink_C.output_mode != 'file':
+
+        print (' ⚠️ WARNING - incremental processing requires json_output <file>, processing all sources')
+
+        return None
+
+    if 'spectra_store' in process.parameters.__dict__ and process.parameters.spectra_store != 'json':
+
+        # The spectra store is regenerated in each run, skipped sources would lose their spectra
+        print (' ⚠️ WARNING - incremental processing is not available with a spectra_store, processing all sources')
+
+        return None
+
+    if 'ossl_csv' in process.parameters.__dict__ and process.parameters.ossl_csv:
+
+        # The OSSL csv is regenerated in each run, skipped rows would be missing
+        print (' ⚠️ WARNING - incremental processing is not available with ossl_csv, processing all sources')
+
+        return None
+
+    manifest_C = build_manifest(project_FP, process, source_FP, dependency_FPN_L)
+
+    json_sink_C.manifest_C = manifest_C
+
+    return manifest_C
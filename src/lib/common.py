@@ -13,7 +13,11 @@ from copy import deepcopy
 #import numpy as np
 
 # Package application imports
-from src.utils import  Delta_days, Dump_json, Full_path_locate, Remove_path, Write_csv_header_data
+from src.utils import  Delta_days, Full_path_locate, Remove_path, Write_csv_header_data, NUMERIC_LIST_MIN_LENGTH
+
+from .json_sink import json_sink
+
+from .spectra_precision import Spectra_precision_policy, Spectra_parse_dtype, Quantize_spectra
 
 # Default variables
 COMPULSARY_DATA_RECORDS = ['pilot_country','pilot_site','point_id','min_depth','max_depth','sample_date',
@@ -216,6 +220,43 @@ INDICATOR_D = {'tds':'total-dissolved-solids','ec':'electrical-conductivity','el
 UNIT_D = {} 
 UNIT_D['C'] = {'property_abbreviation':'temp', 'property_full':'termperature', 'unit_abbreviation':'C', 'unit_full':'degree Celsius', 'add':0, 'multiply':1 }
 
+def Deepcopy_sharing_arrays(data):
+    """
+    @brief Deep copies a nested dictionary, but shares the numeric lists and numpy arrays with the original.
+
+    @details
+    The ai4sh and xspectre formats of a sample event are assembled from the same measurements; the dictionaries
+    are copied as the formats alter them, but the spectra are never altered. Sharing the spectra avoids copying
+    them and lets the json sink format each spectrum once for both formats (see Encode_json).
+
+    @param data The dictionary (or list) to copy.
+
+    @return The copy.
+    """
+
+    memo = {}
+
+    stack_L = [data]
+
+    while stack_L:
+
+        item = stack_L.pop()
+
+        if isinstance(item, dict):
+
+            stack_L.extend(item.values())
+
+        elif hasattr(item, 'ndim') or (isinstance(item, list) and len(item) >= NUMERIC_LIST_MIN_LENGTH
+                                       and all(type(value) in (int, float) for value in item)):
+
+            memo[id(item)] = item
+
+        elif isinstance(item, (list, tuple)):
+
+            stack_L.extend(item)
+
+    return deepcopy(data, memo)
+
 class common_json_db:
     """
     @class json_db
@@ -235,7 +276,7 @@ class common_json_db:
     - Write sample event data to JSON files.
     """
 
-    def __init__(self, project_FP,process, coordinate_D):
+    def __init__(self, project_FP,process, coordinate_C):
         """
         @brief Constructor for the json_db class, recursively initializes a Struct object from a dictionary.
    
@@ -244,6 +285,7 @@ class common_json_db:
         - Converts the process parameters to a dictionary for easier access and manipulation.
 
         @param process An object containing process parameters, expected to have a 'parameters' attribute.
+        @param coordinate_C The coordinate_store of the point name, position and sample date file.
 
         @return None
         """
@@ -251,7 +293,27 @@ class common_json_db:
         self.project_FP = project_FP
         self.process_parameters = process.parameters
         self.process_parameters_D = dict(list(process.parameters.__dict__.items()))
-        self.coordinate_D = coordinate_D
+        self.coordinate_C = coordinate_C
+        # The white references are extracted without coordinates
+        self.coordinate_D = coordinate_C.coordinate_D if coordinate_C else coordinate_C
+
+        # The json sink is set by the calling Process function, see _Dump_sample_json
+        self.json_sink_C = None
+
+        # The build manifest is set by the calling Process function in incremental mode
+        self.manifest_C = None
+
+        # The spectra store is set by the calling Process function if spectra are stored as binary arrays
+        self.spectra_store_C = None
+
+        # Output precision policies of the spectral datasets, see _Store_array
+        self.spectra_precision_D = {}
+
+        # The OSSL csv writer is set by the calling Process function if ossl_csv is set
+        self.ossl_csv_C = None
+
+        # The resampler of the spectra to the OSSL grid, set with the OSSL csv writer
+        self.ossl_resampler_C = None
 
     def _Set_dst_FP(self):
         """
@@ -335,7 +397,7 @@ class common_json_db:
 
             pass
 
-        self.equipment_method_copy_D = deepcopy(self.equipment_method_D)
+        self.equipment_method_copy_D = Deepcopy_sharing_arrays(self.equipment_method_D)
 
         try:
 
@@ -394,7 +456,7 @@ class common_json_db:
 
             pass
 
-        self.equipment_method_copy_D = deepcopy(self.equipment_method_D)
+        self.equipment_method_copy_D = Deepcopy_sharing_arrays(self.equipment_method_D)
 
         try:
 
@@ -600,8 +662,8 @@ class common_json_db:
             #if 'standard_deviation' in self.record_D and self.record_D['standard_deviation'][indicator_key]:
             if 'standard_deviation' in self.record_D:
  
-                observation_D =  {'value': self.record_D['value'][indicator_key], 
-                            'standard_deviation': self.record_D['standard_deviation'][indicator_key],
+                observation_D =  {'value': self._Store_array('%s_value' %(indicator_key), self.record_D['value'][indicator_key]), 
+                            'standard_deviation': self._Store_array('%s_standard_deviation' %(indicator_key), self.record_D['standard_deviation'][indicator_key]),
                             'unit__name': self.record_D['unit__name'][indicator_key],
                             'indicator__name':  indicator__name,
                             'procedure': self.record_D['procedure'],
@@ -612,7 +674,7 @@ class common_json_db:
 
             else:
 
-                observation_D =  {'value': self.record_D['value'][indicator_key],
+                observation_D =  {'value': self._Store_array('%s_value' %(indicator_key), self.record_D['value'][indicator_key]),
                             'unit__name': self.record_D['unit__name'][indicator_key],
                             'indicator__name':  indicator__name,
                             'procedure': self.record_D['procedure'],
@@ -649,12 +711,8 @@ class common_json_db:
         @return None
         """
 
-        for indicator_key in self.indicator_L:
-            '''
-            '''
-
-            indicator__name = '%s_%s' %( self.process.parameters.procedure, INDICATOR_D[indicator_key])
-            
+        # The indicator names and target methods are compiled once per file, see ai4sh_row_plan
+        for indicator_key, indicator__name, method in self.row_plan_C.observation_key_L:
 
             if 'standard_deviation' in self.record_D and self.record_D['standard_deviation'][indicator_key]:
  
@@ -679,7 +737,7 @@ class common_json_db:
                             'instrument_model__name': self.record_D['instrument_model__name'][indicator_key],
                             'instrument_id': self.record_D['instrument_id'][indicator_key]}
 
-            self.equipment_method_D[self.equipment][self.method_D[self.indicator_method_D[indicator_key]]].append(observation_D)
+            self.equipment_method_D[self.equipment][method].append(observation_D)
             
     
     def _Set_locus_sample_date_coordinate(self):
@@ -697,10 +755,10 @@ class common_json_db:
         """
   
         #self.record_D['sample_date'] = self.record_D['sample_date']
-        # Get the locus from the original data, and then retrieve this locus data from coordinate_D
-        locus = '%s-%s_%s' %(self.record_D['pilot_country'].lower(), self.record_D['pilot_site'].lower(), self.record_D['point_id'].lower())
+        # Get the locus from the original data, and then retrieve the lowercased locus data from the coordinate store
+        locus, point_D = self.coordinate_C._Get(self.record_D['pilot_country'], self.record_D['pilot_site'], self.record_D['point_id'])
 
-        if not locus in self.coordinate_D:
+        if point_D is None:
 
             print ('❌  ERROR - locus not found in coordinate_D: '+locus)
             
@@ -708,9 +766,7 @@ class common_json_db:
 
             return None
         
-        for item in self.coordinate_D[locus]:
-
-            self.record_D[item] = self.coordinate_D[locus][item].lower() if isinstance(self.coordinate_D[locus][item], str) else self.coordinate_D[locus][item]
+        self.record_D.update(point_D)
 
         self.record_D['locus'] = locus
 
@@ -944,13 +1000,13 @@ class common_json_db:
         @return None
         """
 
-        locus = '%s-%s_%s' %(self.record_D['pilot_country'].lower(), self.record_D['pilot_site'].lower(), self.record_D['point_id'].lower())
+        locus, point_D = self.coordinate_C._Get(self.record_D['pilot_country'], self.record_D['pilot_site'], self.record_D['point_id'])
  
         self.point = {
         "name": self.record_D['point_id'].lower(),
-        "latitude": self.coordinate_D[locus]['latitude'],
-        "longitude": self.coordinate_D[locus]['longitude'],
-        "setting": self.coordinate_D[locus]['setting'].lower()}
+        "latitude": point_D['latitude'],
+        "longitude": point_D['longitude'],
+        "setting": point_D['setting']}
         
     def _Set_site(self):
         """
@@ -1033,13 +1089,95 @@ class common_json_db:
                     '_'+self.record_D['min_depth']+\
                     '-'+self.record_D['max_depth']
 
+    def _Store_array(self, dataset, value_A):
+        """
+        @brief Returns a spectral array for the sample event, as a list or as a reference to the spectra store.
+
+        @details
+        Arrays and lists with more than one value are converted to the output precision of the dataset (process
+        parameter <spectra_precision>, see Spectra_precision_policy). Without a spectra store (process parameter
+        <spectra_store>) the values are returned as a list to be embedded in the json; float32 and int16 values are
+        returned as {'encoding': encoding metadata, 'values': list}. With a spectra store the array is appended to
+        the store and the reference {'array_store': path, 'row': index} is returned, with the encoding metadata if
+        not float64.
+        Scalars and non numeric lists are returned as is.
+
+        @param dataset Name of the dataset (e.g. 'reflectance_value').
+        @param value_A numpy array, list or scalar value.
+
+        @return The list, reference or value to put in the sample event.
+        """
+
+        if not (getattr(value_A, 'ndim', 0) >= 1 or (isinstance(value_A, list) and len(value_A) > 1)):
+
+            return value_A
+
+        policy_D = self._Spectra_precision_policy(dataset)
+
+        if policy_D['dtype'] == 'float64' and not self.spectra_store_C:
+
+            return value_A.tolist() if hasattr(value_A, 'tolist') else value_A
+
+        try:
+
+            quantized_A, encoding_D = Quantize_spectra(value_A, policy_D)
+
+        except (TypeError, ValueError):
+
+            return value_A.tolist() if hasattr(value_A, 'tolist') else value_A
+
+        if self.spectra_store_C:
+
+            reference_D = self.spectra_store_C._Store(dataset, quantized_A)
+
+            if encoding_D:
+
+                reference_D['encoding'] = encoding_D
+
+            return reference_D
+
+        if policy_D['dtype'] == 'float32':
+
+            # 9 significant digits restore the float32 values exactly
+            return {'encoding': encoding_D, 'values': list(map(float, map('%.9g'.__mod__, quantized_A.tolist())))}
+
+        return {'encoding': encoding_D, 'values': quantized_A.tolist()}
+
+    def _Spectra_precision_policy(self, dataset):
+        """
+        @brief Returns the output precision policy of a spectral dataset, set once per dataset.
+
+        @param dataset Name of the dataset (e.g. 'reflectance_value').
+
+        @return Dictionary {'dtype': str, 'scale': float, 'offset': float}, see Spectra_precision_policy.
+        """
+
+        if dataset not in self.spectra_precision_D:
+
+            spectra_precision = self.process_parameters_D['spectra_precision'] if 'spectra_precision' in self.process_parameters_D else None
+
+            self.spectra_precision_D[dataset] = Spectra_precision_policy(spectra_precision, dataset)
+
+        return self.spectra_precision_D[dataset]
+
+    def _Spectra_parse_dtype(self, dataset):
+        """
+        @brief Returns the dtype the spectra of a dataset are parsed to, float32 with the float32 policy.
+
+        @param dataset Name of the dataset (e.g. 'spectra_value').
+
+        @return numpy dtype, see Spectra_parse_dtype.
+        """
+
+        return Spectra_parse_dtype(self._Spectra_precision_policy(dataset))
+
     def _Dump_sample_json(self, sample_event, item):
         """
         @brief Dumps a sample event dictionary to a JSON file.
 
-        This function creates a destination file name and path based on the sample ID and destination folder path.
-        It then writes the provided sample event dictionary to the JSON file using the Dump_json function with indentation.
-        After successful writing, it prints the path of the created JSON file.
+        This function creates a destination file name based on the sample ID and hands the sample event
+        to the json sink (self.json_sink_C) that writes it to the destination folder of the format (item),
+        either as a separate json file or appended to an ndjson file (process parameter <json_output>).
 
         @param sample_event Dictionary containing the sample event data to be exported to JSON.
 
@@ -1098,18 +1236,31 @@ class common_json_db:
                                                  self.record_D['sample_analysis_date'])
 
 
-        dst_FPN = path.join(self.dst_FP_D[item], dst_FN)
+        if not self.json_sink_C:
 
-        # Write the updated json file
-        success = Dump_json(dst_FPN, sample_event, indent=2)
-        
-        if not success:
-        
-            print('❌ %s Json post creation failed: %s' %(item,dst_FPN))
-        
-        elif self.process.verbose > 1:
+            # Fall back to a default (one file per sample event) sink
+            self.json_sink_C = json_sink(self.process)
+
+        # Write the sample event to the sink
+        self.json_sink_C._Write_event(item, self.dst_FP_D[item], dst_FN, sample_event, self.record_D['site_id'])
+
+    def _OSSL_csv_FN(self, prefix):
+        """
+        @brief Returns the OSSL csv file name of the current record.
+
+        @param prefix Prefix of the file name.
+        @return The file name.
+        """
+
+        instrument_model__name = self.record_D['instrument_model__name']
 
-            print('✅ %s Json post created successfully: %s' %(item,dst_FPN))
+        if self.process.parameters.procedure == 'wetlab':
+            
+            instrument_model__name = 'wetlab'
+                    
+        return '%s_%s_%s_%s_%s.csv' %(prefix,self.record_D['site_id'], instrument_model__name,
+                                       INVERSE_PREPCODE_D[self.record_D['sample_preparation__name']], 
+                                       self.record_D['sample_analysis_date'])
 
     def _Write_OSSL_csv(self, prefix, column_L, data_L_L):
         """
@@ -1123,15 +1274,7 @@ class common_json_db:
         @return None
         """
 
-        instrument_model__name = self.record_D['instrument_model__name']
-
-        if self.process.parameters.procedure == 'wetlab':
-            
-            instrument_model__name = 'wetlab'
-                    
-        dst_FN = '%s_%s_%s_%s_%s.csv' %(prefix,self.record_D['site_id'], instrument_model__name,
-                                         INVERSE_PREPCODE_D[self.record_D['sample_preparation__name']], 
-                                         self.record_D['sample_analysis_date'])
+        dst_FN = self._OSSL_csv_FN(prefix)
 
         dst_FPN = path.join(self.dst_FP_D['ossl'], dst_FN)
 
@@ -0,0 +1,87 @@
+'''
+Created on 17 October 2026
+
+Indexed store of the point name, position and sample date (coordinate) files
+
+@author: thomasgumbricht
+'''
+
+# Package application imports
+from .fix_params_coords import Coordinates_fix
+
+class coordinate_store:
+    """
+    @class coordinate_store
+    @brief Holds the points of a coordinate file with lowercased records, queried by (pilot_country, pilot_site, point_id).
+
+    @details
+    The coordinate file (process parameter <point_name_position_sampledate_FPN>) is read once by Coordinates_fix.
+    The string values of each point are lowercased when the store is created. A query with the raw
+    (pilot_country, pilot_site, point_id) of a record builds the locus '<country>-<site>_<point>' (lowercase) the
+    first time the tuple is seen; later queries with the same tuple are a single dictionary lookup.
+
+    The store is shared by all processes using the same coordinate file (see job_cache), the returned records
+    must not be altered.
+    """
+
+    def __init__(self, coordinate_D):
+        """
+        @brief Constructor for the coordinate_store class.
+
+        @param coordinate_D Dictionary locus -> point record, see Coordinates_fix.
+
+        @return None
+        """
+
+        self.coordinate_D = coordinate_D
+
+        # Lowercased records: locus -> point record
+        self.record_D = {locus: {item: value.lower() if isinstance(value, str) else value for item, value in point_D.items()}
+                         for locus, point_D in coordinate_D.items()}
+
+        # Resolved queries: (pilot_country, pilot_site, point_id) -> (locus, lowercased record or None)
+        self.query_D = {}
+
+    def _Get(self, pilot_country, pilot_site, point_id):
+        """
+        @brief Returns the locus and the lowercased point record of a record.
+
+        @param pilot_country The pilot country of the record.
+        @param pilot_site The pilot site of the record.
+        @param point_id The point id of the record.
+
+        @return Tuple (locus, point record), the point record is None if the locus is not in the coordinate file.
+        """
+
+        key = (pilot_country, pilot_site, point_id)
+
+        if key not in self.query_D:
+
+            locus = '%s-%s_%s' %(pilot_country.lower(), pilot_site.lower(), point_id.lower())
+
+            self.query_D[key] = (locus, self.record_D.get(locus))
+
+        return self.query_D[key]
+
+def Set_coordinate_store(project_FP, process, job_cache_C=None):
+    """
+    @brief Returns the coordinate store of a process, shared through the job cache if given.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters, with the parameter <point_name_position_sampledate_FPN>.
+    @param job_cache_C Optional job_cache shared by the processes of the run.
+
+    @return The coordinate_store instance, or None if the coordinate file can not be read.
+    """
+
+    if job_cache_C:
+
+        return job_cache_C._Coordinate_store(process.parameters.point_name_position_sampledate_FPN)
+
+    coordinate_D = Coordinates_fix(project_FP, process.parameters.point_name_position_sampledate_FPN)
+
+    if not coordinate_D:
+
+        return None
+
+    return coordinate_store(coordinate_D)
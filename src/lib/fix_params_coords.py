@@ -9,8 +9,10 @@ Updated on 1 Sept 2025 (doxygen comments added)
 # Standard library imports
 from os import path
 
+from itertools import chain
+
 # Package application imports
-from src.utils import  Read_csv, Full_path_locate
+from src.utils import  Read_csv, Read_csv_chunks, Read_csv_mmap_chunks, Full_path_locate
 
 def Parameters_fix(project_FP,method_src_FPN):
     """
@@ -160,7 +162,20 @@ def Coordinates_fix(project_FP,point_name_position_sampledate_FPN):
 
     return coordinate_D
 
-def Data_read(project_FP,data_FPN):
+def Data_read(project_FP,data_FPN, chunk_size=None, memory_map=False, numeric_first_column=None):
+    """
+    @brief Reads a csv data file.
+
+    @param project_FP The project folder path.
+    @param data_FPN Path of the csv data file, relative to the project folder or absolute.
+    @param chunk_size If set, the rows are read lazily in chunks of chunk_size rows (see Read_csv_chunks).
+    @param memory_map If True (and chunk_size is set), the file is memory mapped (see Read_csv_mmap_chunks).
+    @param numeric_first_column With memory_map, the index of the first spectral column, the spectral columns are then
+        parsed from the mapped file (see Read_csv_mmap_chunks).
+
+    @return tuple (column_L, data_L_L), data_L_L is a list of rows or, with chunk_size, an iterator over the rows;
+        None if the file does not exist.
+    """
 
     data_FPN = Full_path_locate(project_FP, data_FPN)
    
@@ -170,6 +185,24 @@ def Data_read(project_FP,data_FPN):
 
         return None
 
+    if chunk_size:
+
+        if memory_map:
+
+            data_pack = Read_csv_mmap_chunks(data_FPN, chunk_size, numeric_first_column=numeric_first_column)
+
+        else:
+
+            data_pack = Read_csv_chunks(data_FPN, chunk_size)
+
+        if not data_pack:
+
+            return None
+
+        column_L, chunk_iter = data_pack
+
+        return (column_L, chain.from_iterable(chunk_iter))
+
     data_pack = Read_csv(data_FPN)
 
     if not data_pack:
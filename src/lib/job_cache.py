@@ -0,0 +1,198 @@
+'''
+Created on 17 October 2026
+
+Job-wide cache of the definition and coordinate files shared by the processes of a Manage_process run
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from os import path, stat
+
+from types import MappingProxyType
+
+# Package application imports
+from src.utils import Dump_json, Full_path_locate, Read_json
+
+from .fix_params_coords import Parameters_fix, Coordinates_fix
+
+from .coordinate_store import coordinate_store
+
+from .version import __version__
+
+class job_cache:
+    """
+    @class job_cache
+    @brief Caches the parsed method (header) definition files and the coordinate files of all processes in a Manage_process run.
+
+    @details
+    The processes of a job often point at the same method definition file. The dictionaries returned by
+    Parameters_fix are cached by the resolved path of the file, and reused as long as the mtime and size of the
+    file are unchanged. The cached dictionaries are returned as read-only mappings (types.MappingProxyType), a
+    process can thus not alter the definitions seen by the next processes.
+
+    The coordinate files (point name, position and sample date) are likewise read once and held as a
+    coordinate_store, shared by all processes using the same file (not written to the cache file).
+
+    With a cache file (the optional argument <job_cache_FPN> of Manage_process), the cache is read when the job
+    starts and written when it is done, and is thus also reused between runs. The cache file is ignored if it was
+    written by another version of the package.
+    """
+
+    def __init__(self, project_FP, cache_FPN=None):
+        """
+        @brief Constructor for the job_cache class, reads the cache file if given.
+
+        @param project_FP The project folder path.
+        @param cache_FPN Optional path of the json cache file, relative to the project folder or absolute.
+
+        @return None
+        """
+
+        self.project_FP = project_FP
+
+        self.cache_FPN = None
+
+        if cache_FPN:
+
+            # The cache file is created when the job is done, only its folder must exist
+            cache_FP, cache_FN = path.split(cache_FPN)
+
+            self.cache_FPN = path.join(Full_path_locate(project_FP, cache_FP, True), cache_FN)
+
+        # Parsed method files: resolved FPN -> {'mtime_ns': int, 'size': int, 'parameters': list of 6 dicts}
+        self.parameters_D = {}
+
+        # Read-only views of the cached dictionaries: resolved FPN -> tuple of 6 MappingProxyType
+        self.parameters_view_D = {}
+
+        # Coordinate files: resolved FPN -> {'mtime_ns': int, 'size': int, 'store': coordinate_store}
+        self.coordinate_D = {}
+
+        self.changed = False
+
+        if self.cache_FPN and path.exists(self.cache_FPN):
+
+            cache_D = Read_json(self.cache_FPN) or {}
+
+            if cache_D.get('version') == __version__:
+
+                self.parameters_D = cache_D['parameters']
+
+    def _Locate(self, FPN):
+        """
+        @brief Resolves the path of a source file and reads its mtime and size.
+
+        @param FPN Path of the file, relative to the project folder or absolute.
+
+        @return Tuple (resolved FPN, mtime_ns, size), or None if the file does not exist (reported).
+        """
+
+        FPN = Full_path_locate(self.project_FP, FPN)
+
+        if not FPN:
+
+            return None
+
+        FPN = path.realpath(FPN)
+
+        file_stat = stat(FPN)
+
+        return FPN, file_stat.st_mtime_ns, file_stat.st_size
+
+    def _Unchanged(self, entry_D, mtime_ns, size):
+        """
+        @brief Checks if a cache entry is valid for a file with the given mtime and size.
+
+        @return True if the entry exists and the file is unchanged, False otherwise.
+        """
+
+        return bool(entry_D) and entry_D['mtime_ns'] == mtime_ns and entry_D['size'] == size
+
+    def _Parameters_fix(self, method_src_FPN):
+        """
+        @brief Returns the parsed method definition file, see Parameters_fix.
+
+        @param method_src_FPN Path of the method definition csv file, relative to the project folder or absolute.
+
+        @return Tuple of 6 read-only dictionaries (parameter, unit, method, equipment, equipment_model and
+            equipment_id), or None if the file can not be read.
+        """
+
+        located = self._Locate(method_src_FPN)
+
+        if not located:
+
+            return None
+
+        FPN, mtime_ns, size = located
+
+        entry_D = self.parameters_D.get(FPN)
+
+        if not self._Unchanged(entry_D, mtime_ns, size):
+
+            data_pack = Parameters_fix(self.project_FP, FPN)
+
+            if not data_pack:
+
+                return None
+
+            entry_D = {'mtime_ns': mtime_ns, 'size': size, 'parameters': list(data_pack)}
+
+            self.parameters_D[FPN] = entry_D
+
+            self.parameters_view_D.pop(FPN, None)
+
+            self.changed = True
+
+        if FPN not in self.parameters_view_D:
+
+            self.parameters_view_D[FPN] = tuple(MappingProxyType(item_D) for item_D in entry_D['parameters'])
+
+        return self.parameters_view_D[FPN]
+
+    def _Coordinate_store(self, point_name_position_sampledate_FPN):
+        """
+        @brief Returns the coordinate store of a coordinate file, read once per job (see Coordinates_fix).
+
+        @param point_name_position_sampledate_FPN Path of the coordinate csv file, relative to the project folder or absolute.
+
+        @return The coordinate_store instance, or None if the file can not be read.
+        """
+
+        located = self._Locate(point_name_position_sampledate_FPN)
+
+        if not located:
+
+            return None
+
+        FPN, mtime_ns, size = located
+
+        entry_D = self.coordinate_D.get(FPN)
+
+        if not self._Unchanged(entry_D, mtime_ns, size):
+
+            coordinate_D = Coordinates_fix(self.project_FP, FPN)
+
+            if not coordinate_D:
+
+                return None
+
+            entry_D = {'mtime_ns': mtime_ns, 'size': size, 'store': coordinate_store(coordinate_D)}
+
+            self.coordinate_D[FPN] = entry_D
+
+        return entry_D['store']
+
+    def _Close(self):
+        """
+        @brief Writes the cache file, if given and changed.
+
+        @return None
+        """
+
+        if self.cache_FPN and self.changed:
+
+            Dump_json(self.cache_FPN, {'version': __version__, 'parameters': self.parameters_D}, indent=None, compact=True, atomic=True)
+
+            self.changed = False
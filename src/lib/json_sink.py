@@ -0,0 +1,614 @@
+'''
+Created on 17 October 2026
+
+Output sink for the sample events assembled by the json_db classes
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from os import getpid, path, replace
+
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from queue import Queue
+
+from threading import Thread
+
+from io import BytesIO
+
+import gzip
+
+import tarfile
+
+import zipfile
+
+# Package application imports
+from src.utils import Encode_json, Write_csv_header_data, Write_json_text
+
+# Default variables
+JSON_OUTPUT_MODES = ['file', 'ndjson', 'zip', 'tar']
+
+# Output modes where all sample events of a destination are appended to a single file
+APPEND_OUTPUT_MODES = ['ndjson', 'zip', 'tar']
+
+ZIP_COMPRESSION_D = {'none': zipfile.ZIP_STORED, 'stored': zipfile.ZIP_STORED, 'deflated': zipfile.ZIP_DEFLATED,
+                     'bzip2': zipfile.ZIP_BZIP2, 'lzma': zipfile.ZIP_LZMA}
+
+TAR_COMPRESSION_D = {'none': '', 'gz': 'gz', 'bz2': 'bz2', 'xz': 'xz'}
+
+# Fixed time stamps of the archive members (and the gzip header), a re-import of the same data gives identical archives
+ZIP_MEMBER_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+TAR_MEMBER_MTIME = 0
+
+WRITER_MODES = ['thread', 'process']
+
+NDJSON_INDEX_COLUMN_L = ['record', 'offset', 'length']
+
+def Encode_sample_event(sample_event, output_mode, compact=False, significant_digits=None, cache_D=None):
+    """
+    @brief Encodes a sample event to a json string.
+
+    @param sample_event Dictionary containing the sample event.
+    @param output_mode 'ndjson' (single line json), or 'file', 'zip' or 'tar' (indented json unless compact).
+    @param compact If True, the json is encoded without indentation and whitespace.
+    @param significant_digits If set, number of significant digits for floats in numeric lists.
+    @param cache_D Optional cache of formatted numeric lists, see Encode_json.
+
+    @return The encoded json string.
+    """
+
+    if output_mode == 'ndjson':
+
+        return Encode_json(sample_event, compact=True, significant_digits=significant_digits, cache_D=cache_D) + '\n'
+
+    return Encode_json(sample_event, indent=2, compact=compact, significant_digits=significant_digits, cache_D=cache_D)
+
+def Encode_write_sample_event(dst_FPN, sample_event, compact=False, significant_digits=None, atomic=False, skip_unchanged=False):
+    """
+    @brief Encodes a sample event and writes it to a json file, used by the writer process pool.
+
+    @param dst_FPN Full path name of the json file to write.
+    @param sample_event Dictionary containing the sample event.
+    @param compact If True, the json is encoded without indentation and whitespace.
+    @param significant_digits If set, number of significant digits for floats in numeric lists.
+    @param atomic If True, writes to a temporary file that is renamed.
+    @param skip_unchanged If True, leaves an existing file with identical content untouched.
+
+    @return The write status ('written', 'changed' or 'skipped') if successful, None otherwise.
+    """
+
+    json_text = Encode_sample_event(sample_event, 'file', compact, significant_digits)
+
+    return Write_json_text(dst_FPN, json_text, atomic=atomic, skip_unchanged=skip_unchanged)
+
+class json_sink:
+    """
+    @class json_sink
+    @brief Receives the assembled sample events and writes them to the destination folders.
+
+    @details
+    The json_sink class separates the writing of sample events from their assembly. The output mode is
+    set with the optional process parameter <json_output>:
+    - 'file' (default): each sample event is written to its own pretty-printed json file.
+    - 'ndjson': sample events are appended as single lines to one newline delimited json file per
+      destination folder (format) and site. A small csv index with the byte offset and length of each
+      record is written next to the ndjson file when the sink is closed.
+    - 'zip' or 'tar': each sample event is written as a json member of a single zip or tar archive per destination
+      folder (<destination folder>.zip, .tar, .tar.gz etc.), the compression is set with the optional process
+      parameter <archive_compression> (zip: 'deflated' (default), 'stored', 'bzip2' or 'lzma'; tar: 'none' (default),
+      'gz', 'bz2' or 'xz'). The archive members have a fixed time stamp, the archives of a re-import of the same data
+      are identical.
+
+    With the optional process parameter <writer_workers> larger than 0, the encoding and writing is taken off
+    the main loop by a background writer:
+    - <writer_mode> 'thread' (default): sample events are encoded in the main loop and written by a pool of
+      threads, overlapping the disk writes with the processing of the next records.
+    - <writer_mode> 'process': sample events are handed to a pool of processes that both encode and write them,
+      overlapping also the json serialisation with the processing of the next records.
+    The pending events are held in a bounded queue (<writer_queue_size>, default 4 x writer_workers); the main
+    loop blocks when the queue is full. A single writer thread collects the results in submission order and
+    appends to the ndjson files and archives. Any error is reported and raised when the sink is closed.
+
+    The encoding is set with the optional process parameters <json_compact> (true/false, default false) and
+    <float_significant_digits> (default full precision) for the floats in numeric lists (e.g. spectra).
+    Numeric lists encoded in the main loop are cached, the spectra shared by the ai4sh and xspectre formats of
+    a sample event are thus only formatted once (not in writer_mode 'process').
+
+    With the optional process parameter <atomic_write> set to true, files are written to a temporary file that is
+    renamed when complete. With <skip_unchanged> set to true, existing json files with identical content are not
+    rewritten (file mode only). The number of written, changed and skipped files is reported when the sink is closed.
+
+    A single sink is created for each process and must be closed with _Close() when the process is done.
+    """
+
+    def __init__(self, process):
+        """
+        @brief Constructor for the json_sink class.
+
+        @param process An object containing process parameters, expected to have a 'parameters' attribute.
+
+        @return None
+        """
+
+        self.verbose = process.verbose
+
+        parameters_D = process.parameters.__dict__
+
+        self.output_mode = parameters_D['json_output'] if 'json_output' in parameters_D else 'file'
+
+        if self.output_mode not in JSON_OUTPUT_MODES:
+
+            print (' ⚠️ WARNING - json_output <%s> not recognised, using <file>' %(self.output_mode))
+
+            self.output_mode = 'file'
+
+        # Open ndjson files and archives: dst_FPN -> {'file': file handle or archive, 'tmp_FPN': str, 'offset': int, 'index': list}
+        self.append_D = {}
+
+        if self.output_mode in ['zip', 'tar']:
+
+            self._Set_archive_compression(parameters_D)
+
+        # Json encoding options, see Encode_json
+        self.encoding_D = {'compact': parameters_D['json_compact'] if 'json_compact' in parameters_D else False,
+                           'significant_digits': int(parameters_D['float_significant_digits']) if 'float_significant_digits' in parameters_D else None}
+
+        # Json writing options, see Write_json_text
+        self.write_D = {'atomic': parameters_D['atomic_write'] if 'atomic_write' in parameters_D else False,
+                        'skip_unchanged': parameters_D['skip_unchanged'] if 'skip_unchanged' in parameters_D else False}
+
+        self.write_count_D = {'written': 0, 'changed': 0, 'skipped': 0}
+
+        # Formatted numeric lists shared between the formats of a sample event, see Encode_json
+        self.encode_cache_D = {}
+
+        self.writer_workers = int(parameters_D['writer_workers']) if 'writer_workers' in parameters_D else 0
+
+        self.writer_mode = parameters_D['writer_mode'] if 'writer_mode' in parameters_D else 'thread'
+
+        if self.writer_mode not in WRITER_MODES:
+
+            print (' ⚠️ WARNING - writer_mode <%s> not recognised, using <thread>' %(self.writer_mode))
+
+            self.writer_mode = 'thread'
+
+        self.error_L = []
+
+        # Set by Set_build_manifest in incremental mode, records the outputs of each source
+        self.manifest_C = None
+
+        # Set by the row workers (see Loop_csv_rows), collects the encoded sample events instead of writing them
+        self.record_L = None
+
+        self.writer_pool = None
+
+        if self.writer_workers > 0:
+
+            self._Start_writer(parameters_D)
+
+    def _Set_archive_compression(self, parameters_D):
+        """
+        @brief Sets the archive compression and the archive file extension.
+
+        @return None
+        """
+
+        compression_D = ZIP_COMPRESSION_D if self.output_mode == 'zip' else TAR_COMPRESSION_D
+
+        default_compression = 'deflated' if self.output_mode == 'zip' else 'none'
+
+        compression = parameters_D['archive_compression'] if 'archive_compression' in parameters_D else default_compression
+
+        if compression not in compression_D:
+
+            print (' ⚠️ WARNING - archive_compression <%s> not recognised for %s, using <%s>' %(compression, self.output_mode, default_compression))
+
+            compression = default_compression
+
+        self.archive_compression = compression_D[compression]
+
+        if self.output_mode == 'zip':
+
+            self.archive_ext = 'zip'
+
+        else:
+
+            self.archive_ext = 'tar.%s' %(self.archive_compression) if self.archive_compression else 'tar'
+
+    def _Start_writer(self, parameters_D):
+        """
+        @brief Starts the writer pool, the bounded queue and the thread collecting the written results.
+
+        @return None
+        """
+
+        queue_size = int(parameters_D['writer_queue_size']) if 'writer_queue_size' in parameters_D else 4*self.writer_workers
+
+        self.writer_queue = Queue(maxsize=max(queue_size, 1))
+
+        if self.writer_mode == 'process':
+
+            self.writer_pool = ProcessPoolExecutor(max_workers=self.writer_workers)
+
+        elif self.output_mode == 'file':
+
+            self.writer_pool = ThreadPoolExecutor(max_workers=self.writer_workers)
+
+        # Thread mode with ndjson or archive output only requires the collecting writer thread
+
+        self.writer_thread = Thread(target=self._Collect_written, daemon=True)
+
+        self.writer_thread.start()
+
+    def _Write_event(self, item, dst_FP, dst_FN, sample_event, site_id):
+        """
+        @brief Writes a single sample event using the output mode of the sink.
+
+        @param item Output format ('ai4sh' or 'xspectre'), only used for messages.
+        @param dst_FP Destination folder for the format.
+        @param dst_FN File name of the sample event (also used as record name in ndjson mode and member name in archives).
+        @param sample_event Dictionary containing the sample event.
+        @param site_id Site identifier, used for naming the ndjson files.
+
+        @return True if successful (or queued), None otherwise.
+        """
+
+        if self.output_mode == 'ndjson':
+
+            dst_FPN = path.join(dst_FP, '%s.ndjson' %(site_id.lower()))
+
+        elif self.output_mode in ['zip', 'tar']:
+
+            dst_FPN = '%s.%s' %(dst_FP.rstrip('/'), self.archive_ext)
+
+        else:
+
+            dst_FPN = path.join(dst_FP, dst_FN)
+
+        if self.manifest_C:
+
+            self.manifest_C._Add_output(dst_FPN)
+
+        if self.writer_workers > 0:
+
+            return self._Queue_event(item, dst_FPN, dst_FN, sample_event)
+
+        if self.output_mode in APPEND_OUTPUT_MODES:
+
+            try:
+
+                json_text = Encode_sample_event(sample_event, self.output_mode, **self.encoding_D, cache_D=self.encode_cache_D)
+
+            except (TypeError, ValueError):
+
+                print('❌ %s Json post creation failed: %s (%s)' %(item, dst_FN, dst_FPN))
+
+                return None
+
+            return self._Append_record(item, dst_FPN, dst_FN, json_text)
+
+        try:
+
+            json_text = Encode_sample_event(sample_event, self.output_mode, **self.encoding_D, cache_D=self.encode_cache_D)
+
+        except (TypeError, ValueError):
+
+            json_text = None
+
+        if json_text is not None and self.record_L is not None:
+
+            self.record_L.append((item, dst_FPN, dst_FN, json_text))
+
+            return True
+
+        status = Write_json_text(dst_FPN, json_text, 0, **self.write_D) if json_text is not None else None
+
+        if not status:
+
+            print('❌ %s Json post creation failed: %s' %(item,dst_FPN))
+
+            return None
+
+        self._Count_written(item, dst_FPN, status)
+
+        return True
+
+    def _Queue_event(self, item, dst_FPN, dst_FN, sample_event):
+        """
+        @brief Hands a sample event to the background writer, blocks if the writer queue is full.
+
+        @details
+        In thread mode the sample event is encoded before it is queued, the sample event can thus safely be
+        altered by the main loop afterwards. In process mode the sample event is pickled on submission.
+
+        @return True if the event was queued, None if the encoding failed.
+        """
+
+        if self.writer_mode == 'process':
+
+            if self.output_mode in APPEND_OUTPUT_MODES:
+
+                result = self.writer_pool.submit(Encode_sample_event, sample_event, self.output_mode, **self.encoding_D)
+
+            else:
+
+                result = self.writer_pool.submit(Encode_write_sample_event, dst_FPN, sample_event, **self.encoding_D, **self.write_D)
+
+        else:
+
+            try:
+
+                result = Encode_sample_event(sample_event, self.output_mode, **self.encoding_D, cache_D=self.encode_cache_D)
+
+            except (TypeError, ValueError):
+
+                print('❌ %s Json post creation failed: %s (%s)' %(item, dst_FN, dst_FPN))
+
+                return None
+
+            if self.output_mode == 'file':
+
+                result = self.writer_pool.submit(Write_json_text, dst_FPN, result, 0, **self.write_D)
+
+        self.writer_queue.put((item, dst_FPN, dst_FN, result))
+
+        return True
+
+    def _Collect_written(self):
+        """
+        @brief Writer thread, collects the queued events in submission order until it receives None.
+
+        @details
+        Any error of an event (encoding, writing, opening or appending to an ndjson file or archive) is collected
+        in self.error_L and the thread continues with the next event, the queue is thus always drained and the
+        main loop never blocks on a full queue. The errors are raised by _Close.
+
+        @return None
+        """
+
+        while True:
+
+            job = self.writer_queue.get()
+
+            if job is None:
+
+                break
+
+            item, dst_FPN, dst_FN, result = job
+
+            try:
+
+                if isinstance(result, Future):
+
+                    result = result.result()
+
+                if self.output_mode in APPEND_OUTPUT_MODES:
+
+                    self._Append_record(item, dst_FPN, dst_FN, result)
+
+                elif not result:
+
+                    self.error_L.append((dst_FPN, None))
+
+                else:
+
+                    self._Count_written(item, dst_FPN, result)
+
+            except Exception as e:
+
+                self.error_L.append((dst_FPN, e))
+
+    def _Count_written(self, item, dst_FPN, status):
+        """
+        @brief Counts the write status ('written', 'changed' or 'skipped') of a json file.
+
+        @return None
+        """
+
+        self.write_count_D[status] += 1
+
+        if self.verbose > 1:
+
+            if status == 'skipped':
+
+                print('✅ %s Json post unchanged: %s' %(item,dst_FPN))
+
+            else:
+
+                print('✅ %s Json post created successfully: %s' %(item,dst_FPN))
+
+    def _Open_append(self, dst_FPN):
+        """
+        @brief Opens an ndjson file or archive, written to a temporary file if atomic.
+
+        @return None
+        """
+
+        # Each run regenerates the complete ndjson file or archive
+        tmp_FPN = '%s.%s.tmp' %(dst_FPN, getpid()) if self.write_D['atomic'] else dst_FPN
+
+        # Streams under the archive, closed after it
+        stream_L = []
+
+        if self.output_mode == 'zip':
+
+            append_file = zipfile.ZipFile(tmp_FPN, 'w', compression=self.archive_compression)
+
+        elif self.output_mode == 'tar' and self.archive_compression == 'gz':
+
+            # The gzip header holds a time stamp and file name, the stream is opened without them
+            raw_file = open(tmp_FPN, 'wb')
+
+            gzip_file = gzip.GzipFile(filename='', mode='wb', fileobj=raw_file, mtime=TAR_MEMBER_MTIME)
+
+            append_file = tarfile.open(fileobj=gzip_file, mode='w')
+
+            stream_L = [gzip_file, raw_file]
+
+        elif self.output_mode == 'tar':
+
+            append_file = tarfile.open(tmp_FPN, 'w:%s' %(self.archive_compression))
+
+        else:
+
+            append_file = open(tmp_FPN, 'wb')
+
+        self.append_D[dst_FPN] = {'file': append_file, 'stream_L': stream_L, 'tmp_FPN': tmp_FPN, 'offset': 0, 'index': []}
+
+    def _Append_record(self, item, dst_FPN, dst_FN, json_text):
+        """
+        @brief Appends an encoded sample event as a line to an ndjson file or as a member to an archive.
+
+        @details
+        In a row worker (see Loop_csv_rows) the records are collected in self.record_L, and written in row order
+        by the sink of the main process.
+
+        @return True
+        """
+
+        if self.record_L is not None:
+
+            self.record_L.append((item, dst_FPN, dst_FN, json_text))
+
+        else:
+
+            self._Write_record(dst_FPN, dst_FN, json_text)
+
+        if self.verbose > 1:
+
+            print('✅ %s Json post appended: %s (%s)' %(item, dst_FN, dst_FPN))
+
+        return True
+
+    def _Write_collected(self, item, dst_FPN, dst_FN, json_text):
+        """
+        @brief Writes an encoded sample event collected by a row worker (see Loop_csv_rows).
+
+        @details
+        Json files are written by the background writer if set, ndjson records and archive members are appended.
+
+        @param item Output format ('ai4sh' or 'xspectre'), only used for messages.
+        @param dst_FPN Full path name of the json file, ndjson file or archive.
+        @param dst_FN File name of the sample event.
+        @param json_text The encoded sample event.
+
+        @return None
+        """
+
+        if self.output_mode in APPEND_OUTPUT_MODES:
+
+            self._Write_record(dst_FPN, dst_FN, json_text)
+
+        elif self.writer_workers > 0:
+
+            self.writer_queue.put((item, dst_FPN, dst_FN, self.writer_pool.submit(Write_json_text, dst_FPN, json_text, 0, **self.write_D)))
+
+        else:
+
+            status = Write_json_text(dst_FPN, json_text, 0, **self.write_D)
+
+            if status:
+
+                self._Count_written(item, dst_FPN, status)
+
+            else:
+
+                print('❌ %s Json post creation failed: %s' %(item,dst_FPN))
+
+    def _Write_record(self, dst_FPN, dst_FN, json_text):
+        """
+        @brief Writes an encoded sample event to an ndjson file or archive, opened at the first record.
+
+        @return None
+        """
+
+        if dst_FPN not in self.append_D:
+
+            self._Open_append(dst_FPN)
+
+        append = self.append_D[dst_FPN]
+
+        record = json_text.encode('utf-8')
+
+        if self.output_mode == 'zip':
+
+            member = zipfile.ZipInfo(dst_FN, date_time=ZIP_MEMBER_DATE_TIME)
+
+            member.external_attr = 0o600 << 16
+
+            append['file'].writestr(member, record, compress_type=self.archive_compression)
+
+        elif self.output_mode == 'tar':
+
+            member = tarfile.TarInfo(dst_FN)
+
+            member.size = len(record)
+
+            member.mtime = TAR_MEMBER_MTIME
+
+            append['file'].addfile(member, BytesIO(record))
+
+        else:
+
+            append['file'].write(record)
+
+        append['index'].append([path.splitext(dst_FN)[0], append['offset'], len(record)])
+
+        append['offset'] += len(record)
+
+    def _Close(self):
+        """
+        @brief Flushes the background writer, closes all ndjson files and archives and writes the ndjson offset indexes.
+
+        @exception RuntimeError if any sample event failed to be written by the background writer.
+
+        @return None
+        """
+
+        if self.writer_workers > 0:
+
+            self.writer_queue.put(None)
+
+            self.writer_thread.join()
+
+            if self.writer_pool:
+
+                self.writer_pool.shutdown(wait=True)
+
+        for dst_FPN in self.append_D:
+
+            self.append_D[dst_FPN]['file'].close()
+
+            for stream in self.append_D[dst_FPN]['stream_L']:
+
+                stream.close()
+
+            if self.append_D[dst_FPN]['tmp_FPN'] != dst_FPN:
+
+                replace(self.append_D[dst_FPN]['tmp_FPN'], dst_FPN)
+
+            if self.output_mode == 'ndjson':
+
+                Write_csv_header_data('%s.idx.csv' %(dst_FPN), NDJSON_INDEX_COLUMN_L, self.append_D[dst_FPN]['index'])
+
+            if self.verbose:
+
+                print('✅ %s file closed: %s (%s records)' %(self.output_mode, dst_FPN, len(self.append_D[dst_FPN]['index'])))
+
+        self.append_D = {}
+
+        if self.verbose and sum(self.write_count_D.values()):
+
+            print('✅ Json posts: %(written)s written, %(changed)s changed, %(skipped)s skipped (unchanged)' %(self.write_count_D))
+
+        if self.error_L:
+
+            for dst_FPN, e in self.error_L:
+
+                print('❌ Json post creation failed: %s (%s)' %(dst_FPN, e))
+
+            dst_FPN, e = self.error_L[0]
+
+            raise RuntimeError('%s json posts failed to be written, first: %s' %(len(self.error_L), dst_FPN)) from e
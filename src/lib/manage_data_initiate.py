@@ -48,8 +48,11 @@ def Initiate_process(user_project_file, process_file):
         # Check and structure the process files
         json_job_D = Structure_processes(user_default_params_D, process_file_FPN_L)
 
+        # Optional json file persisting the parsed method files between runs (see job_cache)
+        job_cache_FPN = user_default_params_D['job_cache'] if 'job_cache' in user_default_params_D else None
+
         # Run the structured processes
-        Manage_process(user_default_params_D['project_path'],json_job_D)
+        Manage_process(user_default_params_D['project_path'],json_job_D, job_cache_FPN)
 
         print ('Done')
 
@@ -16,12 +16,101 @@ from src.lib import Parameters_fix, Data_read, Process_ai4sh_csv, Process_neospe
 
 from src.utils import Full_path_locate, Remove_path
 
-def Manage_process(project_FP,json_job_D):
+from .job_cache import job_cache
+
+from .FOSS_DS2500_csv_data import SPECTRA_FIRST_COLUMN as DS2500_SPECTRA_FIRST_COLUMN
+
+from .NeoSpectra_csv_data import SPECTRA_FIRST_COLUMN as NEOSPECTRA_SPECTRA_FIRST_COLUMN
+
+# Default variables
+
+# Number of csv data rows read at a time by the memory mapped reader if csv_chunk_size is not set, see Csv_read_options
+DEFAULT_CSV_CHUNK_SIZE = 1000
+
+CSV_READERS = ['text', 'mmap']
+
+def Csv_read_options(process, spectra_first_column=None):
+    """
+    @brief Returns the Data_read options from the optional process parameters <csv_chunk_size> and <csv_reader>.
+
+    @details
+    Without <csv_chunk_size> (or with 0) the complete csv file is read before processing. The memory mapped
+    reader always reads in chunks, of DEFAULT_CSV_CHUNK_SIZE rows if <csv_chunk_size> is not set, and parses
+    the spectral columns directly from the mapped file.
+
+    @param process An object containing process parameters.
+    @param spectra_first_column Index of the first spectral column of the spectra csv importers, None otherwise.
+    @return Dictionary {'chunk_size': number of rows read at a time, or None to read the complete file before
+        processing, 'memory_map': True if <csv_reader> is 'mmap', 'numeric_first_column': spectra_first_column}.
+    """
+
+    parameters_D = process.parameters.__dict__
+
+    chunk_size = int(parameters_D['csv_chunk_size']) if 'csv_chunk_size' in parameters_D and parameters_D['csv_chunk_size'] else 0
+
+    csv_reader = parameters_D['csv_reader'] if 'csv_reader' in parameters_D else 'text'
+
+    if csv_reader not in CSV_READERS:
+
+        print (' ⚠️ WARNING - csv_reader <%s> not recognised, using <text>' %(csv_reader))
+
+        csv_reader = 'text'
+
+    if csv_reader == 'mmap' and chunk_size <= 0:
+
+        if 'csv_chunk_size' in parameters_D:
+
+            print (' ⚠️ WARNING - csv_reader <mmap> requires a csv_chunk_size, using %s' %(DEFAULT_CSV_CHUNK_SIZE))
+
+        chunk_size = DEFAULT_CSV_CHUNK_SIZE
+
+    return {'chunk_size': chunk_size if chunk_size > 0 else None, 'memory_map': csv_reader == 'mmap',
+            'numeric_first_column': spectra_first_column}
+
+def Method_parameters_fix(project_FP, process, job_cache_C=None):
+    """
+    @brief Returns the parsed method definition file of a process, from the job cache if given.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters.
+    @param job_cache_C Optional job_cache shared by the processes of the run.
+
+    @return Tuple of 6 dictionaries, see Parameters_fix, read-only if cached; None if the file can not be read.
+    """
+
+    if job_cache_C:
+
+        return job_cache_C._Parameters_fix(process.parameters.method_src_FPN)
+
+    return Parameters_fix(project_FP, process.parameters.method_src_FPN)
+
+def Manage_process(project_FP,json_job_D, job_cache_FPN=None):
     """
     Manages the processing of JSON defined jobs by iterating through the job dictionary,
     extracting relevant information, and initiating the appropriate processing functions.
 
     @param json_job_D Dictionary containing JSON job definitions and their associated processes.
+    @param job_cache_FPN Optional json file persisting the parsed method files between runs, see job_cache.
+    @return None
+    """
+
+    # The method files parsed once for all processes of the run
+    job_cache_C = job_cache(project_FP, job_cache_FPN)
+
+    try:
+
+        Manage_jobs(project_FP, json_job_D, job_cache_C)
+
+    finally:
+
+        job_cache_C._Close()
+
+def Manage_jobs(project_FP, json_job_D, job_cache_C):
+    """
+    Runs the processes of the JSON defined jobs, see Manage_process.
+
+    @param json_job_D Dictionary containing JSON job definitions and their associated processes.
+    @param job_cache_C The job_cache shared by all processes.
     @return None
     """
     for job in json_job_D:
@@ -42,16 +131,25 @@ def Manage_process(project_FP,json_job_D):
  
             sub_process_id = json_job_D[job][p_nr].process_S.process.sub_process_id
 
-            if json_job_D[job][p_nr].process_S.process.overwrite:
+            process_parameters_D = json_job_D[job][p_nr].process_S.process.parameters.__dict__
+
+            if 'incremental' in process_parameters_D and process_parameters_D['incremental']:
+
+                # The build manifest replaces only new or changed outputs and removes orphaned outputs
+                msg = '\n    Running process nr: %s %s (incremental)' %(p_nr,
+                    sub_process_id)
+
+            elif json_job_D[job][p_nr].process_S.process.overwrite:
 
                 msg = '\n    Running process nr: %s %s (overwriting)' %(p_nr, 
                     sub_process_id)
 
                 for item in ['ai4sh','xspectre']:
 
-                    dst_FP= '%s_%s' %(json_job_D[job][p_nr].process_S.process.parameters.dst_FP,item)
+                    # Same destination folder structure as in common_json_db._Set_dst_FP
+                    dst_FP, method_FP = path.split(json_job_D[job][p_nr].process_S.process.parameters.dst_FP)
 
-                    dst_FP = Full_path_locate(project_FP, dst_FP, True)
+                    dst_FP = Full_path_locate(project_FP, path.join(dst_FP, item, method_FP), True)
 
                     Remove_path(dst_FP)
 
@@ -65,19 +163,19 @@ def Manage_process(project_FP,json_job_D):
             # Redirect process parameters to the corresponding package
             if sub_process_id == 'import_ai4sh_csv':
 
-                Import_ai4sh_csv(project_FP,json_job_D[job][p_nr].process_S.process)
+                Import_ai4sh_csv(project_FP,json_job_D[job][p_nr].process_S.process, job_cache_C)
 
             elif sub_process_id == 'import_xspectre_json_v089':
 
-                Import_xspectre_json_v089(project_FP,json_job_D[job][p_nr].process_S.process)
+                Import_xspectre_json_v089(project_FP,json_job_D[job][p_nr].process_S.process, job_cache_C)
 
             elif sub_process_id == 'import_neospectra_csv':
 
-                Import_neospectra_csv(project_FP,json_job_D[job][p_nr].process_S.process)
+                Import_neospectra_csv(project_FP,json_job_D[job][p_nr].process_S.process, job_cache_C)
 
             elif sub_process_id == 'import_ds2500_csv':
 
-                Import_ds2500_csv(project_FP,json_job_D[job][p_nr].process_S.process)
+                Import_ds2500_csv(project_FP,json_job_D[job][p_nr].process_S.process, job_cache_C)
 
             else:
                 
@@ -90,10 +188,10 @@ def Manage_process(project_FP,json_job_D):
 
                 return
   
-def Import_ai4sh_csv(project_FP,process):
+def Import_ai4sh_csv(project_FP,process, job_cache_C=None):
 
     # Check and read the methodWARNING sub_process_id csv file
-    data_pack = Parameters_fix(project_FP,process.parameters.method_src_FPN)
+    data_pack = Method_parameters_fix(project_FP, process, job_cache_C)
  
     if not data_pack:
 
@@ -104,8 +202,8 @@ def Import_ai4sh_csv(project_FP,process):
     # Disentangle the data pack into its components
     parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D = data_pack
 
-    # Check and read the data csv file
-    data_pack = Data_read(project_FP,process.parameters.data_src_FPN)
+    # Check and read the data csv file, the rows are read lazily in chunks
+    data_pack = Data_read(project_FP,process.parameters.data_src_FPN, **Csv_read_options(process))
 
     if not data_pack:
 
@@ -116,9 +214,9 @@ def Import_ai4sh_csv(project_FP,process):
     column_L, data_L_L = data_pack
 
     # Loop all rows in the csv file
-    Process_ai4sh_csv(project_FP, process, column_L, data_L_L, parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D)
+    Process_ai4sh_csv(project_FP, process, column_L, data_L_L, parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, job_cache_C=job_cache_C)
     
-def Import_xspectre_json_v089(project_FP,process):
+def Import_xspectre_json_v089(project_FP,process, job_cache_C=None):
     """
     @brief Imports and processes xspectre JSON data v089 file for AI4SH.
 
@@ -133,9 +231,9 @@ def Import_xspectre_json_v089(project_FP,process):
     from src.lib import Process_xspectre_json_v089
 
     # Check and read the method csv file
-    Process_xspectre_json_v089(project_FP, process)
+    Process_xspectre_json_v089(project_FP, process, job_cache_C)
 
-def Import_neospectra_csv(project_FP,process):
+def Import_neospectra_csv(project_FP,process, job_cache_C=None):
     """
     @brief Imports and processes NeoSpectra JSON data file for AI4SH.
 
@@ -147,7 +245,7 @@ def Import_neospectra_csv(project_FP,process):
     """
 
     # Check and read the methodWARNING sub_process_id csv file
-    data_pack = Parameters_fix(project_FP,process.parameters.method_src_FPN)
+    data_pack = Method_parameters_fix(project_FP, process, job_cache_C)
  
     if not data_pack:
 
@@ -158,8 +256,8 @@ def Import_neospectra_csv(project_FP,process):
     # Disentangle the data pack into its components
     parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D = data_pack
 
-    # Check and read the data csv file
-    data_pack = Data_read(project_FP,process.parameters.data_src_FPN)
+    # Check and read the data csv file, the rows are read lazily in chunks
+    data_pack = Data_read(project_FP,process.parameters.data_src_FPN, **Csv_read_options(process, NEOSPECTRA_SPECTRA_FIRST_COLUMN))
 
     if not data_pack:
 
@@ -170,12 +268,12 @@ def Import_neospectra_csv(project_FP,process):
     column_L, data_L_L = data_pack
 
     # Loop all rows in the csv file
-    Process_neospectra_csv(project_FP, process, column_L, data_L_L, parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D)
+    Process_neospectra_csv(project_FP, process, column_L, data_L_L, parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, job_cache_C=job_cache_C)
 
-def Import_ds2500_csv(project_FP,process):
+def Import_ds2500_csv(project_FP,process, job_cache_C=None):
 
      # Check and read the methodWARNING sub_process_id csv file
-    data_pack = Parameters_fix(project_FP,process.parameters.method_src_FPN)
+    data_pack = Method_parameters_fix(project_FP, process, job_cache_C)
  
     if not data_pack:
 
@@ -186,8 +284,8 @@ def Import_ds2500_csv(project_FP,process):
     # Disentangle the data pack into its components
     parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D = data_pack
 
-    # Check and read the data csv file
-    data_pack = Data_read(project_FP,process.parameters.data_src_FPN)
+    # Check and read the data csv file, the rows are read lazily in chunks
+    data_pack = Data_read(project_FP,process.parameters.data_src_FPN, **Csv_read_options(process, DS2500_SPECTRA_FIRST_COLUMN))
 
     if not data_pack:
 
@@ -198,5 +296,5 @@ def Import_ds2500_csv(project_FP,process):
     column_L, data_L_L = data_pack
 
     # Loop all rows in the csv file
-    Process_ds2500_csv(project_FP, process, column_L, data_L_L, parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D)
+    Process_ds2500_csv(project_FP, process, column_L, data_L_L, parameter_D, unit_D, method_D, equipment_D, equipment_model_D, equipment_id_D, job_cache_C=job_cache_C)
 
@@ -0,0 +1,140 @@
+'''
+Created on 17 October 2026
+
+Streaming writer of interpolated spectra to OSSL (Open Soil Spectral Library) csv files
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from os import getpid, path, replace
+
+import csv
+
+# Package application imports
+from src.utils import Full_path_locate
+
+class ossl_csv_writer:
+    """
+    @class ossl_csv_writer
+    @brief Appends the interpolated spectra of a process to OSSL csv files, one row per sample event.
+
+    @details
+    With the optional process parameter <ossl_csv> set to true, the spectra are interpolated to the OSSL wavelength
+    grid and written to csv files in the folder <ossl> next to the ai4sh and xspectre destination folders. Each
+    csv file is opened once, the header (the metadata keys and the wavelength columns wl.<nm>) is written when the
+    file is opened and the rows are appended as they are produced; no rows are held in memory.
+
+    With the process parameter <atomic_write> set to true, the files are written to temporary files that are
+    renamed when the writer is closed.
+    """
+
+    def __init__(self, project_FP, process, key_L, wavelength_L):
+        """
+        @brief Constructor for the ossl_csv_writer class, creates the destination folder.
+
+        @param project_FP The project folder path.
+        @param process An object containing process parameters, expected to have a 'parameters' attribute.
+        @param key_L List of the record keys written before the spectra.
+        @param wavelength_L List of the wavelengths (nm) of the interpolated spectra.
+
+        @return None
+        """
+
+        self.verbose = process.verbose
+
+        parameters_D = process.parameters.__dict__
+
+        self.atomic = parameters_D['atomic_write'] if 'atomic_write' in parameters_D else False
+
+        dst_FP, method_FP = path.split(process.parameters.dst_FP)
+
+        self.dst_FP = Full_path_locate(project_FP, path.join(dst_FP, 'ossl', method_FP), True)
+
+        self.key_L = key_L
+
+        self.header_L = key_L + ['wl.%d' %(wavelength) for wavelength in wavelength_L]
+
+        # Open csv files: dst_FPN -> {'file': file handle, 'writer': csv writer, 'tmp_FPN': str, 'n_rows': int}
+        self.csv_D = {}
+
+    def _Open(self, dst_FPN):
+        """
+        @brief Opens a csv file and writes the header.
+
+        @return None
+        """
+
+        tmp_FPN = '%s.%s.tmp' %(dst_FPN, getpid()) if self.atomic else dst_FPN
+
+        csv_file = open(tmp_FPN, 'w', newline='')
+
+        csv_writer = csv.writer(csv_file, lineterminator='\n')
+
+        csv_writer.writerow(self.header_L)
+
+        self.csv_D[dst_FPN] = {'file': csv_file, 'writer': csv_writer, 'tmp_FPN': tmp_FPN, 'n_rows': 0}
+
+    def _Write_row(self, dst_FN, record_D, value_A):
+        """
+        @brief Appends a sample event to a csv file.
+
+        @param dst_FN File name of the csv file, the file is opened at the first row.
+        @param record_D Dictionary holding the values of the keys.
+        @param value_A Array of the interpolated spectrum.
+
+        @return None
+        """
+
+        dst_FPN = path.join(self.dst_FP, dst_FN)
+
+        if dst_FPN not in self.csv_D:
+
+            self._Open(dst_FPN)
+
+        csv_D = self.csv_D[dst_FPN]
+
+        csv_D['writer'].writerow([record_D[item] for item in self.key_L] + value_A.tolist())
+
+        csv_D['n_rows'] += 1
+
+    def _Close(self):
+        """
+        @brief Closes all csv files.
+
+        @return None
+        """
+
+        for dst_FPN in self.csv_D:
+
+            csv_D = self.csv_D[dst_FPN]
+
+            csv_D['file'].close()
+
+            if csv_D['tmp_FPN'] != dst_FPN:
+
+                replace(csv_D['tmp_FPN'], dst_FPN)
+
+            if self.verbose:
+
+                print('✅ OSSL csv closed: %s (%s rows)' %(dst_FPN, csv_D['n_rows']))
+
+        self.csv_D = {}
+
+def Set_ossl_csv_writer(project_FP, process, key_L, wavelength_L):
+    """
+    @brief Creates the OSSL csv writer of a process if the process parameter <ossl_csv> is true.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters.
+    @param key_L List of the record keys written before the spectra.
+    @param wavelength_L List of the wavelengths (nm) of the interpolated spectra.
+
+    @return The ossl_csv_writer instance, or None if no OSSL csv is written.
+    """
+
+    if not ('ossl_csv' in process.parameters.__dict__ and process.parameters.ossl_csv):
+
+        return None
+
+    return ossl_csv_writer(project_FP, process, key_L, wavelength_L)
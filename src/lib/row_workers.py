@@ -0,0 +1,271 @@
+'''
+Created on 17 October 2026
+
+Process pool sharding of the rows of the csv importers (and the files of the xspectre importer), with output in row order
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from concurrent.futures import ProcessPoolExecutor
+
+from contextlib import redirect_stdout
+
+from copy import copy
+
+from io import StringIO
+
+from itertools import islice
+
+from multiprocessing import get_all_start_methods, get_context
+
+import sys
+
+# Package application imports
+from .json_sink import json_sink
+
+# Default variables
+
+# Number of csv rows processed by a worker at a time
+WORKER_SHARD_SIZE = 1000
+
+# Outputs that are written as a single sequence and thus require serial processing: json_db attribute -> process parameter
+SERIAL_OUTPUT_D = {'spectra_store_C': 'spectra_store', 'ossl_csv_C': 'ossl_csv', 'manifest_C': 'incremental'}
+
+# State of a worker process, set by Init_row_worker
+WORKER_D = {}
+
+# The workers are forked: the json_db copy (with its parsed method, coordinate and white reference data) is inherited, not pickled
+WORKER_START_METHOD = 'fork'
+
+def Set_row_workers(process, json_db_C):
+    """
+    @brief Returns the number of row workers from the optional process parameter <workers>.
+
+    @details
+    The spectra store, the OSSL csv files and the manifest of incremental runs are written as single sequences by
+    the main process, the rows are then processed serially. The rows are also processed serially on platforms
+    where processes can not be forked (WORKER_START_METHOD).
+
+    @param process An object containing process parameters.
+    @param json_db_C The json_db instance of the process, with the outputs set.
+
+    @return The number of worker processes, 0 for serial processing.
+    """
+
+    parameters_D = process.parameters.__dict__
+
+    workers = int(parameters_D['workers']) if 'workers' in parameters_D else 0
+
+    if workers < 2:
+
+        return 0
+
+    if WORKER_START_METHOD not in get_all_start_methods():
+
+        print (' ⚠️ WARNING - workers requires the %s start method, not available on %s, processing the rows serially' %(WORKER_START_METHOD, sys.platform))
+
+        return 0
+
+    for attribute, parameter in SERIAL_OUTPUT_D.items():
+
+        if getattr(json_db_C, attribute, None):
+
+            print (' ⚠️ WARNING - workers is not available with %s, processing the rows serially' %(parameter))
+
+            return 0
+
+    return workers
+
+def Init_row_worker(project_FP, process, json_db_C, loop_rows):
+    """
+    @brief Initializes a worker process with its own copy of the json_db instance and its own json sink.
+
+    @details
+    The worker is forked (WORKER_START_METHOD), the json_db copy and the process are inherited with the memory of
+    the main process and not pickled; changes made by the worker are private to it. The sink of the worker does
+    not write: the encoded sample events are collected and returned to the main process, that writes them in row
+    order (see Loop_csv_rows).
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters (a copy, private to the worker).
+    @param json_db_C The json_db instance of the process, without its json sink.
+    @param loop_rows The row loop of the importer, e.g. Loop_ai4sh_csv_rows.
+
+    @return None
+    """
+
+    process.parameters.writer_workers = 0
+
+    json_db_C.json_sink_C = json_sink(process)
+
+    WORKER_D.update({'project_FP': project_FP, 'process': process, 'json_db_C': json_db_C, 'loop_rows': loop_rows})
+
+def Loop_row_shard(row_L):
+    """
+    @brief Processes a shard of csv rows in a worker process.
+
+    @details
+    The messages printed while processing are captured and returned, the main process prints them in row order.
+
+    @param row_L List of csv rows.
+
+    @return Dictionary {'result': loop result, 'text': printed messages, 'record_L': collected encoded sample
+        events, 'error': exception raised by the loop or None}.
+    """
+
+    json_sink_C = WORKER_D['json_db_C'].json_sink_C
+
+    json_sink_C.record_L = []
+
+    shard_D = {'result': None, 'error': None}
+
+    text = StringIO()
+
+    with redirect_stdout(text):
+
+        try:
+
+            shard_D['result'] = WORKER_D['loop_rows'](WORKER_D['project_FP'], WORKER_D['process'], WORKER_D['json_db_C'], row_L)
+
+        except Exception as e:
+
+            shard_D['error'] = e
+
+    shard_D.update({'text': text.getvalue(), 'record_L': json_sink_C.record_L})
+
+    return shard_D
+
+def Loop_csv_rows(project_FP, process, json_db_C, data_L_L, loop_rows, shard_size=WORKER_SHARD_SIZE):
+    """
+    @brief Loops the rows of a csv data file, serially or sharded across a pool of worker processes.
+
+    @details
+    With the optional process parameter <workers> larger than 1 (see Set_row_workers), the rows are split in shards
+    of <worker_shard_size> rows (default shard_size) that are processed by a pool of worker processes. Each
+    worker assembles and encodes the sample events of its shards. The results are collected in row order: the
+    messages printed by the workers are printed and the encoded sample events are written by the json sink of
+    the main process (with its background writers if set) in the same order as in a serial run, the output is
+    thus identical. At most 2 x workers shards are pending at a time.
+
+    The xspectre importer loops its json files in the same way, with a json_file_batch in place of the json_db
+    instance and the file paths in place of the csv rows.
+
+    At the first shard (in row order) that stops on an error, the messages and sample events up to the error
+    are printed and written, the pending shards are cancelled and the results of the shards after it are
+    discarded, as in a serial run that stops at the failing row.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters.
+    @param json_db_C The json_db instance of the process, with its json sink and outputs set.
+    @param data_L_L List or iterator of csv rows.
+    @param loop_rows The row loop of the importer, called as loop_rows(project_FP, process, json_db_C, row_L).
+    @param shard_size Default number of rows per shard, overridden by the process parameter <worker_shard_size>.
+
+    @return True if all records were looped, None if an error occurred.
+    """
+
+    workers = Set_row_workers(process, json_db_C)
+
+    if not workers:
+
+        return loop_rows(project_FP, process, json_db_C, data_L_L)
+
+    parameters_D = process.parameters.__dict__
+
+    shard_size = int(parameters_D['worker_shard_size']) if 'worker_shard_size' in parameters_D else shard_size
+
+    # The workers get a copy without the sink, the sink of the main process holds open files and writer pools
+    worker_db_C = copy(json_db_C)
+
+    worker_db_C.json_sink_C = None
+
+    json_sink_C = json_db_C.json_sink_C
+
+    row_iter = iter(data_L_L)
+
+    pending_L = []
+
+    result = True
+
+    # Forked explicitly (also where the default start method is spawn), see WORKER_START_METHOD
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context(WORKER_START_METHOD), initializer=Init_row_worker,
+                             initargs=(project_FP, process, worker_db_C, loop_rows)) as pool:
+
+        while True:
+
+            while len(pending_L) < 2*workers:
+
+                row_L = list(islice(row_iter, max(shard_size, 1)))
+
+                if not row_L:
+
+                    break
+
+                pending_L.append(pool.submit(Loop_row_shard, row_L))
+
+            if not pending_L:
+
+                break
+
+            shard_D = pending_L.pop(0).result()
+
+            sys.stdout.write(shard_D['text'])
+
+            for record in shard_D['record_L']:
+
+                json_sink_C._Write_collected(*record)
+
+            if shard_D['error'] is not None or not shard_D['result']:
+
+                for pending in pending_L:
+
+                    pending.cancel()
+
+                if shard_D['error'] is not None:
+
+                    raise shard_D['error']
+
+                result = None
+
+                break
+
+    return result
+
+def Close_outputs(json_db_C, result):
+    """
+    @brief Closes the outputs of a process: the json sink, the spectra store, the OSSL csv files and the manifest.
+
+    @details
+    Called by the Process functions when the loop is done, also when it stopped on an error. All outputs are
+    closed even if closing the json sink raises (failed background writes); the manifest is then not updated.
+
+    @param json_db_C The json_db instance (or json_file_batch) of the process, with its outputs set.
+    @param result The result of the loop, the manifest is only updated if True.
+
+    @return None
+    """
+
+    try:
+
+        json_db_C.json_sink_C._Close()
+
+    except Exception:
+
+        result = None
+
+        raise
+
+    finally:
+
+        for attribute in ['spectra_store_C', 'ossl_csv_C']:
+
+            output_C = getattr(json_db_C, attribute, None)
+
+            if output_C:
+
+                output_C._Close()
+
+        if getattr(json_db_C, 'manifest_C', None):
+
+            json_db_C.manifest_C._Close(result)
@@ -7,6 +7,107 @@ Created on 16 October 2025
 # Third parthy imports
 import numpy as np
 
+# Default variables
+
+# Resamplers built in this process, keyed by the input and output grid definition, see Get_spectra_resampler
+SPECTRA_RESAMPLER_CACHE_D = {}
+
+class spectra_resampler:
+    """
+    @class spectra_resampler
+    @brief Linear interpolation of spectra from an input wavelength grid to a regular output grid.
+
+    @details
+    The interpolation indices and weights are calculated once when the resampler is created; resampling a
+    spectrum (or a matrix of spectra, one per row) is then a single vectorized operation. The result is the
+    same as numpy.interp (up to rounding): values outside the input grid are set to the first and last
+    input values.
+    """
+
+    def __init__(self, wl_L, min_wl, max_wl, step_wl, reverse=False):
+        """
+        @brief Constructor for the spectra_resampler class, calculates the indices and weights.
+
+        @param wl_L List or array of the input wavelengths.
+        @param min_wl Minimum wavelength of the output grid.
+        @param max_wl Maximum wavelength of the output grid.
+        @param step_wl Step size of the output grid.
+        @param reverse If True, the input wavelengths (and spectra) are in descending order.
+
+        @return None
+        """
+
+        wl_in_array = np.asarray(wl_L, dtype=np.float64)
+
+        self.reverse = reverse
+
+        if reverse:
+
+            wl_in_array = np.flip(wl_in_array)
+
+        self.n_bands = wl_in_array.size
+
+        self.wl_out_array = np.arange(min_wl, max_wl + step_wl, step_wl)
+
+        index_A = np.clip(np.searchsorted(wl_in_array, self.wl_out_array, side='right') - 1, 0, self.n_bands - 2)
+
+        weight_A = (self.wl_out_array - wl_in_array[index_A]) / (wl_in_array[index_A + 1] - wl_in_array[index_A])
+
+        self.index_A = index_A
+
+        self.weight_A = np.clip(weight_A, 0.0, 1.0)
+
+    def _Resample(self, ns_array):
+        """
+        @brief Resamples a spectrum, or a matrix with one spectrum per row, to the output grid.
+
+        @param ns_array Array (n bands) or (n spectra x n bands) in the order of the input wavelengths.
+
+        @return Array (n output wavelengths) or (n spectra x n output wavelengths).
+        """
+
+        ns_array = np.asarray(ns_array, dtype=np.float64)
+
+        if ns_array.shape[-1] != self.n_bands:
+
+            raise ValueError('spectra have %s bands, the resampler %s' %(ns_array.shape[-1], self.n_bands))
+
+        if self.reverse:
+
+            ns_array = ns_array[..., ::-1]
+
+        lower_A = ns_array.take(self.index_A, axis=-1)
+
+        resampled_A = ns_array.take(self.index_A + 1, axis=-1)
+
+        resampled_A -= lower_A
+
+        resampled_A *= self.weight_A
+
+        resampled_A += lower_A
+
+        return resampled_A
+
+def Get_spectra_resampler(wl_L, min_wl, max_wl, step_wl, reverse=False):
+    """
+    @brief Returns the resampler for an input and output grid, built once per process.
+
+    @param wl_L List or array of the input wavelengths.
+    @param min_wl Minimum wavelength of the output grid.
+    @param max_wl Maximum wavelength of the output grid.
+    @param step_wl Step size of the output grid.
+    @param reverse If True, the input wavelengths (and spectra) are in descending order.
+
+    @return The spectra_resampler instance.
+    """
+
+    key = (tuple(np.asarray(wl_L, dtype=np.float64).tolist()), min_wl, max_wl, step_wl, reverse)
+
+    if key not in SPECTRA_RESAMPLER_CACHE_D:
+
+        SPECTRA_RESAMPLER_CACHE_D[key] = spectra_resampler(wl_L, min_wl, max_wl, step_wl, reverse)
+
+    return SPECTRA_RESAMPLER_CACHE_D[key]
 
 def Interpolate_spectra(wl_L, value_L, min_wl, max_wl, step_wl, reverse=False):
     """     
@@ -14,7 +115,8 @@ def Interpolate_spectra(wl_L, value_L, min_wl, max_wl, step_wl, reverse=False):
 
     This function takes in spectral data and its corresponding wavelength array,
     and interpolates the spectra to a specified common wavelength grid defined by
-    minimum wavelength, maximum wavelength, and step size.
+    minimum wavelength, maximum wavelength, and step size. The resampler of the grids is built once and
+    reused, see Get_spectra_resampler.
 
     @param ns_array (numpy.ndarray): 2D array where each row represents a spectrum.
     @param wl_array (numpy.ndarray): 1D array of wavelengths corresponding to the spectra.
@@ -28,36 +130,16 @@ def Interpolate_spectra(wl_L, value_L, min_wl, max_wl, step_wl, reverse=False):
         - common_wl_array (numpy.ndarray): 1D array of the common wavelength grid.
     """
 
-    # Convert value_L to array
-
-    ns_array = np.array(value_L)
-
-    wl_in_array = np.array(wl_L)
-
-    if reverse:
-        
-        ns_array = np.flip(ns_array)
-
-        wl_in_array= np.flip(wl_in_array)
-
-    # Create the common wavelength grid
-    wl_out_array = np.arange(min_wl, max_wl + step_wl, step_wl)
-
-    # Initialize an array to hold the interpolated spectra
-    #interpolated_ns_array = np.zeros((ns_array.shape[0], len(common_wl_array)))
-
-    # Interpolate each spectrum to the common wavelength grid
-    #for i in range(ns_array.shape[0]):
-
     try:
 
-        interpolated_ns_array = np.interp(wl_out_array, wl_in_array, ns_array)
+        resampler_C = Get_spectra_resampler(wl_L, min_wl, max_wl, step_wl, reverse)
+
+        interpolated_ns_array = resampler_C._Resample(value_L)
 
-    except:             
+    except (ValueError, IndexError):
 
         print ('❌  ERROR - problem interpolating spectra')
-        print (wl_in_array.shape, ns_array.shape)
-        print (wl_in_array[0], ns_array[0])
+        print (np.shape(wl_L), np.shape(value_L))
         return None, None
 
-    return interpolated_ns_array, wl_out_array
+    return interpolated_ns_array, resampler_C.wl_out_array
@@ -0,0 +1,313 @@
+'''
+Created on 17 October 2026
+
+Vectorized parsing of the spectral column block and the numeric indicator columns of csv data files
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from itertools import islice
+
+import warnings
+
+# Third party imports
+import numpy as np
+
+# Package application imports
+from src.utils import csv_numeric_row
+
+# Default variables
+
+# Number of csv rows parsed to a spectra matrix at a time
+SPECTRA_BLOCK_SIZE = 1000
+
+# Cell separator used when joining the block, never present in csv cells of numbers
+CELL_SEPARATOR = '\x1f'
+
+# Conversions of the spectra matrix, see Transform_spectra_matrix
+SPECTRA_TRANSFORMS = ['none', 'absorbance_ln', 'absorbance_log10', 'percent']
+
+def Parse_spectra_block(data_L_L, first_column):
+    """
+    @brief Converts the spectral columns of a block of csv rows to a 2D float array in a single pass.
+
+    @details
+    All spectral cells of the block are joined to a single string, decimal commas are replaced with
+    decimal points in one operation and the string is converted to float by numpy (numpy.fromstring in
+    text mode, without creating a Python object per cell). Rows with a different
+    number of spectral cells than the first row, or with cells that are not numbers, are set to NaN and
+    flagged as invalid.
+
+    The spectra of rows read by the memory mapped reader (csv_numeric_row, see Read_csv_mmap_chunks) are
+    already parsed and only stacked to the block matrix.
+
+    @param data_L_L List of csv rows, each row is a list of strings (or a csv_numeric_row).
+    @param first_column Index of the first spectral column.
+
+    @return tuple (spectra_A, valid_A):
+        spectra_A: float64 array (n rows x n bands).
+        valid_A: boolean array (n rows), False for rows that could not be parsed.
+    """
+
+    numeric_L = [row.numeric_A if isinstance(row, csv_numeric_row) else None for row in data_L_L]
+
+    if numeric_L and all(numeric_A is not None and numeric_A.size == numeric_L[0].size for numeric_A in numeric_L):
+
+        return np.vstack(numeric_L), np.ones(len(data_L_L), dtype=bool)
+
+    if any(numeric_A is not None for numeric_A in numeric_L):
+
+        # A block with rows of both readers (or of different lengths), the parsed values are converted back to cells
+        data_L_L = [list(row) + list(map(repr, numeric_A.tolist())) if numeric_A is not None else row
+                    for row, numeric_A in zip(data_L_L, numeric_L)]
+
+    n_bands = len(data_L_L[0]) - first_column if data_L_L else 0
+
+    valid_A = np.array([len(row) - first_column == n_bands for row in data_L_L], dtype=bool)
+
+    if not valid_A.all():
+
+        data_L_L = [row if valid else [''] * (first_column + n_bands) for row, valid in zip(data_L_L, valid_A)]
+
+    block_text = CELL_SEPARATOR.join([CELL_SEPARATOR.join(row[first_column:]) for row in data_L_L]).replace(',', '.')
+
+    with warnings.catch_warnings():
+
+        # Depending on the numpy version, cells that are not numbers stop the conversion with a warning
+        # or raise an error, the rows are then located below
+        warnings.simplefilter('ignore', DeprecationWarning)
+
+        try:
+
+            spectra_A = np.fromstring(block_text, dtype=np.float64, sep=CELL_SEPARATOR)
+
+        except ValueError:
+
+            spectra_A = None
+
+    if spectra_A is None or spectra_A.size != len(data_L_L) * n_bands:
+
+        # Locate the rows with cells that are not numbers
+        spectra_A = np.empty(len(data_L_L) * n_bands, dtype=np.float64)
+
+        for r, row in enumerate(data_L_L):
+
+            try:
+
+                spectra_A[r*n_bands:(r+1)*n_bands] = [float(c.replace(',', '.')) for c in row[first_column:]]
+
+            except ValueError:
+
+                spectra_A[r*n_bands:(r+1)*n_bands] = np.nan
+
+                valid_A[r] = False
+
+    spectra_A = spectra_A.reshape(len(data_L_L), n_bands)
+
+    spectra_A[~valid_A] = np.nan
+
+    return spectra_A, valid_A
+
+def Transform_spectra_matrix(spectra_A, transform):
+    """
+    @brief Converts a spectra matrix in place to reflectance (fraction).
+
+    @details
+    - 'none': the values are already reflectance.
+    - 'absorbance_ln': absorbance with natural logarithm, reflectance = 1 / exp(A) (FOSS DS2500).
+    - 'absorbance_log10': absorbance with base 10 logarithm, reflectance = 1 / 10^A.
+    - 'percent': reflectance in percent, reflectance = value / 100 (NeoSpectra).
+
+    @param spectra_A float64 array (n rows x n bands), overwritten.
+    @param transform One of SPECTRA_TRANSFORMS.
+
+    @return The converted array.
+    """
+
+    if transform == 'absorbance_ln':
+
+        np.exp(spectra_A, out=spectra_A)
+
+        np.reciprocal(spectra_A, out=spectra_A)
+
+    elif transform == 'absorbance_log10':
+
+        np.power(10.0, spectra_A, out=spectra_A)
+
+        np.reciprocal(spectra_A, out=spectra_A)
+
+    elif transform == 'percent':
+
+        np.divide(spectra_A, 100, out=spectra_A)
+
+    return spectra_A
+
+def Set_spectra_transform(process, default_transform):
+    """
+    @brief Returns the conversion of the spectra matrix from the optional process parameter <spectra_transform>.
+
+    @param process An object containing process parameters.
+    @param default_transform The conversion of the instrument, used if the parameter is not set.
+
+    @return One of SPECTRA_TRANSFORMS.
+    """
+
+    parameters_D = process.parameters.__dict__
+
+    transform = parameters_D['spectra_transform'] if 'spectra_transform' in parameters_D else default_transform
+
+    if transform not in SPECTRA_TRANSFORMS:
+
+        print (' ⚠️ WARNING - spectra_transform <%s> not recognised, using <%s>' %(transform, default_transform))
+
+        transform = default_transform
+
+    return transform
+
+def Float_or_none(cell):
+    """
+    @brief Converts a csv cell (decimal point) to float.
+
+    @return The float, or None if the cell is not a number.
+    """
+
+    try:
+
+        return float(cell)
+
+    except ValueError:
+
+        return None
+
+def Parse_numeric_columns(data_L_L, column_index_L):
+    """
+    @brief Converts numeric columns of a block of csv rows to lists of floats, one column at a time.
+
+    @details
+    The cells of each column are joined to a single string and decimal commas are replaced with decimal points
+    in one operation. The column is converted with float() in a single map; empty cells are set to None. Only
+    columns with other cells that are not numbers are converted cell by cell, with None for these cells.
+    Missing cells (short rows) are None.
+
+    @param data_L_L List of csv rows, each row is a list of strings.
+    @param column_index_L List of the indexes of the numeric columns.
+
+    @return List (one per column) of lists (one per row) of float or None.
+    """
+
+    value_L_L = []
+
+    for c in column_index_L:
+
+        column_text = CELL_SEPARATOR.join([row[c] if c < len(row) else '' for row in data_L_L]).replace(',', '.')
+
+        cell_L = column_text.split(CELL_SEPARATOR)
+
+        try:
+
+            value_L_L.append(list(map(float, cell_L)))
+
+            continue
+
+        except ValueError:
+
+            pass
+
+        if 'nan' not in column_text.lower():
+
+            # Empty cells are converted as NaN and then set to None, unless the column has NaN values
+            try:
+
+                value_L_L.append([value if value == value else None for value in map(float, [cell or 'nan' for cell in cell_L])])
+
+                continue
+
+            except ValueError:
+
+                pass
+
+        value_L_L.append(list(map(Float_or_none, cell_L)))
+
+    return value_L_L
+
+def Numeric_column_row_blocks(data_L_L, column_index_L, block_size=SPECTRA_BLOCK_SIZE):
+    """
+    @brief Iterates the rows of csv data, with the numeric columns parsed in blocks by Parse_numeric_columns.
+
+    @param data_L_L List or iterator of csv rows.
+    @param column_index_L List of the indexes of the numeric columns.
+    @param block_size Number of rows parsed at a time.
+
+    @return Generator yielding tuples (data_row, value_L), value_L holds the float (or None) of each numeric column.
+    """
+
+    row_iter = iter(data_L_L)
+
+    while True:
+
+        block_L = list(islice(row_iter, block_size))
+
+        if not block_L:
+
+            return
+
+        value_L_L = Parse_numeric_columns(block_L, column_index_L)
+
+        yield from zip(block_L, zip(*value_L_L) if value_L_L else [()] * len(block_L))
+
+def Spectra_row_blocks(data_L_L, first_column, transform='none', block_size=SPECTRA_BLOCK_SIZE, resampler_C=None, dtype=np.float64):
+    """
+    @brief Iterates the rows of csv data, with the spectral columns parsed in blocks by Parse_spectra_block.
+
+    @details
+    Each block matrix is converted with Transform_spectra_matrix before the rows are yielded. With a resampler
+    (the OSSL csv output), the complete block matrix is resampled to the output grid in one operation. The
+    block matrix is then cast to dtype (float32 with the float32 output precision, see Spectra_parse_dtype);
+    the conversion and the resampling are done in float64.
+
+    @param data_L_L List or iterator of csv rows.
+    @param first_column Index of the first spectral column.
+    @param transform Conversion of the spectra matrix, one of SPECTRA_TRANSFORMS.
+    @param block_size Number of rows parsed at a time.
+    @param resampler_C Optional spectra_resampler (see Get_spectra_resampler) applied to each block matrix.
+    @param dtype The dtype of the yielded spectra.
+
+    @return Generator yielding tuples (data_row, spectra_A, resampled_A): spectra_A is a row view of the block
+        matrix, or None if the spectra of the row could not be parsed; resampled_A is a row view of the
+        resampled block matrix, or None without a resampler, for rows that could not be parsed or if the block
+        could not be resampled.
+    """
+
+    row_iter = iter(data_L_L)
+
+    while True:
+
+        block_L = list(islice(row_iter, block_size))
+
+        if not block_L:
+
+            return
+
+        spectra_A, valid_A = Parse_spectra_block(block_L, first_column)
+
+        Transform_spectra_matrix(spectra_A, transform)
+
+        resampled_A = None
+
+        if resampler_C:
+
+            try:
+
+                resampled_A = resampler_C._Resample(spectra_A)
+
+            except (ValueError, IndexError):
+
+                # The number of spectral columns differs from the wavelengths of the resampler
+                resampled_A = None
+
+        spectra_A = spectra_A.astype(dtype, copy=False)
+
+        for r, data_row in enumerate(block_L):
+
+            yield data_row, spectra_A[r] if valid_A[r] else None, resampled_A[r] if resampled_A is not None and valid_A[r] else None
@@ -0,0 +1,167 @@
+'''
+Created on 17 October 2026
+
+Output precision policy (float64, float32 or scaled int16) for spectral arrays
+
+@author: thomasgumbricht
+'''
+
+# Third party imports
+import numpy as np
+
+# Default variables
+PRECISION_DTYPES = ['float64', 'float32', 'int16']
+
+# Default scale for int16, suited for reflectance in the range 0 to 1 (max absolute error 0.00005)
+INT16_DEFAULT_SCALE = 0.0001
+
+INT16_MISSING_VALUE = -32768
+
+INT16_MIN_VALUE = -32767
+
+INT16_MAX_VALUE = 32767
+
+# Relative rounding error of a cast to float32 (half the float32 machine epsilon)
+FLOAT32_RELATIVE_ERROR = 2.0**-24
+
+def Spectra_precision_policy(spectra_precision, dataset):
+    """
+    @brief Returns the precision policy of a spectral dataset from the process parameter <spectra_precision>.
+
+    @details
+    The parameter <spectra_precision> is either a single policy applied to all spectral datasets, or a dictionary
+    with a policy per dataset (e.g. 'reflectance_value', 'spectra_value', 'scan_dn_sample_mean') and an optional
+    'default' policy. A policy is either a dtype ('float64', 'float32' or 'int16') or a dictionary
+    {"dtype": "int16", "scale": 0.0001, "offset": 0}.
+
+    @param spectra_precision The process parameter (str, dict or Struct), or None.
+    @param dataset Name of the spectral dataset.
+
+    @return Dictionary {'dtype': str, 'scale': float, 'offset': float}.
+    """
+
+    policy = spectra_precision
+
+    if hasattr(policy, '__dict__'):
+
+        policy = policy.__dict__
+
+    if isinstance(policy, dict) and 'dtype' not in policy:
+
+        if dataset in policy:
+
+            policy = policy[dataset]
+
+        else:
+
+            policy = policy['default'] if 'default' in policy else None
+
+    if hasattr(policy, '__dict__'):
+
+        policy = policy.__dict__
+
+    if not policy:
+
+        policy = 'float64'
+
+    if not isinstance(policy, dict):
+
+        policy = {'dtype': policy}
+
+    policy_D = {'dtype': policy['dtype'],
+                'scale': float(policy['scale']) if 'scale' in policy else INT16_DEFAULT_SCALE,
+                'offset': float(policy['offset']) if 'offset' in policy else 0.0}
+
+    if policy_D['dtype'] not in PRECISION_DTYPES:
+
+        print (' ⚠️ WARNING - spectra_precision <%s> not recognised for %s, using <float64>' %(policy_D['dtype'], dataset))
+
+        policy_D['dtype'] = 'float64'
+
+    return policy_D
+
+def Quantize_spectra(value_A, policy_D):
+    """
+    @brief Converts a spectral array to the dtype of a precision policy.
+
+    @details
+    - float64: returned unchanged, no encoding metadata.
+    - float32: cast to float32; the encoding metadata gives the max absolute error of the cast, the float32
+      rounding bound max(|float32 value|) * 2^-24 (the same for values already cast when parsed, see Spectra_parse_dtype).
+    - int16: stored = round((value - offset) / scale), with missing (NaN) and out of range values set to
+      the missing value -32768; the encoding metadata gives the scale, offset, missing value and the max
+      absolute error (scale / 2) of the values in range.
+
+    @param value_A Array or list of numbers.
+    @param policy_D Precision policy from Spectra_precision_policy.
+
+    @return Tuple (quantized array, encoding dictionary or None).
+    """
+
+    value_A = np.asarray(value_A, dtype=np.float64)
+
+    if policy_D['dtype'] == 'float64':
+
+        return value_A, None
+
+    if policy_D['dtype'] == 'float32':
+
+        quantized_A = value_A.astype(np.float32)
+
+        finite_A = np.isfinite(quantized_A)
+
+        # Bound of the rounding error, the same for values already cast when parsed
+        max_abs_error = float(np.max(np.abs(quantized_A[finite_A]))) * FLOAT32_RELATIVE_ERROR if finite_A.any() else 0.0
+
+        return quantized_A, {'dtype': 'float32', 'max_abs_error': max_abs_error}
+
+    scaled_A = np.round((value_A - policy_D['offset']) / policy_D['scale'])
+
+    missing_A = ~np.isfinite(scaled_A) | (scaled_A < INT16_MIN_VALUE) | (scaled_A > INT16_MAX_VALUE)
+
+    scaled_A[missing_A] = INT16_MISSING_VALUE
+
+    encoding_D = {'dtype': 'int16',
+                  'scale': policy_D['scale'],
+                  'offset': policy_D['offset'],
+                  'missing_value': INT16_MISSING_VALUE,
+                  'max_abs_error': policy_D['scale'] / 2}
+
+    return scaled_A.astype(np.int16), encoding_D
+
+def Spectra_parse_dtype(policy_D):
+    """
+    @brief Returns the dtype the spectra of a dataset are cast to when parsed, before the output.
+
+    @details
+    With the float32 policy the spectra are held as float32 from the parsing on (see Spectra_row_blocks), the
+    other policies parse to float64 (int16 is scaled from the float64 values when written).
+
+    @param policy_D Precision policy from Spectra_precision_policy.
+
+    @return numpy dtype, float32 or float64.
+    """
+
+    return np.float32 if policy_D['dtype'] == 'float32' else np.float64
+
+def Dequantize_spectra(quantized_A, encoding_D):
+    """
+    @brief Converts a quantized spectral array back to float64, the inverse of Quantize_spectra.
+
+    @param quantized_A Array or list of quantized values.
+    @param encoding_D Encoding dictionary from Quantize_spectra, or None for float64.
+
+    @return float64 array, missing int16 values are NaN.
+    """
+
+    if not encoding_D or encoding_D['dtype'] != 'int16':
+
+        return np.asarray(quantized_A, dtype=np.float64)
+
+    quantized_A = np.asarray(quantized_A)
+
+    value_A = quantized_A.astype(np.float64) * encoding_D['scale'] + encoding_D['offset']
+
+    value_A[quantized_A == encoding_D['missing_value']] = np.nan
+
+    return value_A
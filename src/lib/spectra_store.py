@@ -0,0 +1,165 @@
+'''
+Created on 17 October 2026
+
+Binary array store for the spectra of a process, referenced from the json sample events
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from os import path, replace
+
+import struct
+
+# Third party imports
+import numpy as np
+
+# Package application imports
+from src.utils import Full_path_locate
+
+# Default variables
+SPECTRA_STORE_MODES = ['json', 'npy']
+
+# Reserved size of the npy header, the header is rewritten with the final shape when the store is closed
+NPY_HEADER_SIZE = 128
+
+def Npy_header(dtype, shape):
+    """
+    @brief Creates a version 1.0 npy header of exactly NPY_HEADER_SIZE bytes.
+
+    @param dtype numpy dtype of the array.
+    @param shape Shape tuple of the array.
+
+    @return The header as bytes.
+    """
+
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" %(dtype.str, shape)
+
+    header = header + ' ' * (NPY_HEADER_SIZE - 10 - 1 - len(header)) + '\n'
+
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+class spectra_store:
+    """
+    @class spectra_store
+    @brief Writes all spectra of a process to contiguous binary arrays (.npy), one row per spectrum.
+
+    @details
+    With the optional process parameter <spectra_store> set to 'npy', the spectral arrays (values, standard
+    deviations and raw scan DN) are not embedded as json lists in the sample events. Each dataset (e.g. the
+    reflectance values) is instead appended as a row to a 2D array in the folder <spectra> next to the ai4sh and
+    xspectre destination folders, and the sample event holds a reference:
+    {"array_store": "spectra/<method>/<dataset>_<n bands>.npy", "row": <row index>}
+    The arrays are standard npy files that can be memory mapped with numpy.load(FPN, mmap_mode='r').
+
+    The rows are streamed to the files while processing, the npy headers are completed when the store is closed.
+    """
+
+    def __init__(self, project_FP, process):
+        """
+        @brief Constructor for the spectra_store class, creates the destination folder.
+
+        @param project_FP The project folder path.
+        @param process An object containing process parameters, expected to have a 'parameters' attribute.
+
+        @return None
+        """
+
+        self.verbose = process.verbose
+
+        dst_FP, method_FP = path.split(process.parameters.dst_FP)
+
+        self.store_FP = Full_path_locate(project_FP, path.join(dst_FP, 'spectra', method_FP), True)
+
+        self.relative_FP = path.join('spectra', method_FP)
+
+        # Open datasets: dataset -> {'file': file handle, 'FPN': str, 'dtype': numpy dtype, 'n_rows': int, 'n_columns': int}
+        self.dataset_D = {}
+
+    def _Store(self, dataset, value_A):
+        """
+        @brief Appends an array as a row to a dataset.
+
+        @param dataset Name of the dataset, the number of bands is added to the name.
+        @param value_A Array or list of numbers, float arrays and int16 arrays (see Quantize_spectra) keep their dtype.
+
+        @return Reference dictionary {'array_store': relative path, 'row': row index}.
+        """
+
+        value_A = np.asarray(value_A).ravel()
+
+        if value_A.dtype.kind != 'f' and value_A.dtype != np.int16:
+
+            value_A = value_A.astype(np.float64)
+
+        dataset = '%s_%s' %(dataset, value_A.size)
+
+        if dataset not in self.dataset_D:
+
+            FPN = path.join(self.store_FP, '%s.npy' %(dataset))
+
+            dataset_file = open('%s.tmp' %(FPN), 'wb')
+
+            dataset_file.write(b'\x00' * NPY_HEADER_SIZE)
+
+            self.dataset_D[dataset] = {'file': dataset_file, 'FPN': FPN, 'dtype': value_A.dtype.newbyteorder('<'),
+                                       'n_rows': 0, 'n_columns': value_A.size}
+
+        store = self.dataset_D[dataset]
+
+        store['file'].write(value_A.astype(store['dtype'], copy=False).tobytes())
+
+        store['n_rows'] += 1
+
+        return {'array_store': path.join(self.relative_FP, '%s.npy' %(dataset)), 'row': store['n_rows'] - 1}
+
+    def _Close(self):
+        """
+        @brief Writes the npy headers with the final shapes and closes all datasets.
+
+        @return None
+        """
+
+        for dataset in self.dataset_D:
+
+            store = self.dataset_D[dataset]
+
+            store['file'].seek(0)
+
+            store['file'].write(Npy_header(store['dtype'], (store['n_rows'], store['n_columns'])))
+
+            store['file'].close()
+
+            replace('%s.tmp' %(store['FPN']), store['FPN'])
+
+            if self.verbose:
+
+                print('✅ Spectra store closed: %s (%s x %s)' %(store['FPN'], store['n_rows'], store['n_columns']))
+
+        self.dataset_D = {}
+
+def Set_spectra_store(project_FP, process):
+    """
+    @brief Creates the spectra store of a process if the process parameter <spectra_store> is 'npy'.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters.
+
+    @return The spectra_store instance, or None if the spectra are embedded in the json.
+    """
+
+    parameters_D = process.parameters.__dict__
+
+    mode = parameters_D['spectra_store'] if 'spectra_store' in parameters_D else 'json'
+
+    if mode not in SPECTRA_STORE_MODES:
+
+        print (' ⚠️ WARNING - spectra_store <%s> not recognised, embedding spectra in the json' %(mode))
+
+        return None
+
+    if mode == 'json':
+
+        return None
+
+    return spectra_store(project_FP, process)
@@ -0,0 +1,370 @@
+'''
+Created on 17 October 2026
+
+Immutable white reference calibration of the xspectre spectra
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from bisect import bisect_left
+
+from datetime import datetime, timezone
+
+from hashlib import sha1
+
+from os import getpid, path, remove, replace
+
+from types import MappingProxyType
+
+from zipfile import BadZipFile
+
+# Third party imports
+import numpy as np
+
+# Package application imports
+from .build_manifest import File_digest
+
+from .version import __version__
+
+# Default variables
+
+# Calibration of the spectra, see Set_white_reference_interpolation
+WHITE_REFERENCE_INTERPOLATIONS = ['overall', 'time']
+
+# Arrays of the white reference records held in the time index
+WHITE_REFERENCE_INDEX_ITEMS = ['value_A', 'value_standard_deviation_A', 'dark_A', 'dark_standard_deviation_A']
+
+# File name of the calibration cache, written in the data source folder, see Set_white_reference_cache
+WHITE_REFERENCE_CACHE_FN = 'white_reference_calibration.npz'
+
+# Scan times that are dates without time of day (midnight UTC, see Scan_epoch) are multiples of a day
+SECONDS_PER_DAY = 86400
+
+class white_reference_calibration:
+    """
+    @class white_reference_calibration
+    @brief Holds the white reference statistics used for calculating the reflectance of the xspectre spectra.
+
+    @details
+    The calibration is created once per process from all white reference files (see Get_all_white_reference_data)
+    and is then passed explicitly to each file extraction. It can not be altered after creation: the attributes
+    are read-only, the arrays are not writeable and the white reference records are held in a read-only
+    mapping. The calibration can thus be shared by all files of a process and be sent to worker processes.
+
+    The white reference records are also held in a time index: the scan times (see Scan_epoch) are sorted once
+    and the value, dark and standard deviation arrays are stacked in the same order, see _Interpolate. The
+    white references with the same scan time (in the current xspectre json files the scandate is a date, thus
+    all the white references of a day) are averaged.
+    """
+
+    __slots__ = ('value_mean_A', 'value_standard_deviation_A', 'dark_mean_A', 'dark_standard_deviation_A',
+                 'max_A', 'FN_L', 'record_D', 'epoch_L', 'index_A')
+
+    def __init__(self, value_mean_A, value_standard_deviation_A, dark_mean_A, dark_standard_deviation_A, max_A, FN_L, record_D):
+        """
+        @brief Constructor for the white_reference_calibration class.
+
+        @param value_mean_A Overall mean of the white reference values.
+        @param value_standard_deviation_A Overall standard deviation of the white reference values.
+        @param dark_mean_A Overall mean of the white reference dark values.
+        @param dark_standard_deviation_A Overall standard deviation of the white reference dark values.
+        @param max_A Maximum white reference value of each wavelength.
+        @param FN_L List of the white reference file names (without extension).
+        @param record_D Dictionary scan time (see Scan_epoch) -> list of the white reference records of that time.
+
+        @return None
+        """
+
+        for name, item in zip(self.__slots__, (value_mean_A, value_standard_deviation_A, dark_mean_A,
+                                                dark_standard_deviation_A, max_A)):
+
+            item = np.array(item)
+
+            item.setflags(write=False)
+
+            object.__setattr__(self, name, item)
+
+        object.__setattr__(self, 'FN_L', tuple(FN_L))
+
+        object.__setattr__(self, 'record_D', MappingProxyType({epoch: tuple(record_L) for epoch, record_L in record_D.items()}))
+
+        # Time index: sorted scan times and the mean arrays of the records of each time stacked as (item, time, band)
+        epoch_L = tuple(sorted(record_D))
+
+        index_A = None
+
+        if epoch_L:
+
+            try:
+
+                index_A = np.array([[np.mean([record[item] for record in record_D[epoch]], axis=0) for epoch in epoch_L]
+                                    for item in WHITE_REFERENCE_INDEX_ITEMS], dtype=np.float64)
+
+                index_A.setflags(write=False)
+
+            except ValueError:
+
+                print (' ⚠️ WARNING - the white references have different numbers of bands, time interpolation is not available')
+
+                epoch_L = ()
+
+        object.__setattr__(self, 'epoch_L', epoch_L)
+
+        object.__setattr__(self, 'index_A', index_A)
+
+    def _Interpolate(self, epoch):
+        """
+        @brief Returns the white reference arrays at a given time, interpolated between the bracketing white references.
+
+        @details
+        The bracketing white references are found by binary search in the sorted times. The value, dark and
+        standard deviation arrays are weighted linearly by the time to the white reference before and after.
+        Before the first (after the last) white reference, the first (last) white reference is used.
+
+        @param epoch The scan time of the sample, see Scan_epoch.
+
+        @return Tuple (value_A, value_standard_deviation_A, dark_A, dark_standard_deviation_A), or None if the
+            time index is empty.
+        """
+
+        n_epochs = len(self.epoch_L)
+
+        if not n_epochs:
+
+            return None
+
+        i = bisect_left(self.epoch_L, epoch)
+
+        if i == n_epochs:
+
+            return tuple(self.index_A[:, n_epochs-1])
+
+        if i == 0 or self.epoch_L[i] == epoch:
+
+            return tuple(self.index_A[:, i])
+
+        weight = (epoch - self.epoch_L[i-1]) / (self.epoch_L[i] - self.epoch_L[i-1])
+
+        before_A = self.index_A[:, i-1]
+
+        return tuple(before_A + weight * (self.index_A[:, i] - before_A))
+
+    def __setattr__(self, name, value):
+
+        raise AttributeError('white_reference_calibration is immutable, can not set %s' %(name))
+
+    def __delattr__(self, name):
+
+        raise AttributeError('white_reference_calibration is immutable, can not delete %s' %(name))
+
+    def _Day_resolution(self):
+        """
+        @brief Checks if the time index only holds dates, the scandate of the white references has no time of day.
+
+        @return True if all scan times of the time index are dates, False otherwise (or if the index is empty).
+        """
+
+        return bool(self.epoch_L) and all(epoch % SECONDS_PER_DAY == 0 for epoch in self.epoch_L)
+
+    def __reduce__(self):
+        """
+        @brief Pickles the calibration by its constructor arguments (the read-only mapping can not be pickled).
+        """
+
+        return (white_reference_calibration, (self.value_mean_A, self.value_standard_deviation_A, self.dark_mean_A,
+                                              self.dark_standard_deviation_A, self.max_A, list(self.FN_L), dict(self.record_D)))
+
+def Scan_epoch(scandate):
+    """
+    @brief Returns the scan time of an xspectre json file as seconds since the epoch.
+
+    @details
+    The scan time is read from the json item <scandate>, an ISO date ('2025-03-01') or date and time
+    ('2025-03-01T10:15:00'). Times without a time zone are taken as UTC. The file times (creation or
+    modification) are not used, they are reset when the files are copied or extracted.
+
+    The time of day is used if the scandate holds it. The current xspectre json files have no other time
+    item and their scandate is a date: the scan time is then midnight UTC of that date and the interpolation
+    is at day resolution (reported by Process_xspectre_json_v089, see white_reference_calibration._Day_resolution).
+
+    @param scandate The scandate of the xspectre json file.
+
+    @return The scan time, or None if scandate is missing or not an ISO date.
+    """
+
+    try:
+
+        scan_time = datetime.fromisoformat(scandate)
+
+    except (TypeError, ValueError):
+
+        return None
+
+    if scan_time.tzinfo is None:
+
+        scan_time = scan_time.replace(tzinfo=timezone.utc)
+
+    return scan_time.timestamp()
+
+def Set_white_reference_interpolation(process):
+    """
+    @brief Returns the calibration of the spectra from the optional process parameter <white_reference_interpolation>.
+
+    @details
+    - 'overall' (default): the overall mean and standard deviation of all white references of the process.
+    - 'time': the white references before and after the sample, interpolated by the scan time (see Scan_epoch and
+      white_reference_calibration._Interpolate).
+
+    @param process An object containing process parameters.
+
+    @return One of WHITE_REFERENCE_INTERPOLATIONS.
+    """
+
+    parameters_D = process.parameters.__dict__
+
+    interpolation = parameters_D['white_reference_interpolation'] if 'white_reference_interpolation' in parameters_D else 'overall'
+
+    if interpolation not in WHITE_REFERENCE_INTERPOLATIONS:
+
+        print (' ⚠️ WARNING - white_reference_interpolation <%s> not recognised, using <overall>' %(interpolation))
+
+        interpolation = 'overall'
+
+    return interpolation
+
+def Set_white_reference_cache(process):
+    """
+    @brief Returns the path of the calibration cache from the optional process parameter <white_reference_cache>.
+
+    @param process An object containing process parameters.
+
+    @return The path of the cache file in the data source folder, or None if white_reference_cache is not set.
+    """
+
+    parameters_D = process.parameters.__dict__
+
+    if not ('white_reference_cache' in parameters_D and parameters_D['white_reference_cache']):
+
+        return None
+
+    return path.join(process.parameters.data_src_FP, WHITE_REFERENCE_CACHE_FN)
+
+def White_reference_key(white_reference_FPN_D):
+    """
+    @brief Returns the cache key of a set of white reference files.
+
+    @details
+    The key is the sha1 digest of the package version and the names and sha1 digests of the files, sorted by
+    name. Any added, removed or edited white reference file (or a new version) thus gives a new key.
+
+    @param white_reference_FPN_D Dictionary white reference name (path relative to the data source folder) -> full path.
+
+    @return The hex digest.
+    """
+
+    digest = sha1(__version__.encode('utf-8'))
+
+    for name in sorted(white_reference_FPN_D):
+
+        digest.update(('%s:%s\n' %(name, File_digest(white_reference_FPN_D[name]))).encode('utf-8'))
+
+    return digest.hexdigest()
+
+def Write_white_reference_cache(cache_FPN, key, white_reference_C):
+    """
+    @brief Writes the calibration to the cache file (numpy npz, compressed).
+
+    @details
+    The cache holds the overall statistics, the white reference file names and the time index (the scan times
+    and the mean arrays of each time). The file is first written to a temporary file that then replaces the
+    cache file.
+
+    @param cache_FPN Path of the cache file.
+    @param key The cache key, see White_reference_key.
+    @param white_reference_C The white_reference_calibration.
+
+    @return True if the cache was written, otherwise False.
+    """
+
+    index_A = white_reference_C.index_A
+
+    if index_A is None:
+
+        index_A = np.zeros((len(WHITE_REFERENCE_INDEX_ITEMS), 0, 0))
+
+    dst_FPN = '%s.%s.tmp' %(cache_FPN, getpid())
+
+    try:
+
+        # A file object, np.savez_compressed would otherwise add the extension .npz to the temporary file
+        with open(dst_FPN, 'wb') as outfile:
+
+            np.savez_compressed(outfile, key=np.array(key),
+                                value_mean_A=white_reference_C.value_mean_A,
+                                value_standard_deviation_A=white_reference_C.value_standard_deviation_A,
+                                dark_mean_A=white_reference_C.dark_mean_A,
+                                dark_standard_deviation_A=white_reference_C.dark_standard_deviation_A,
+                                max_A=white_reference_C.max_A,
+                                FN_L=np.array(white_reference_C.FN_L, dtype=str),
+                                epoch_A=np.array(white_reference_C.epoch_L, dtype=np.float64),
+                                index_A=index_A)
+
+        replace(dst_FPN, cache_FPN)
+
+    except OSError:
+
+        print (' ⚠️ WARNING - writing the white reference cache failed: %s' %(cache_FPN))
+
+        if path.exists(dst_FPN):
+
+            remove(dst_FPN)
+
+        return False
+
+    return True
+
+def Read_white_reference_cache(cache_FPN, key):
+    """
+    @brief Reads the calibration from the cache file, if written for the same white reference files.
+
+    @details
+    The white reference records of the calibration read from the cache only hold the mean arrays of the time
+    index (WHITE_REFERENCE_INDEX_ITEMS), one record per scan time.
+
+    @param cache_FPN Path of the cache file.
+    @param key The cache key of the current white reference files, see White_reference_key.
+
+    @return The white_reference_calibration, or None if there is no cache or it was written for other files.
+    """
+
+    if not path.isfile(cache_FPN):
+
+        return None
+
+    try:
+
+        with np.load(cache_FPN, allow_pickle=False) as cache_npz:
+
+            if str(cache_npz['key']) != key:
+
+                return None
+
+            statistics_A_L = [cache_npz[item] for item in ('value_mean_A', 'value_standard_deviation_A', 'dark_mean_A',
+                                                           'dark_standard_deviation_A', 'max_A')]
+
+            FN_L = cache_npz['FN_L'].tolist()
+
+            epoch_L = cache_npz['epoch_A'].tolist()
+
+            index_A = cache_npz['index_A']
+
+    except (OSError, ValueError, KeyError, BadZipFile):
+
+        print (' ⚠️ WARNING - the white reference cache can not be read (recalculated): %s' %(cache_FPN))
+
+        return None
+
+    record_D = {epoch: [{item: index_A[j, i] for j, item in enumerate(WHITE_REFERENCE_INDEX_ITEMS)}] for i, epoch in enumerate(epoch_L)}
+
+    return white_reference_calibration(*statistics_A_L, FN_L, record_D)
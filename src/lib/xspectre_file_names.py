@@ -0,0 +1,184 @@
+'''
+Created on 17 October 2026
+
+Registry of the file name grammars of the xspectre json data files, per pilot site and procedure
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from os import path
+
+import re
+
+# Default variables
+
+PREPCODE_D = {'field':'field','mx-lab':"mx-lab", 'in-situ':'field','h2o-iso':'mx-lab'}
+
+LOENNSTORP_POINT_ID_D = {'4':'4-a','04':'4-a','5':'5-a','16':'16-a','20':'20-a','24':'24-a',
+                         '51':'51-c','55':'55-c','60':'60-c','61':'61-c','72':'72-c',
+                         '79':'79-d','80':'80-d','91':'91-d','95':'95-d','99':'99-d'}
+
+# Depth codes in the file names -> (min_depth, max_depth)
+ZAZARI_DEPTH_D = {'top': ('0', '20'), 'sub': ('20', '50'), 'post-infiltration': ('0', '8')}
+
+FOULUM_DEPTH_D = {'COMPTOP': ('0', '20'), 'COMPSUB': ('20', '50')}
+
+MUNSOE_DEPTH_D = {'d1': ('0', '20'), 'd2': ('20', '50')}
+
+# Depth interval <min>-<max>
+DEPTH = r'[^_-]*-[^_-]*'
+
+# Trailing file name parts that are not used
+TAIL = r'(?:_.*)?'
+
+# Procedures that select the grammar if contained in the procedure of the process (e.g. xspectre-ise-ph-soil)
+FN_GRAMMAR_PROCEDURE_CONTAINS_L = ['xspectre-ise-ph']
+
+class file_name_grammar:
+    """
+    @class file_name_grammar
+    @brief The grammar of the file names of a pilot site and procedure.
+
+    @details
+    The pattern (a regular expression with named groups for the parts of the name) is matched against the
+    complete file name without extension. The named groups of a matching file name (see _Parse) are passed to
+    the json_db function <parser>, which sets the record parameters from the groups and converts them with the
+    lookup tables of the site (e.g. LOENNSTORP_POINT_ID_D, ZAZARI_DEPTH_D). Groups of alternative name
+    versions carry the suffix _b, groups that are not in the matching version are None.
+    """
+
+    def __init__(self, pattern, parser, with_json=False):
+        """
+        @brief Constructor for the file_name_grammar class.
+
+        @param pattern Regular expression of the file name without extension.
+        @param parser Name of the json_db function that sets the record parameters from the named groups.
+        @param with_json True if the parser also takes the xspectre json dictionary.
+
+        @return None
+        """
+
+        self.pattern = re.compile(pattern)
+
+        self.parser = parser
+
+        self.with_json = with_json
+
+    def _Parse(self, json_FPN):
+        """
+        @brief Matches a file name against the grammar.
+
+        @param json_FPN Path of the json file.
+
+        @return Dictionary group name -> part of the file name (see re.Match.groupdict), or None if the name does not match.
+        """
+
+        match = self.pattern.fullmatch(path.splitext(path.split(json_FPN)[1])[0])
+
+        return match.groupdict() if match else None
+
+    def _Match(self, json_FPN_L):
+        """
+        @brief Matches a list of json files against the grammar.
+
+        @param json_FPN_L List of json file paths.
+
+        @return Tuple (list of the matching files, list of the files that do not match), in the order of json_FPN_L.
+        """
+
+        match_L, no_match_L = [], []
+
+        for json_FPN in json_FPN_L:
+
+            if self._Parse(json_FPN) is not None:
+
+                match_L.append(json_FPN)
+
+            else:
+
+                no_match_L.append(json_FPN)
+
+        return match_L, no_match_L
+
+# The file name grammars: (pilot_site, procedure) -> file_name_grammar
+FN_GRAMMAR_D = {('neretva', 'xspectre-ise-ph'):
+                    file_name_grammar(r'(?P<point>\d[^_]*)_(?P<depth>%s)_[^_]*_(?P<method>[^_-]*)-(?P<subsample>[^_-]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_neretva_ise_ph'),
+                ('neretva', 'xspectre-gx16-ec'):
+                    file_name_grammar(r'(?P<point>\d[^_]*)_(?P<depth>%s)_(?P<method>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_neretva_gx16_ec'),
+                ('neretva', 'xspectre-penetrometer'):
+                    file_name_grammar(r'(?P<point>[^_]+)_(?P<depth>%s)_(?P<instrument>[^_-]*)-(?P<subsample_replicate>[^_-]*)[^_]*_(?P<method>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_neretva_penetrometer'),
+                ('neretva', 'xspectre-spectra'):
+                    file_name_grammar(r'R(?P<point>[^_]*)_(?P<depth>%s)_(?P<subsample>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_neretva_spectra', True),
+                ('boermarke-zeijen', 'xspectre-penetrometer'):
+                    file_name_grammar(r'(?P<point>[^_]*)_(?P<depth>%s)_[^_-]*(?:-(?P<subsample>[^_-]*)[^_]*)?_(?P<method>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_boermarke_zeijen_penetrometer'),
+                ('boermarke-zeijen', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<point>[^_]*)_(?P<depth>%s)_[^_]*_[^_]*_(?P<subsample>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_boermarke_zeijen_spectra', True),
+                ('jokioinen', 'xspectre-ise-ph'):
+                    file_name_grammar(r'(?!ref)(?P<point>[^_]+)_(?P<depth>%s)_(?P<preparation>%s)_(?P<method>[^_-]*)-(?P<subsample>[^_-]*)%s' %(DEPTH, '|'.join(PREPCODE_D), TAIL),
+                                      '_FN_parameters_jokioinen_ise_ph'),
+                ('jokioinen', 'xspectre-penetrometer'):
+                    file_name_grammar(r'(?P<point>[^_]+)_(?P<depth>%s)_(?P<instrument>[^_-]*)(?:-(?P<subsample>[^_-]*)[^_]*)?_(?P<method>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_jokioinen_penetrometer'),
+                ('jokioinen', 'xspectre-gx16-ec'):
+                    file_name_grammar(r'(?P<point>\d[^_]*)_(?P<depth>%s)_(?P<method>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_jokioinen_gx16_ec'),
+                ('jokioinen', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<point>\d[^_]*)_(?P<plot>[^_]*)_(?P<depth>%s)_(?P<subsample>[^_]*)%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_jokioinen_spectra', True),
+                ('foulum', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<point>\d[^_]*)_(?:(?P<block>\d)_(?P<plot>[^_]*)_(?P<depth>\d%s|COMPTOP|COMPSUB)_[^_]*_(?P<subsample>[^_]*)'
+                                      r'|(?!\d_)(?P<plot_b>[^_]*)_(?P<depth_b>\d%s|COMPTOP|COMPSUB)_(?P<subsample_b>[^_]*))%s' %(DEPTH, DEPTH, TAIL),
+                                      '_FN_parameters_foulum_spectra', True),
+                ('loennstorp', 'xspectre-spectra'):
+                    file_name_grammar(r'(?:(?P<point>\d[^_]*)_(?P<soil>(?i:sand|organic))_(?P<depth>%s)_(?P<subsample>[^_]*)'
+                                      r'|(?P<point_code>%s)_(?P<depth_b>%s)_(?P<subsample_b>[^_]*))%s' %(DEPTH, '|'.join(LOENNSTORP_POINT_ID_D), DEPTH, TAIL),
+                                      '_FN_parameters_loennstorp_spectra', True),
+                ('loennstorp_safe', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<field>[^_]*)_(?P<block>[^_]*)_(?P<plot>[^_]*)_(?P<depth>%s)_(?:(?P<position>\d+)_(?P<replicate>[^_]*)|(?!\d+(?:_|$))(?P<replicate_b>[^_]*))%s' %(DEPTH, TAIL),
+                                      '_FN_parameters_loennstorp_safe_spectra', True),
+                ('munsoe', 'xspectre-spectra'):
+                    file_name_grammar(r'(?:(?P<point>[^_]{1,5})_(?P<plot>[^_]*)_(?P<depth>(?i:d1|d2))_(?P<replicate>[^_]*)%s'
+                                      r'|(?=[^_]{6})(?P<point_b>[^_-]+)-(?P<plot_b>[^_-]*)-(?P<depth_b>(?i:d1|d2))-(?P<replicate_b>[^_-]*)(?:-[^_]*)?%s)' %(TAIL, TAIL),
+                                      '_FN_parameters_munsoe_spectra', True),
+                ('julita', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<point>[^_-]*)-(?P<plot>[^_-]*)(?:-(?P<replicate>[^_-]*)(?:-[^_]*)?)?%s' %(TAIL),
+                                      '_FN_parameters_julita_spectra', True),
+                ('tovetorp', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<point>[^_-]*)-(?P<min_depth>[^_-]*)-(?P<max_depth>[^_-]*)(?:-(?P<replicate>[^_-]*)[^_]*)?%s' %(TAIL),
+                                      '_FN_parameters_tovetorp_spectra', True),
+                ('zazari', 'xspectre-penetrometer'):
+                    file_name_grammar(r'(?P<point>[^_-]*(?:-[^_-]*)?)_(?P<depth>top|sub|post-infiltration)_(?P<subsample>[^_]*)_(?P<method>[^_]*)_[^_]*_(?P<instrument>[^_]*)%s' %(TAIL),
+                                      '_FN_parameters_zazari_penetrometer'),
+                ('zazari', 'xspectre-spectra'):
+                    file_name_grammar(r'(?P<point>[^_]*)_(?P<depth>top|sub)_(?P<subsample>[^_]*)%s' %(TAIL),
+                                      '_FN_parameters_zazari_spectra', True),
+                }
+
+def Set_file_name_grammar(pilot_site, procedure):
+    """
+    @brief Returns the file name grammar of a pilot site and procedure.
+
+    @param pilot_site The pilot site of the process.
+    @param procedure The procedure of the process.
+
+    @return The file_name_grammar, or None if the pilot site and procedure are not in FN_GRAMMAR_D.
+    """
+
+    pilot_site = pilot_site.lower()
+
+    for contained_procedure in FN_GRAMMAR_PROCEDURE_CONTAINS_L:
+
+        if contained_procedure in procedure:
+
+            procedure = contained_procedure
+
+            break
+
+    return FN_GRAMMAR_D.get((pilot_site, procedure))
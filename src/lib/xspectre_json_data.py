@@ -23,11 +23,30 @@ from os import path
 import numpy as np
 
 # Package application imports
+from src.utils import Read_json
+
 from .common import common_json_db
 
-from src.lib import Coordinates_fix
+from .json_sink import json_sink
+
+from .build_manifest import Set_build_manifest
+
+from .spectra_store import Set_spectra_store
+
+from .coordinate_store import Set_coordinate_store
+
+from .row_workers import Loop_csv_rows, Close_outputs
+
+from .white_reference import white_reference_calibration, Scan_epoch, Set_white_reference_interpolation, Set_white_reference_cache, \
+    White_reference_key, Read_white_reference_cache, Write_white_reference_cache
+
+from .xspectre_file_names import PREPCODE_D, LOENNSTORP_POINT_ID_D, ZAZARI_DEPTH_D, FOULUM_DEPTH_D, MUNSOE_DEPTH_D, Set_file_name_grammar
 
 # Default variables
+
+# Number of json files extracted by a worker at a time (optional parameter <workers>)
+XSPECTRE_FILE_SHARD_SIZE = 50
+
 COMPULSARY_DATA_RECORDS = ['pilot_country','pilot','pilot_site','point_id','min_depth','max_depth','sample_date',
                                 'sample_preparation__name','subsample','replicate','sample_analysis_date','sample_preservation__name',
                                 'sample_transport__name','transport_duration_h','sample_storage__name','user_analysis__email',
@@ -68,43 +87,9 @@ SUBSAMPLE_D = {'None':None,'a':"a",'b':"b",'c':"c",'d':"d",'e':"e",'f':"f",'g':"
 
 METHOD_D = {'npkphcth-s':"penetrometer",'ph-ise':"ise-ph",'ise-ph':"ise-ph"}
 
-PREPCODE_D = {'field':'field','mx-lab':"mx-lab", 'in-situ':'field','h2o-iso':'mx-lab'}
-
 LAB_ANALYSIS_METHOD_NAME_D = {'in-situ-TF38415':'ise-ph-soil','h2o-iso':'ise-ph-5xh2o','tds-iso':'tds-bipin-5xh2o','c12880ma':'diffuse-reflectance-spectroscopy',
                               'npkphcth-s':'penetrometer','TF38415':'ise-ph-5xh20','h2o-iso-TF38415':'ise-ph-5xh20'}
 
-LOENNSTORP_POINT_ID_D = {'4':'4-a','04':'4-a','5':'5-a','16':'16-a','20':'20-a','24':'24-a',
-                         '51':'51-c','55':'55-c','60':'60-c','61':'61-c','72':'72-c',
-                         '79':'79-d','80':'80-d','91':'91-d','95':'95-d','99':'99-d'}
-#def find_closest_epoch_date(epoch_L, K):
-
-#    return epoch_L[min(range(len(epoch_L)), key = lambda i: abs(epoch_L[i]-K))]
-
-
-def find_closest_epoch_dates_before_after(epoch_L, K):
-
-    epoch_before_L = [x for x in epoch_L if x < K]
-
-    epoch_after_L = [x for x in epoch_L if x > K]
-
-    if not epoch_before_L:
-
-        before = 0
-
-    else:
-
-        before = epoch_before_L[min(range(len(epoch_before_L)), key = lambda i: abs(epoch_before_L[i]-K))] if epoch_before_L else None
-
-    if not epoch_after_L:
-
-        after = 0
-
-    else:
-
-        after = epoch_after_L[min(range(len(epoch_after_L)), key = lambda i: abs(epoch_after_L[i]-K))] if epoch_after_L else None
-
-    return before, after
-
 class json_db(common_json_db):
     """
     @class json_db
@@ -124,7 +109,7 @@ class json_db(common_json_db):
     - Write sample event data to JSON files.
     """
 
-    def __init__(self, project_FP,process, coordinate_D):
+    def __init__(self, project_FP,process, coordinate_C):
         """
         @brief Constructor for the json_db class, recursively initializes a Struct object from a dictionary.
    
@@ -137,7 +122,12 @@ class json_db(common_json_db):
         @return None
         """
 
-        common_json_db.__init__(self, project_FP,process, coordinate_D)
+        common_json_db.__init__(self, project_FP,process, coordinate_C)
+
+        # The white reference calibration is set by Extract_xspectre_json_v089 (spectra only)
+        self.white_reference_C = None
+
+        self.white_reference_interpolation = 'overall'
 
     def _Check_set_xspectre_compulsary_parameters(self, xspectre_json_D):
 
@@ -241,114 +231,71 @@ class json_db(common_json_db):
     
         return True
         
-    def _FN_parameters_neretva_ise_ph(self, FPN):
+    def _FN_parameters_neretva_ise_ph(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
-
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        if not FN[0].isdigit():
-
-            return None
-
-        FN =  path.splitext(FN)[0]
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-
-        self.record_D['point_id'] = '%s-%s' % (FN_parts[0][0:-1], FN_parts[0][-1].lower())
+        self.record_D['point_id'] = '%s-%s' % (FN_D['point'][0:-1], FN_D['point'][-1].lower())
         
         self.record_D['instrument_id'] = '0'
 
-        method, subsample = FN_parts[3].split('-')
-
-        self.record_D['subsample'] = subsample
+        self.record_D['subsample'] = FN_D['subsample']
 
         self.record_D['replicate'] = 0
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[method]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
 
         return True
     
-    def _FN_parameters_neretva_gx16_ec(self, FPN):
+    def _FN_parameters_neretva_gx16_ec(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
-        
-        # Set record parameters from the file name
-        FN = path.split(FPN)[1]
-
-        if not FN[0].isdigit():
 
-            return None
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        self.record_D['point_id'] = '%s-%s' % (FN_parts[0][0:-1], FN_parts[0][-1].lower())
+        self.record_D['point_id'] = '%s-%s' % (FN_D['point'][0:-1], FN_D['point'][-1].lower())
 
         self.record_D['instrument_id'] = '0'
 
-        method = FN_parts[2]
-
         self.record_D['subsample'] = 'a'
 
         self.record_D['replicate'] = 0
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[method]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
 
         return True
-
-    def _FN_parameters_neretva_penetrometer(self, FPN):
+    
+    def _FN_parameters_neretva_penetrometer(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-
-        self.record_D['point_id'] = '%s-%s' % (FN_parts[0][0:-1], FN_parts[0][-1].lower())
+        self.record_D['point_id'] = '%s-%s' % (FN_D['point'][0:-1], FN_D['point'][-1].lower())
         
-        self.record_D['instrument_id'] = FN_parts[2].split('-')[0].lower()
+        self.record_D['instrument_id'] = FN_D['instrument'].lower()
 
-        subsample_replicate = FN_parts[2].split('-')[1].lower()
+        subsample_replicate = FN_D['subsample_replicate'].lower()
 
         if len(subsample_replicate) == 1:
 
@@ -378,33 +325,23 @@ class json_db(common_json_db):
 
                     self.record_D['replicate'] = subsample_replicate[1]
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_parts[3]]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
 
         return True
-            
-    def _FN_parameters_boermarke_zeijen_penetrometer(self, FPN):
+    
+    def _FN_parameters_boermarke_zeijen_penetrometer(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-
-        self.record_D['point_id'] =  FN_parts[0][2:len(FN_parts[0])].replace(' ', '-').replace('_', '-').lower()
+        self.record_D['point_id'] =  FN_D['point'][2:].replace(' ', '-').lower()
 
         if self.record_D['point_id'].startswith('0'):
 
@@ -420,67 +357,37 @@ class json_db(common_json_db):
 
         self.record_D['instrument_id'] = "0"
 
-        if len(FN_parts) > 2 and '-' in FN_parts[2]:
-
-            self.record_D['subsample'] = FN_parts[2].split('-')[1].lower()
-
-        else:
-
-            self.record_D['subsample'] = 'a'
+        self.record_D['subsample'] = FN_D['subsample'].lower() if FN_D['subsample'] is not None else 'a'
 
         self.record_D['replicate'] = 0
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_parts[3]]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
 
         return True
     
-    def _FN_parameters_zazari_penetrometer(self, FPN):
+    def _FN_parameters_zazari_penetrometer(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
-
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
-      
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        if FN_parts[1] == 'top':
 
-            self.record_D['min_depth'], self.record_D['max_depth'] = '0', '20'
+        self.record_D['min_depth'], self.record_D['max_depth'] = ZAZARI_DEPTH_D[FN_D['depth']]
 
-        elif FN_parts[1] == 'sub':
-
-            self.record_D['min_depth'], self.record_D['max_depth'] = '20', '50'
-
-        elif FN_parts[1] == 'post-infiltration':
-
-            self.record_D['min_depth'], self.record_D['max_depth'] = '0', '8'
+        if FN_D['depth'] == 'post-infiltration':
 
             self.record_D['sample_preparation__name'] = 'post-infiltration'
 
-        else:
-
-            print ('❌  ERROR - depth interval not recognised in filename: %s' % (FN))
-
-            return None
-
-        if len(FN_parts[0]) == 1:
+        if len(FN_D['point']) == 1:
 
-            self.record_D['point_id'] = '0%s' % (FN_parts[0])
+            self.record_D['point_id'] = '0%s' % (FN_D['point'])
         
         else:   
 
-            self.record_D['point_id'] = FN_parts[0]
+            self.record_D['point_id'] = FN_D['point']
 
         if '-' in self.record_D['point_id']:
 
@@ -488,140 +395,86 @@ class json_db(common_json_db):
 
         self.record_D['point_id'] = self.record_D['point_id'].replace(' ', '')
         
-        self.record_D['instrument_id'] = FN_parts[5]
+        self.record_D['instrument_id'] = FN_D['instrument']
 
-        self.record_D['subsample'] = FN_parts[2]
+        self.record_D['subsample'] = FN_D['subsample']
 
         self.record_D['replicate'] = 0
 
         try:
-            self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_parts[3]]
+            self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
         except KeyError:
-            print ('❌  ERROR - analysis method not recognised in filename: %s' % (FN))
+            print ('❌  ERROR - analysis method not recognised in filename: %s' % (path.splitext(path.split(FPN)[1])[0]))
             return None
 
         return True
     
-    def _FN_parameters_jokioinen_penetrometer(self, FPN):
+    def _FN_parameters_jokioinen_penetrometer(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
-
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-
-        self.record_D['point_id'] = '%s-%s' % (FN_parts[0][0:-1], FN_parts[0][-1].lower())
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        self.record_D['instrument_id'] = FN_parts[2].split('-')[0].lower()
+        self.record_D['point_id'] = '%s-%s' % (FN_D['point'][0:-1], FN_D['point'][-1].lower())
 
-        if len(FN_parts) > 2 and '-' in FN_parts[2]:
+        self.record_D['instrument_id'] = FN_D['instrument'].lower()
 
-            self.record_D['subsample'] = FN_parts[2].split('-')[1].lower()
-
-        else:
-
-            self.record_D['subsample'] = 'a'
+        self.record_D['subsample'] = FN_D['subsample'].lower() if FN_D['subsample'] is not None else 'a'
 
         self.record_D['replicate'] = 0
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_parts[3]]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
 
         return True
     
-    def _FN_parameters_jokioinen_ise_ph(self, FPN):
+    def _FN_parameters_jokioinen_ise_ph(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        if FN.startswith('ref'):
-
-            return None
-
-        FN =  path.splitext(FN)[0]
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-        
-        self.record_D['point_id'] = '%s-%s' % (FN_parts[0][0:-1], FN_parts[0][-1].lower())
+        self.record_D['point_id'] = '%s-%s' % (FN_D['point'][0:-1], FN_D['point'][-1].lower())
 
         self.record_D['instrument_id'] = '0'
 
-        method, subsample = FN_parts[3].split('-')
-
-        method = '%s-%s' %(FN_parts[2], method)
-
-        if len(FN_parts) > 2 and '-' in FN_parts[3]:
-
-            self.record_D['subsample'] = subsample.lower()
-
-        else:
-
-            self.record_D['subsample'] = 'a'
+        self.record_D['subsample'] = FN_D['subsample'].lower()
 
         self.record_D['replicate'] = 0
 
-        self.record_D['sample_preparation__name'] = PREPCODE_D[FN_parts[2]]
+        self.record_D['sample_preparation__name'] = PREPCODE_D[FN_D['preparation']]
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[method]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D['%s-%s' %(FN_D['preparation'], FN_D['method'])]
 
         if self.record_D['sample_preparation__name'] == 'field':
             self.record_D['instrument_brand__name'] = 'soil-ise-ph'
 
         return True 
     
-    def _FN_parameters_jokioinen_gx16_ec(self, FPN):
+    def _FN_parameters_jokioinen_gx16_ec(self, FPN, FN_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        if not FN[0].isdigit():
-
-            return None
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        self.record_D['point_id'] = '%s-%s' % (FN_parts[0][0:-1], FN_parts[0][-1].lower())
+        self.record_D['point_id'] = '%s-%s' % (FN_D['point'][0:-1], FN_D['point'][-1].lower())
 
         self.record_D['instrument_id'] = '0'
             
@@ -629,42 +482,28 @@ class json_db(common_json_db):
 
         self.record_D['replicate'] = 0
 
-        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_parts[2]]
+        self.record_D['analysis_method__name'] = LAB_ANALYSIS_METHOD_NAME_D[FN_D['method']]
 
         return True 
     
-    def _FN_parameters_jokioinen_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_jokioinen_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        if not FN[0].isdigit():
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-            return None
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[2].split('-')
-
-        self.record_D['point_id'] =  '%s-%s' %(FN_parts[0].lower(), 
-                                              FN_parts[1].lower())
+        self.record_D['point_id'] =  '%s-%s' %(FN_D['point'].lower(), FN_D['plot'].lower())
 
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
             
-        self.record_D['subsample'] = FN_parts[3].lower()
+        self.record_D['subsample'] = FN_D['subsample'].lower()
 
         self.record_D['replicate'] = 0
 
@@ -678,38 +517,25 @@ class json_db(common_json_db):
 
         return True 
     
-    def _FN_parameters_neretva_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_neretva_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
-
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        if FN[0] != 'R':
-
-            return None
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-
-        self.record_D['point_id'] =  '%s-%s' %(FN_parts[0][1:].lower(),
-                                              FN_parts[0][0].lower())
+        # The file names start with R, e.g. R12_0-20_a
+        self.record_D['point_id'] =  '%s-r' %(FN_D['point'].lower())
 
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
             
-        self.record_D['subsample'] = FN_parts[2].lower()
+        self.record_D['subsample'] = FN_D['subsample'].lower()
 
         self.record_D['replicate'] = 0
 
@@ -725,75 +551,36 @@ class json_db(common_json_db):
 
         return True 
     
-    def _FN_parameters_foulum_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_foulum_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
-
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        if not FN[0].isdigit():
-
-            return None
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        if len(FN_parts[1]) == 1 and FN_parts[1][0].isdigit():  
-
-            self.record_D['point_id'] =  '%s-%s-%s' %(FN_parts[0].lower(), 
-                                                FN_parts[1].lower(),FN_parts[2].lower())  
-            
-            if FN_parts[3][0].isdigit():
-
-                self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[3].split('-')
-
-            elif FN_parts[3] == 'COMPTOP':
-
-                self.record_D['min_depth'], self.record_D['max_depth'] = "0", "20"
-
-            elif FN_parts[3] == 'COMPSUB':
-
-                self.record_D['min_depth'], self.record_D['max_depth'] = "20", "50"
+        if FN_D['block'] is not None:
 
-            else:
-
-                return None
+            self.record_D['point_id'] =  '%s-%s-%s' %(FN_D['point'].lower(), FN_D['block'].lower(), FN_D['plot'].lower())
 
-            self.record_D['subsample'] = FN_parts[5].lower()
+            depth, self.record_D['subsample'] = FN_D['depth'], FN_D['subsample'].lower()
 
         else:
 
-            self.record_D['point_id'] =  '%s-%s' %(FN_parts[0].lower(), 
-                                                FN_parts[1].lower())
-  
-            self.record_D['subsample'] = FN_parts[3].lower()
-
-            if FN_parts[2][0].isdigit():
-
-                self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[2].split('-')
+            self.record_D['point_id'] =  '%s-%s' %(FN_D['point'].lower(), FN_D['plot_b'].lower())
 
-            elif FN_parts[2] == 'COMPTOP':
+            depth, self.record_D['subsample'] = FN_D['depth_b'], FN_D['subsample_b'].lower()
 
-                self.record_D['min_depth'], self.record_D['max_depth'] = "0", "20"
+        if depth in FOULUM_DEPTH_D:
 
-            elif FN_parts[2] == 'COMPSUB':
+            self.record_D['min_depth'], self.record_D['max_depth'] = FOULUM_DEPTH_D[depth]
 
-                self.record_D['min_depth'], self.record_D['max_depth'] = "20", "50"
-
-            else:
+        else:
 
-                return None
+            self.record_D['min_depth'], self.record_D['max_depth'] = depth.split('-')
             
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
 
@@ -823,46 +610,32 @@ class json_db(common_json_db):
 
         return True 
     
-    def _FN_parameters_loennstorp_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_loennstorp_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        if not FN[0].isdigit():
-
-            return None
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
+        if FN_D['soil'] is not None:
 
-        if FN_parts[1].lower() in ['sand','organic']:  
+            self.record_D['point_id'] =  '%s-%s' %(FN_D['point'][-1].lower(), FN_D['soil'].lower())
 
-            self.record_D['point_id'] =  '%s-%s' %(FN_parts[0][len(FN_parts[0])-1].lower(), 
-                                                FN_parts[1].lower())  
+            self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-            self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[2].split('-')
-
-            self.record_D['subsample'] = FN_parts[3].lower()
+            self.record_D['subsample'] = FN_D['subsample'].lower()
 
         else:
 
-            self.record_D['point_id'] =  LOENNSTORP_POINT_ID_D[FN_parts[0]]
+            self.record_D['point_id'] =  LOENNSTORP_POINT_ID_D[FN_D['point_code']]
    
-            self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
+            self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth_b'].split('-')
 
-            self.record_D['subsample'] = FN_parts[2].lower()
+            self.record_D['subsample'] = FN_D['subsample_b'].lower()
    
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
 
@@ -880,53 +653,37 @@ class json_db(common_json_db):
 
         return True 
     
-    def _FN_parameters_munsoe_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_munsoe_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
-
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
         # different naming versions at different occassions
-        if (len(FN_parts[0]) > 5):
-
-            FN_parts = FN_parts[0].split('-')
+        if FN_D['point'] is not None:
 
-        if not FN_parts[0][0].isdigit():
+            point, plot, depth, replicate = FN_D['point'], FN_D['plot'], FN_D['depth'], FN_D['replicate']
 
-            FN_parts[0] = '%s%s' %(FN_parts[0][1:len(FN_parts[0])], FN_parts[0][0])
- 
-        self.record_D['point_id'] =  '%s-%s' %(FN_parts[0].lower(), 
-                                            FN_parts[1].lower())  
-
-        if FN_parts[2].lower() == 'd1':
+        else:
 
-            self.record_D['min_depth'], self.record_D['max_depth'] = "0", "20"
+            point, plot, depth, replicate = FN_D['point_b'], FN_D['plot_b'], FN_D['depth_b'], FN_D['replicate_b']
 
-        elif FN_parts[2].lower() == 'd2':
+        if not point[0].isdigit():
 
-            self.record_D['min_depth'], self.record_D['max_depth'] = "20", "50"
-        
-        else:
+            point = '%s%s' %(point[1:], point[0])
+ 
+        self.record_D['point_id'] =  '%s-%s' %(point.lower(), plot.lower())  
 
-            return None
+        self.record_D['min_depth'], self.record_D['max_depth'] = MUNSOE_DEPTH_D[depth.lower()]
         
-        if FN_parts[3].lower() in ['a', 'b', 'c']:
+        if replicate.lower() in ['a', 'b', 'c']:
 
-            self.record_D['replicate'] = FN_parts[3].lower()
+            self.record_D['replicate'] = replicate.lower()
 
         else:
 
@@ -952,53 +709,34 @@ class json_db(common_json_db):
 
         return True
     
-    def _FN_parameters_loennstorp_safe_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_loennstorp_safe_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        try:
-            
-            self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[3].split('-') 
-        
-        except ValueError:
-            
-            print(" ❌ ERROR - invalid depth format in file name %s" % FN)
-            
-            return None
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-') 
 
         self.record_D['subsample'] = 'a'
    
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
 
-        if FN_parts[4].isdigit():
+        if FN_D['position'] is not None:
 
-            self.record_D['point_id'] =  '%s-%s-%s_%s' %(FN_parts[0].lower(), 
-                                            FN_parts[1].lower(),FN_parts[2].lower(),FN_parts[4])
+            self.record_D['point_id'] =  '%s-%s-%s_%s' %(FN_D['field'].lower(), FN_D['block'].lower(), FN_D['plot'].lower(), FN_D['position'])
             
-            self.record_D['replicate'] = FN_parts[5].lower()
+            self.record_D['replicate'] = FN_D['replicate'].lower()
 
         else:
 
-            self.record_D['point_id'] =  '%s-%s-%s' %(FN_parts[0].lower(), 
-                                            FN_parts[1].lower(),FN_parts[2].lower())
+            self.record_D['point_id'] =  '%s-%s-%s' %(FN_D['field'].lower(), FN_D['block'].lower(), FN_D['plot'].lower())
             
-            self.record_D['replicate'] = FN_parts[4].lower()
+            self.record_D['replicate'] = FN_D['replicate_b'].lower()
         
         self.record_D['analysis_method__name'] = 'diffuse-reflectance-spectroscopy'
 
@@ -1012,47 +750,31 @@ class json_db(common_json_db):
 
         return True
     
-    def _FN_parameters_julita_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_julita_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
         if not 'sensor-serialnr' in xspectre_json_D:
 
             xspectre_json_D['sensor-serialnr'] = "unknown"
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
+        # <point>-<replicate> or <point>-<plot>-<replicate>
+        if FN_D['replicate'] is None:
 
-        FN_parts = FN.split('_')
-
-        items = FN_parts[0].split('-')
-
-        if len(items) == 1:
-
-            print ('ERROR - invalid point_id format in file name %s' % FN)
-
-            return None
-
-        if len(items) == 2:
-
-            self.record_D['point_id'], self.record_D['replicate'] = items
+            self.record_D['point_id'], self.record_D['replicate'] = FN_D['point'], FN_D['plot']
 
         else:
             
-            self.record_D['replicate'] = items[2]
+            self.record_D['replicate'] = FN_D['replicate']
 
-            self.record_D['point_id'] = '%s-%s' %(items[0], items[1])
+            self.record_D['point_id'] = '%s-%s' %(FN_D['point'], FN_D['plot'])
 
         self.record_D['point_id'] = self.record_D['point_id'].lower().replace('\u0308', '').replace('\u030a', '').replace('blomm', 'blom')
         
@@ -1076,41 +798,28 @@ class json_db(common_json_db):
 
         return True
     
-    def _FN_parameters_tovetorp_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_tovetorp_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
         if not 'sensor-serialnr' in xspectre_json_D:
 
             xspectre_json_D['sensor-serialnr'] = "unknown"
 
-        FN = path.split(FPN)[1]
-
-        print (FN)
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        items = FN_parts[0].split('-')
-
-        self.record_D['point_id'] = items[0]
+        self.record_D['point_id'] = FN_D['point']
         
-        self.record_D['min_depth'], self.record_D['max_depth'] = items[1],items[2]
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['min_depth'], FN_D['max_depth']
 
-        if len(items) > 3:
+        if FN_D['replicate'] is not None:
 
-            self.record_D['replicate'] = items[3]
+            self.record_D['replicate'] = FN_D['replicate']
 
         else:
             
@@ -1134,29 +843,20 @@ class json_db(common_json_db):
 
         return True
     
-    def _FN_parameters_boermarke_zeijen_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_boermarke_zeijen_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
-
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
+        self.record_D['min_depth'], self.record_D['max_depth'] = FN_D['depth'].split('-')
 
-        self.record_D['min_depth'], self.record_D['max_depth'] = FN_parts[1].split('-')
-
-        self.record_D['point_id'] =  FN_parts[0][2:].replace(' ', '-').replace('_', '-').lower()
+        self.record_D['point_id'] =  FN_D['point'][2:].replace(' ', '-').lower()
 
         if self.record_D['point_id'].startswith('0'):
 
@@ -1168,7 +868,7 @@ class json_db(common_json_db):
 
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
 
-        self.record_D['subsample'] = FN_parts[4].lower()
+        self.record_D['subsample'] = FN_D['subsample'].lower()
 
         self.record_D['replicate'] = 0
 
@@ -1176,44 +876,24 @@ class json_db(common_json_db):
 
         return True
     
-    def _FN_parameters_zazari_spectra(self, FPN, xspectre_json_D):
+    def _FN_parameters_zazari_spectra(self, FPN, FN_D, xspectre_json_D):
         """
-        @brief Ensures all compulsory record parameters are set in the row data dictionary.
-
-        This function checks and sets compulsory parameters required for a data record. If the parameter
-        cannot be found, an error message is printed with instructions for resolving the issue.
+        @brief Sets the record parameters from the named groups of the file name, see FN_GRAMMAR_D.
 
-        @details
-        - Iterates through COMPULSARY_DATA_RECORDS to ensure each is present and non-empty.
-        - Prints error and instructions if a compulsory parameter cannot be found.
+        @param FPN Path of the json file.
+        @param FN_D Named groups of the file name, see file_name_grammar._Parse.
+        @param xspectre_json_D The xspectre json dictionary.
 
-        @return True if all compulsory parameters are set successfully, None if any are missing and cannot be resolved.
+        @return True if successful, None otherwise.
         """
 
-        FN = path.split(FPN)[1]
-
-        FN =  path.splitext(FN)[0]
-
-        FN_parts = FN.split('_')
-
-        if FN_parts[1] == 'top' :
-            
-            self.record_D['min_depth'], self.record_D['max_depth'] = "0", "20"
-
-        elif FN_parts[1] == 'sub' :
-            self.record_D['min_depth'], self.record_D['max_depth'] = "20", "50"
-
-        else:
-
-            print ('ERROR - invalid depth format for Zazari in file name %s' % FN)
-
-            return None
+        self.record_D['min_depth'], self.record_D['max_depth'] = ZAZARI_DEPTH_D[FN_D['depth']]
 
-        self.record_D['point_id'] =  FN_parts[0].replace(' ', '-').replace('_', '-').lower()
+        self.record_D['point_id'] =  FN_D['point'].replace(' ', '-').lower()
 
         self.record_D['instrument_id'] = xspectre_json_D['sensor-serialnr']
 
-        self.record_D['subsample'] = FN_parts[2].lower()
+        self.record_D['subsample'] = FN_D['subsample'].lower()
 
         self.record_D['replicate'] = 0
 
@@ -1221,85 +901,41 @@ class json_db(common_json_db):
 
         return True
     
-    def _Get_spectra_white_reference(self, spectra_epoch_time, white_reference_D):
-
-        # TGTODO - check that it is the same instrument and scan tuning
-        white_reference_epoch_L = list(white_reference_D.keys())
-
-        before, after = find_closest_epoch_dates_before_after(white_reference_epoch_L, spectra_epoch_time)
-
-        if before and after:
-           
-            pass
-            #def divide(x): return x / 2
-
-            #L = [white_reference_D[before]['value'], white_reference_D[after]['value']]
-
-            #white_reference_value = list(map(divide, map(sum, zip(*L))))
-
-            #L = [white_reference_D[before]['standard_deviation'], white_reference_D[after]['standard_deviation']]
-
-            #white_reference_standard_deviation = list(map(divide, map(sum, zip(*L))))
-
-        elif len(white_reference_epoch_L) > 1:
-            # Get the average of all white references if there are more than one
-
-            L = []
-
-            for key in white_reference_D:
-
-                L.append(white_reference_D[key]['value_A'])
-
-            A = np.array(L)
-
-            mean_A = np.mean(np.array(A), axis=0)
-
-            var_A = np.std(np.array(A), axis=0) * np.std(np.array(A), axis=0)
-
-            total_samlple_size = len(L)*3
-
-            within_group_sum_of_squares = (len(L)-1) * var_A
-
-            between_group_sum_of_squares = sum((mean_A - np.mean(A, axis=0)) * (mean_A - np.mean(A, axis=0))) * len(L)
-
-            pooled_variance_A = (within_group_sum_of_squares + between_group_sum_of_squares) / (total_samlple_size - 1)
-
-            overall_standard_deviation_A = np.sqrt(pooled_variance_A)
-
-            pooled_mean_A = mean_A
-
-            white_reference_value_A = white_reference_D[white_reference_epoch_L[0]]['value_A']
+    def _Get_spectra_white_reference(self, spectra_epoch_time):
+        """
+        @brief Sets the white reference value and dark arrays used for the reflectance of the sample.
 
-            white_reference_value_standard_deviation_A = white_reference_D[white_reference_epoch_L[0]]['standard_deviation_A']
-      
-        elif before:
+        @details
+        With white_reference_interpolation 'time' the white references before and after the sample are
+        interpolated by the scan time (see white_reference_calibration._Interpolate), otherwise (or without a
+        scan time or white reference records) the overall mean and standard deviation of all white references
+        are used.
 
-            white_reference_value_A = white_reference_D[before]['value_A']
+        @param spectra_epoch_time The scan time of the sample (see Scan_epoch), or None.
 
-            white_reference_value_standard_deviation_A = white_reference_D[before]['standard_deviation_A']
+        @return None
+        """
 
-        elif after:
+        white_reference_C = self.white_reference_C
 
-            white_reference_value_A = white_reference_D[after]['value_A']
+        white_reference_A_L = None
 
-            white_reference_value_standard_deviation_A = white_reference_D[after]['standard_deviation_A']
+        if self.white_reference_interpolation == 'time' and spectra_epoch_time is not None:
 
-        else:
+            # TGTODO - check that it is the same instrument and scan tuning
+            white_reference_A_L = white_reference_C._Interpolate(spectra_epoch_time)
 
-            return None
-        
-        self.white_reference_value_A = white_reference_value_A
+        if white_reference_A_L is None:
 
-        self.white_reference_value_standard_deviation_A = white_reference_value_standard_deviation_A
+            white_reference_A_L = (white_reference_C.value_mean_A, white_reference_C.value_standard_deviation_A,
+                                   white_reference_C.dark_mean_A, white_reference_C.dark_standard_deviation_A)
 
-        return True
+        self.white_reference_value_A, self.white_reference_value_standard_deviation_A, \
+            self.white_reference_dark_A, self.white_reference_dark_standard_deviation_A = white_reference_A_L
     
     def _Calculate_spectra_reflectance(self):
 
-        # global overall_white_reference_value_mean_A, overall_white_reference_value_standard_deviation_A
-        # global overall_white_reference_dark_mean_A, overall_white_reference_dark_standard_deviation_A
-
-        self.record_D['sample_reflectance_A'] = white_reference_reflectance_A = white_reference_reflectance_A = overall_white_reference_value_mean_A - overall_white_reference_dark_mean_A
+        self.record_D['sample_reflectance_A'] = white_reference_reflectance_A = white_reference_reflectance_A = self.white_reference_value_A - self.white_reference_dark_A
 
         self.record_D['sample_reflectance_A'] = sample_reflectance_A = self.record_D['value_A'] - self.record_D['dark_A']
 
@@ -1319,7 +955,7 @@ class json_db(common_json_db):
         #self.record_D['reflectance_value_A'] = reflectance_value_A = self.record_D['value_A'] - self.record_D['dark_value_A']
 
         # See https://www.statisticshowto.com/statistics-basics/error-propagation/#addition
-        white_reference_standard_deviation_A = np.sqrt(overall_white_reference_value_standard_deviation_A + overall_white_reference_dark_standard_deviation_A)
+        white_reference_standard_deviation_A = np.sqrt(self.white_reference_value_standard_deviation_A + self.white_reference_dark_standard_deviation_A)
 
         sample_standard_deviation_A = np.sqrt(self.record_D['value_standard_deviation_A'] + self.record_D['dark_standard_deviation_A'] )
 
@@ -1427,6 +1063,8 @@ class json_db(common_json_db):
             
             self.record_D['reflectance_standard_deviation_A'][self.record_D['value_A'] > self.record_D['max_dn']] = -9999   
 
+        white_reference_max_A = self.white_reference_C.max_A
+
         n_saturated_reference_values = (white_reference_max_A > self.record_D['max_dn']).sum()
 
         if n_saturated_reference_values > 0:
@@ -1466,8 +1104,8 @@ class json_db(common_json_db):
 
         if 'samplestd' in xspectre_json_D:
 
-            observation_D =  {'value': self.record_D['reflectance_value_A'].tolist(), 
-                        'standard_deviation': self.record_D['reflectance_standard_deviation_A'].tolist(), 
+            observation_D =  {'value': self._Store_array('reflectance_value', self.record_D['reflectance_value_A']), 
+                        'standard_deviation': self._Store_array('reflectance_standard_deviation', self.record_D['reflectance_standard_deviation_A']), 
                         #'n_repeats': self.record_D['n_repeats'],
                         'unit__name': self.record_D['unit__name'],
                         'indicator__name':  self.record_D['indicator__name'],
@@ -1478,7 +1116,7 @@ class json_db(common_json_db):
                         'instrument_id': self.record_D['instrument_id']}
         else:
 
-            observation_D =  {'value': self.record_D['reflectance_value_A'].tolist(), 
+            observation_D =  {'value': self._Store_array('reflectance_value', self.record_D['reflectance_value_A']), 
                         #'n_repeats': self.record_D['n_repeats'],
                         'unit__name': self.record_D['unit__name'],
                         'indicator__name':  'reflectance',
@@ -1496,16 +1134,16 @@ class json_db(common_json_db):
                         
                         }
         
-        self.original_scan_dn_D = {'sample_mean': xspectre_json_D['samplemean'],
-                            'sample_standard_deviation': xspectre_json_D['samplestd'],
-                            'dark_mean': xspectre_json_D['darkmean']
+        self.original_scan_dn_D = {'sample_mean': self._Store_array('scan_dn_sample_mean', xspectre_json_D['samplemean']),
+                            'sample_standard_deviation': self._Store_array('scan_dn_sample_standard_deviation', xspectre_json_D['samplestd']),
+                            'dark_mean': self._Store_array('scan_dn_dark_mean', xspectre_json_D['darkmean'])
                             }
         
         if xspectre_json_D[self.equipment]['darkrepeats'] > 1:
 
-            self.original_scan_dn_D['dark_standard_deviation'] = xspectre_json_D['darkstd']
+            self.original_scan_dn_D['dark_standard_deviation'] = self._Store_array('scan_dn_dark_standard_deviation', xspectre_json_D['darkstd'])
         
-        self.white_reference_D ={"white_reference":white_reference_FN_L}
+        self.white_reference_D ={"white_reference":list(self.white_reference_C.FN_L)}
         
         self.equipment_method_D[self.equipment].append(observation_D)
 
@@ -1562,281 +1200,283 @@ class json_db(common_json_db):
 
         self.record_D['sample_date'] = FN_parts[len(FN_parts)-2]
     
-def Extract_xspectre_json_v089(project_FP, process, json_FPN, white_reference_D, coordinate_D):
+class xspectre_extractor:
     """
-    @brief Processes CSV data records and exports them to hierarchical JSON format for AI4SH in-situ data management.
+    @class xspectre_extractor
+    @brief Extracts the xspectre json data files of a process, see _Extract.
 
     @details
-    This function orchestrates the conversion of CSV data rows into structured JSON sample events. 
-    It initializes the json_db class, sets up output folders, cleans column headers, distills parameter dictionaries, 
-    checks consistency, and loops through each data record to assemble and export sample events.
-
-    - Initializes the json_db class with process parameters.
-    - Sets up the destination folder for JSON output.
-    - Cleans and normalizes column headers.
-    - Distills parameter, method, equipment, and unit dictionaries.
-    - Checks consistency among method, equipment, and unit mappings.
-    - Adds compulsory parameters with default values if missing.
-    - Loops through each data record:
-        - Initializes equipment-method mapping.
-        - Converts row data to dictionary.
-        - Ensures all compulsory parameters are set.
-        - Extracts and processes observation measurements.
-        - Sets unique identifiers for pilot, site, point, and sample.
-        - Sets observation metadata, sample, and sampling log.
-        - Assembles the sample event and exports to JSON.
-
-    @param process Object containing process parameters, expected to have a 'parameters' attribute.
-    @param column_L List of column header strings from the CSV file.
-    @param data_L_L List of lists, each representing a row of data from the CSV file.
-    @param all_parameter_D Dictionary mapping column headers to parameter names.
-    @param unit_D Dictionary mapping column headers to unit names.
-    @param method_D Dictionary mapping column headers to method names.
-    @param equipment_D Dictionary mapping column headers to equipment names.
-    @param std_row (Optional) Standard deviation row or index, if available.
-
-    @return None if any error occurs during processing, otherwise creates JSON files for each sample event.
+    The extractor is created once per process run (and once per worker process). The json_db instance, the
+    destination folders, the sink, the spectra store, the white reference calibration and the function that
+    extracts the parameters from the file names of the site and procedure (see FN_GRAMMAR_D) are set once in
+    the constructor.
+    Each json file is then extracted by _Extract with the same json_db instance, the record of the previous
+    file is replaced when the next file is read.
     """
 
-    from src.utils import Read_json
+    def __init__(self, project_FP, process, white_reference_C, coordinate_C, json_sink_C=None, spectra_store_C=None):
+        """
+        @brief Constructor for the xspectre_extractor class.
 
-    # Initiate the json_db class
-    json_db_C = json_db(project_FP,process, coordinate_D)
+        @param project_FP The project folder path.
+        @param process Object containing process parameters, expected to have a 'parameters' attribute.
+        @param white_reference_C white_reference_calibration of the process (spectra only, otherwise None).
+        @param coordinate_C coordinate_store of the point name, position and sample date file.
+        @param json_sink_C (Optional) json sink shared by all files in the process, defaults to one json file per sample event.
+        @param spectra_store_C (Optional) binary spectra store shared by all files in the process, defaults to spectra embedded in the json.
 
-    # Create the destination folder if it doesn't exist
-    json_db_C._Set_dst_FP()
+        @return None
+        """
 
-    # Read the json data file
-    xspectre_json_D = Read_json(json_FPN)
+        self.process = process
 
-    # Check that all compulsory parameters are set in the xspectre json
-    result = json_db_C._Check_set_xspectre_compulsary_parameters(xspectre_json_D)
+        # Initiate the json_db class
+        self.json_db_C = json_db(project_FP,process, coordinate_C)
 
-    if not result:
+        # Set the sink that receives the assembled sample events and the spectra store
+        self.json_db_C.json_sink_C = json_sink_C
 
-        return None
-    
-    # Create a hierarchical dictionary to hold equipment -> methods (must be recreated in each loop)
-    json_db_C._Set_equipment_method()
+        self.json_db_C.spectra_store_C = spectra_store_C
 
-    # ===== Direct the extraction of parameters from file name to the correct functionsite/function =====
+        self.json_db_C.white_reference_C = white_reference_C
 
-    if process.parameters.pilot_site.lower() == 'neretva' and\
-         'xspectre-ise-ph' in process.parameters.procedure:
-       
-        result = json_db_C._FN_parameters_neretva_ise_ph(json_FPN)
+        self.json_db_C.white_reference_interpolation = Set_white_reference_interpolation(process) if white_reference_C else 'overall'
 
-    elif process.parameters.pilot_site.lower() == 'neretva' and\
-         process.parameters.procedure == 'xspectre-gx16-ec':
-       
-        result = json_db_C._FN_parameters_neretva_gx16_ec(json_FPN)
+        if self.json_db_C.white_reference_interpolation == 'time' and not white_reference_C.epoch_L:
 
-    elif process.parameters.pilot_site.lower() == 'neretva' and\
-         process.parameters.procedure == 'xspectre-penetrometer':
-       
-        result = json_db_C._FN_parameters_neretva_penetrometer(json_FPN)
+            print (' ⚠️ WARNING - no white reference has a valid scandate, using white_reference_interpolation <overall>')
 
-    elif process.parameters.pilot_site.lower() == 'boermarke-zeijen' and\
-         process.parameters.procedure == 'xspectre-penetrometer':
+            self.json_db_C.white_reference_interpolation = 'overall'
 
-        result = json_db_C._FN_parameters_boermarke_zeijen_penetrometer(json_FPN)
+        # Create the destination folder if it doesn't exist
+        self.json_db_C._Set_dst_FP()
 
-    elif process.parameters.pilot_site.lower() == 'jokioinen' and\
-         'xspectre-ise-ph' in process.parameters.procedure:
+        # The file name grammar of the site and procedure, and the json_db function that sets the record parameters
+        self.grammar_C = Set_file_name_grammar(process.parameters.pilot_site, process.parameters.procedure)
 
-        result = json_db_C._FN_parameters_jokioinen_ise_ph(json_FPN)
+        self.FN_parameters = getattr(self.json_db_C, self.grammar_C.parser) if self.grammar_C else None
 
-    elif process.parameters.pilot_site.lower() == 'jokioinen' and\
-         process.parameters.procedure == 'xspectre-penetrometer':
+    def _Extract(self, json_FPN):
+        """
+        @brief Extracts a single xspectre json data file and exports the sample event to the AI4SH and xspectre json formats.
 
-        result = json_db_C._FN_parameters_jokioinen_penetrometer(json_FPN)
+        @param json_FPN Path of the xspectre json data file.
 
-    elif process.parameters.pilot_site.lower() == 'jokioinen' and\
-         process.parameters.procedure == 'xspectre-gx16-ec':
+        @return True if the sample event was assembled, None if an error occurred.
+        """
 
-        result = json_db_C._FN_parameters_jokioinen_gx16_ec(json_FPN)
+        json_db_C = self.json_db_C
 
-    elif process.parameters.pilot_site.lower() == 'jokioinen' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        process = self.process
 
-        result = json_db_C._FN_parameters_jokioinen_spectra(json_FPN,xspectre_json_D)
+        # Read the json data file
+        xspectre_json_D = Read_json(json_FPN)
 
-    elif process.parameters.pilot_site.lower() == 'neretva' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        # Check that all compulsory parameters are set in the xspectre json
+        result = json_db_C._Check_set_xspectre_compulsary_parameters(xspectre_json_D)
 
-        result = json_db_C._FN_parameters_neretva_spectra(json_FPN,xspectre_json_D)
+        if not result:
 
-    elif process.parameters.pilot_site.lower() == 'foulum' and\
-         process.parameters.procedure == 'xspectre-spectra':
+            return None
+    
+        # Create a hierarchical dictionary to hold equipment -> methods (must be recreated in each loop)
+        json_db_C._Set_equipment_method()
 
-        result = json_db_C._FN_parameters_foulum_spectra(json_FPN,xspectre_json_D)
+        # ===== Extract the parameters from the file name with the function of the site and procedure =====
 
-    elif process.parameters.pilot_site.lower() == 'loennstorp' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        if self.FN_parameters is None:
 
-        result = json_db_C._FN_parameters_loennstorp_spectra(json_FPN,xspectre_json_D)
+            print('❌  ERROR - pilot site observation not recognised: %s, %s' % (process.parameters.pilot_site, process.parameters.procedure))
 
-    elif process.parameters.pilot_site.lower() == 'munsoe' and\
-         process.parameters.procedure == 'xspectre-spectra':
+            return None
 
-        result = json_db_C._FN_parameters_munsoe_spectra(json_FPN,xspectre_json_D)
+        FN_D = self.grammar_C._Parse(json_FPN)
 
-    elif process.parameters.pilot_site.lower() == 'loennstorp_safe' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        if FN_D is None:
 
-        result = json_db_C._FN_parameters_loennstorp_safe_spectra(json_FPN,xspectre_json_D)
+            result = None
 
-    elif process.parameters.pilot_site.lower() == 'julita' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        elif self.grammar_C.with_json:
 
-        result = json_db_C._FN_parameters_julita_spectra(json_FPN,xspectre_json_D)
+            result = self.FN_parameters(json_FPN, FN_D, xspectre_json_D)
 
-    elif process.parameters.pilot_site.lower() == 'tovetorp' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        else:
 
-        result = json_db_C._FN_parameters_tovetorp_spectra(json_FPN,xspectre_json_D)
+            result = self.FN_parameters(json_FPN, FN_D)
 
-    elif process.parameters.pilot_site.lower() == 'boermarke-zeijen' and\
-         process.parameters.procedure == 'xspectre-spectra':
+        if not result:
 
-        result = json_db_C._FN_parameters_boermarke_zeijen_spectra(json_FPN,xspectre_json_D)
+            print('❌  ERROR - setting record parameters from file name failed: %s' % (path.split(json_FPN))[1])
 
-    elif process.parameters.pilot_site.lower() == 'zazari' and\
-         process.parameters.procedure == 'xspectre-penetrometer':
-        
-        result = json_db_C._FN_parameters_zazari_penetrometer(json_FPN)
+            return None
+    
+        # ===== Sepcial handling for creating csv file of locus, samle data and corrdinates =====
+        if process.parameters.procedure == 'xspectre-penetrometer':
 
-    elif process.parameters.pilot_site.lower() == 'zazari' and\
-         process.parameters.procedure == 'xspectre-spectra':
+            pass
 
-        result = json_db_C._FN_parameters_zazari_spectra(json_FPN,xspectre_json_D)
+            #json_db_C._Xspectre_sample_dates(json_FPN)
 
-    else:
+        # ===== Reorganise all inpit data into a single record dictionary =====
 
-        print('❌  ERROR - pilot site observation not recognised: %s, %s' % (process.parameters.pilot_site, process.parameters.procedure))
+        # Set the location (locus) sample date and coordinate parameters
+        # These must be given in a separate csv file
+        result = json_db_C._Set_locus_sample_date_coordinate()
 
-        return None
+        if not result:
 
-    if not result:
+            return None
+    
+        # Add compulsary parameters with default values if they are not in the source data
+        # json_db_C._Add_xspectre_compulsary_default_parameters(xspectre_json_D)
+        # Check and set the final record parameters
+        result = json_db_C._Check_set_final_record(json_FPN)
 
-        print('❌  ERROR - setting record parameters from file name failed: %s' % (path.split(json_FPN))[1])
+        if not result:
 
-        return None
+            return None
     
-    # ===== Sepcial handling for creating csv file of locus, samle data and corrdinates =====
-    if process.parameters.procedure == 'xspectre-penetrometer':
+        # Set the sampling log parameters
+        json_db_C._Set_sampling_log()
 
-        pass
+        # Set sample id
+        json_db_C._Set_sample_id()
+    
+        # ===== Set the DB output objects =====
 
-        #json_db_C._Xspectre_sample_dates(json_FPN)
+        # Set the db object point
+        json_db_C._Set_point()
 
-    # ===== Reorganise all inpit data into a single record dictionary =====
+        # Set the db object site
+        json_db_C._Set_site()
 
-    # Set the location (locus) sample date and coordinate parameters
-    # These must be given in a separate csv file
-    result = json_db_C._Set_locus_sample_date_coordinate()
+        # Set the db object data_soruce (= pilot for AI4SH)
+        json_db_C._Set_data_source()
 
-    if not result:
+        # Set the observation metadata
+        result = json_db_C._Set_observation_metadata()
+    
+        if not result:
 
-        return None
+            return None
     
-    # Add compulsary parameters with default values if they are not in the source data
-    # json_db_C._Add_xspectre_compulsary_default_parameters(xspectre_json_D)
-    # Check and set the final record parameters
-    result = json_db_C._Check_set_final_record(json_FPN)
+        # Set the sample parameters
+        json_db_C._Set_sample()
 
-    if not result:
+        # Set the observed measurements linked to the correct equipment and method
+        if process.parameters.procedure == 'xspectre-spectra':
+            # The white references are the overall mean of the process, or interpolated by the scan time
+            scan_epoch = Scan_epoch(xspectre_json_D['scandate'] if 'scandate' in xspectre_json_D else None)
 
-        return None
-    
-    # Set the sampling log parameters
-    json_db_C._Set_sampling_log()
+            if scan_epoch is None and json_db_C.white_reference_interpolation == 'time':
+
+                print (' ⚠️ WARNING - no valid scandate, using the overall white reference: %s' %(path.split(json_FPN)[1]))
+
+            json_db_C._Get_spectra_white_reference(scan_epoch)
 
-    # Set sample id
-    json_db_C._Set_sample_id()
+            json_db_C._Set_spectra_record(xspectre_json_D)
+
+            json_db_C._Calculate_spectra_reflectance()
     
-    # ===== Set the DB output objects =====
+            json_db_C._Get_xspectre_spectra_measurements(xspectre_json_D)
 
-    # Set the db object point
-    json_db_C._Set_point()
+        else:
 
-    # Set the db object site
-    json_db_C._Set_site()
+            json_db_C._Get_observation_measurements_xspectre()
 
-    # Set the db object data_soruce (= pilot for AI4SH)
-    json_db_C._Set_data_source()
+        # ===== Assemble and write the complete DB record =====
 
-    # Set the observation metadata
-    result = json_db_C._Set_observation_metadata()
-    
-    if not result:
+        # Assemble the complete sample event in AI4SH format 
+        sample_event_ai4sh = json_db_C._Assemble_sample_event_AI4SH_xspectre()
 
-        return None
-    
-    # Set the sample parameters
-    json_db_C._Set_sample()
+        if sample_event_ai4sh:
 
-    # Set the observed measurements linked to the correct equipment and method
-    if process.parameters.procedure == 'xspectre-spectra':
-        #TGTODO Because there is no timestamp I can can resolve whihc whiteref to use for each sample
-        #instead I use all whiteref from each sampling log, must be updated
-        #json_db_C._Get_spectra_white_reference(path.getctime(json_FPN), white_reference_D)
+            # Dump the complete sample event to a JSON file
+            json_db_C._Dump_sample_json(sample_event_ai4sh, 'ai4sh')
 
-        json_db_C._Set_spectra_record(xspectre_json_D)
+        else:
 
-        json_db_C._Calculate_spectra_reflectance()
+            print('❌ Error creating AI4SH JSON post from xspectre data')
     
-        json_db_C._Get_xspectre_spectra_measurements(xspectre_json_D)
+        # Assemble the complete sample event in xspectre format
+        sample_event_xspectre = json_db_C._Assemble_sample_event_xspectre_xspectre()
 
-    else:
+        if sample_event_xspectre:
 
-        json_db_C._Get_observation_measurements_xspectre()
+            # Dump the complete sample event to a JSON file
+            json_db_C._Dump_sample_json(sample_event_xspectre, 'xspectre')
 
-    # ===== Assemble and write the complete DB record =====
+        else:
 
-    # Assemble the complete sample event in AI4SH format 
-    sample_event_ai4sh = json_db_C._Assemble_sample_event_AI4SH_xspectre()
+            print('❌ Error creating xspectre JSON post from xspectre data')
 
-    if sample_event_ai4sh:
+        if process.parameters.procedure == 'xspectre-penetrometer':
 
-        # Dump the complete sample event to a JSON file
-        json_db_C._Dump_sample_json(sample_event_ai4sh, 'ai4sh')
+            pass
+            '''# Write the position date file
+            json_db_C._Xspectre_sample_dates(json_FPN)
 
-    else:
+            position_date_name = '%s-%s' %(json_db_C.record_D['position_date']['position_name'],json_db_C.record_D['position_date']['sample_date'])
 
-        print('❌ Error creating AI4SH JSON post from xspectre data')
-    
-    # Assemble the complete sample event in xspectre format
-    sample_event_xspectre = json_db_C._Assemble_sample_event_xspectre_xspectre()
+            if not position_date_name in position_date_str_L:
 
-    if sample_event_xspectre:
+                position_date_str_L.append(position_date_name)
 
-        # Dump the complete sample event to a JSON file
-        json_db_C._Dump_sample_json(sample_event_xspectre, 'xspectre')
+                items = list(json_db_C.record_D['position_date'].values())
 
-    else:
+                items_str = ",".join(items)
 
-        print('❌ Error creating xspectre JSON post from xspectre data')
+                position_date_F.write(items_str + "\n")
 
-    if process.parameters.procedure == 'xspectre-penetrometer':
+            '''
 
-        pass
-        '''# Write the position date file
-        json_db_C._Xspectre_sample_dates(json_FPN)
+        return True
+    
+def Extract_xspectre_json_v089(project_FP, process, json_FPN, white_reference_C, coordinate_C, json_sink_C=None, spectra_store_C=None):
+    """
+    @brief Processes CSV data records and exports them to hierarchical JSON format for AI4SH in-situ data management.
 
-        position_date_name = '%s-%s' %(json_db_C.record_D['position_date']['position_name'],json_db_C.record_D['position_date']['sample_date'])
+    @details
+    This function orchestrates the conversion of CSV data rows into structured JSON sample events. 
+    It initializes the json_db class, sets up output folders, cleans column headers, distills parameter dictionaries, 
+    checks consistency, and loops through each data record to assemble and export sample events.
 
-        if not position_date_name in position_date_str_L:
+    - Initializes the json_db class with process parameters.
+    - Sets up the destination folder for JSON output.
+    - Cleans and normalizes column headers.
+    - Distills parameter, method, equipment, and unit dictionaries.
+    - Checks consistency among method, equipment, and unit mappings.
+    - Adds compulsory parameters with default values if missing.
+    - Loops through each data record:
+        - Initializes equipment-method mapping.
+        - Converts row data to dictionary.
+        - Ensures all compulsory parameters are set.
+        - Extracts and processes observation measurements.
+        - Sets unique identifiers for pilot, site, point, and sample.
+        - Sets observation metadata, sample, and sampling log.
+        - Assembles the sample event and exports to JSON.
 
-            position_date_str_L.append(position_date_name)
+    @param process Object containing process parameters, expected to have a 'parameters' attribute.
+    @param column_L List of column header strings from the CSV file.
+    @param data_L_L List of lists, each representing a row of data from the CSV file.
+    @param all_parameter_D Dictionary mapping column headers to parameter names.
+    @param unit_D Dictionary mapping column headers to unit names.
+    @param method_D Dictionary mapping column headers to method names.
+    @param equipment_D Dictionary mapping column headers to equipment names.
+    @param std_row (Optional) Standard deviation row or index, if available.
+    @param white_reference_C white_reference_calibration of the process (spectra only, otherwise None).
+    @param coordinate_C coordinate_store of the point name, position and sample date file.
+    @param json_sink_C (Optional) json sink shared by all files in the process, defaults to one json file per sample event.
+    @param spectra_store_C (Optional) binary spectra store shared by all files in the process, defaults to spectra embedded in the json.
 
-            items = list(json_db_C.record_D['position_date'].values())
+    @return None if any error occurs during processing, otherwise creates JSON files for each sample event.
 
-            items_str = ",".join(items)
+    @see xspectre_extractor, create the extractor once to extract several files of a process.
+    """
 
-            position_date_F.write(items_str + "\n")
+    extractor_C = xspectre_extractor(project_FP, process, white_reference_C, coordinate_C, json_sink_C, spectra_store_C)
 
-        '''
+    return extractor_C._Extract(json_FPN)
     
 def Extract_white_reference_json_v089(project_FP, process, json_FPN):
     """
@@ -1874,8 +1514,6 @@ def Extract_white_reference_json_v089(project_FP, process, json_FPN):
     @return None if any error occurs during processing, otherwise creates JSON files for each sample event.
     """
 
-    from src.utils import Read_json
-
     # Initiate the json_db class
     json_db_C = json_db(project_FP,process, False)
 
@@ -1900,6 +1538,9 @@ def Extract_white_reference_json_v089(project_FP, process, json_FPN):
     if not result:
 
         return None
+
+    # The scan time of the white reference, for the time index of the calibration
+    json_db_C.record_D['scan_epoch'] = Scan_epoch(xspectre_json_D['scandate'] if 'scandate' in xspectre_json_D else None)
     
     return json_db_C.record_D
 
@@ -1917,13 +1558,9 @@ def Calculate_white_reference_statistics(white_reference_value_L,
     from multiple white reference scans.
 
     @param white_reference_dark_L List of arrays, each representing dark values from a white reference scan.
-    @return None. Prints the calculated standard deviation array.
+    @return Tuple (value mean, value standard deviation, dark mean, dark standard deviation, maximum value) arrays.
     """
 
-    global overall_white_reference_value_mean_A, overall_white_reference_value_standard_deviation_A
-    global overall_white_reference_dark_mean_A, overall_white_reference_dark_standard_deviation_A
-    global white_reference_max_A
-
     white_reference_value_n_scans_A = np.array(white_reference_value_n_scans_L)
     white_reference_value_standard_deviation_A = np.array(white_reference_value_standard_deviation_L)
     white_reference_value_A = np.array(white_reference_value_L)
@@ -1976,6 +1613,10 @@ def Calculate_white_reference_statistics(white_reference_value_L,
 
     #print ('Overall white reference value mean:', overall_white_reference_value_mean_A)
 
+    return (overall_white_reference_value_mean_A, overall_white_reference_value_standard_deviation_A,
+            overall_white_reference_dark_mean_A, overall_white_reference_dark_standard_deviation_A,
+            white_reference_max_A)
+
 def Get_all_white_reference_data(project_FP, process, json_FPN_L):
     """
     @brief Calculates the standard deviation of white reference dark values.
@@ -1984,14 +1625,37 @@ def Get_all_white_reference_data(project_FP, process, json_FPN_L):
     and prints the resulting standard deviation array. It is used to assess the variability in dark measurements
     from multiple white reference scans.
 
+    With the optional process parameter <white_reference_cache> the calibration is read from (and written to)
+    a cache file in the data source folder, keyed by the digests of the white reference files, see
+    White_reference_key. The white reference files are then only extracted if any of them has changed.
+
     @param white_reference_dark_L List of arrays, each representing dark values from a white reference scan.
-    @return None. Prints the calculated standard deviation array.
+    @return The white_reference_calibration of the process.
     """
 
-    global white_reference_FN_L
+    cache_FPN = Set_white_reference_cache(process)
+
+    if cache_FPN:
+
+        # White reference name (path relative to the data source folder) -> full path
+        white_reference_FPN_D = {path.relpath(json_FPN, process.parameters.data_src_FP): json_FPN for json_FPN in json_FPN_L
+                                 if path.split(json_FPN)[1].startswith('whiteref')}
+
+        key = White_reference_key(white_reference_FPN_D)
+
+        white_reference_C = Read_white_reference_cache(cache_FPN, key)
+
+        if white_reference_C:
+
+            if process.verbose:
+
+                print('Whiteref calibration read from cache:', cache_FPN)
+
+            return white_reference_C
 
     white_reference_FN_L = []
 
+    # Scan time -> white reference records, for the time index
     white_reference_D = {}
 
     white_reference_value_L = []
@@ -2035,18 +1699,102 @@ def Get_all_white_reference_data(project_FP, process, json_FPN_L):
 
                 white_reference_dark_n_scans_L.append( white_reference['n_dark_repeats'])
 
-                white_reference_D[path.getctime(json_FPN)] = white_reference
+                if white_reference['scan_epoch'] is not None:
+
+                    white_reference_D.setdefault(white_reference['scan_epoch'], []).append(white_reference)
 
-    Calculate_white_reference_statistics(white_reference_value_L, 
+    statistics_A_L = Calculate_white_reference_statistics(white_reference_value_L, 
                                             white_reference_value_standard_deviation_L, 
                                             white_reference_value_n_scans_L,
                                             white_reference_dark_L,
                                             white_reference_dark_standard_deviation_L,
                                             white_reference_dark_n_scans_L)
     
-    return white_reference_D
+    white_reference_C = white_reference_calibration(*statistics_A_L, white_reference_FN_L, white_reference_D)
+
+    if cache_FPN:
+
+        Write_white_reference_cache(cache_FPN, key, white_reference_C)
+
+    return white_reference_C
+
+class json_file_batch:
+    """
+    @class json_file_batch
+    @brief Holds the state shared by the xspectre json files of a process, passed to Loop_xspectre_json_files.
+
+    @details
+    The white reference calibration and the coordinate store are read-only and are sent to the worker processes
+    (see Loop_csv_rows), each worker gets its own json sink. The xspectre_extractor is created at the first file
+    looped by the process (or worker).
+    """
+
+    def __init__(self, white_reference_C, coordinate_C, json_sink_C, spectra_store_C=None, manifest_C=None):
+        """
+        @brief Constructor for the json_file_batch class.
+
+        @param white_reference_C white_reference_calibration of the process (spectra only, otherwise None).
+        @param coordinate_C coordinate_store of the point name, position and sample date file.
+        @param json_sink_C json sink shared by all files in the process.
+        @param spectra_store_C (Optional) binary spectra store shared by all files in the process.
+        @param manifest_C (Optional) build manifest of incremental runs.
+
+        @return None
+        """
 
-def Process_xspectre_json_v089(project_FP, process):
+        self.white_reference_C = white_reference_C
+
+        self.coordinate_C = coordinate_C
+
+        self.json_sink_C = json_sink_C
+
+        self.spectra_store_C = spectra_store_C
+
+        self.manifest_C = manifest_C
+
+        self.extractor_C = None
+
+def Loop_xspectre_json_files(project_FP, process, file_batch_C, json_FPN_L):
+    """
+    @brief Extracts a list of xspectre json data files, see xspectre_extractor.
+
+    @details
+    In incremental runs files that are unchanged since the previous run are skipped, and files that fail are
+    reprocessed in the next run. A failing file does not stop the loop.
+
+    @param project_FP The project folder path.
+    @param process An object containing process parameters.
+    @param file_batch_C The json_file_batch of the process.
+    @param json_FPN_L List of json data files (without white references).
+
+    @return True
+    """
+
+    manifest_C = file_batch_C.manifest_C
+
+    if file_batch_C.extractor_C is None:
+
+        file_batch_C.extractor_C = xspectre_extractor(project_FP, process, file_batch_C.white_reference_C, file_batch_C.coordinate_C,
+                                                      file_batch_C.json_sink_C, file_batch_C.spectra_store_C)
+
+    for json_FPN in json_FPN_L:
+
+        # Skip files that are unchanged since the previous run
+        if manifest_C and manifest_C._Check_source_unchanged(json_FPN):
+
+            continue
+
+        print('Processing:', json_FPN)
+        
+        success = file_batch_C.extractor_C._Extract(json_FPN)
+
+        if not success and manifest_C:
+
+            manifest_C._Discard_source()
+
+    return True
+
+def Process_xspectre_json_v089(project_FP, process, job_cache_C=None):
     """
     @brief Imports and processes xspectre JSON data v089 file for AI4SH.
 
@@ -2054,13 +1802,10 @@ def Process_xspectre_json_v089(project_FP, process):
     extracts relevant parameters, and calls a function to process each data record.
 
     @param process An object containing parameters and file paths for method and data CSV files.
+    @param job_cache_C (Optional) job_cache shared by the processes of the run.
     @return None. Prints error messages if files or parameters are invalid.
     """
 
-    global position_date_F, position_date_str_L
-
-    position_date_str_L = []
-
     from src.utils import Os_walk
 
     ''' The following commands are for creating the csv file for locations, settings, sample dates and coordinates
@@ -2075,16 +1820,44 @@ def Process_xspectre_json_v089(project_FP, process):
     '''
     json_FPN_L = Os_walk(process.parameters.data_src_FP, '.json')
 
-    white_reference_D = None
+    # Match the names of all data files against the file name grammar of the site and procedure
+    grammar_C = Set_file_name_grammar(process.parameters.pilot_site, process.parameters.procedure)
+
+    if grammar_C is None:
+
+        print('❌  ERROR - pilot site observation not recognised: %s, %s' % (process.parameters.pilot_site, process.parameters.procedure))
+
+        return None
+
+    data_FPN_L, no_match_FPN_L = grammar_C._Match([json_FPN for json_FPN in json_FPN_L if not path.split(json_FPN)[1].startswith('whiteref')])
+
+    if no_match_FPN_L:
+
+        print (' ⚠️ WARNING - %s of %s json file names do not match the file names of %s, %s (skipped):' %(len(no_match_FPN_L),
+                                    len(no_match_FPN_L) + len(data_FPN_L), process.parameters.pilot_site, process.parameters.procedure))
+
+        for json_FPN in no_match_FPN_L:
+
+            print ('    %s' %(json_FPN))
+
+    white_reference_C = None
     
     #if 'spectra' in project_FP:
     if process.parameters.procedure == 'xspectre-spectra':
 
-        white_reference_D = Get_all_white_reference_data(project_FP, process, json_FPN_L)
+        white_reference_C = Get_all_white_reference_data(project_FP, process, json_FPN_L)
+
+        parameters_D = process.parameters.__dict__
+
+        if white_reference_C and 'white_reference_interpolation' in parameters_D and parameters_D['white_reference_interpolation'] == 'time' \
+                and white_reference_C._Day_resolution():
 
-    coordinate_D = Coordinates_fix(project_FP,process.parameters.point_name_position_sampledate_FPN)
+            print (' ⚠️ WARNING - the scandate of the white references has no time of day, the white references are interpolated at day resolution')
 
-    if not coordinate_D:
+    # Coordinate store of the point name, position and sample date file, shared by the processes of the job
+    coordinate_C = Set_coordinate_store(project_FP, process, job_cache_C)
+
+    if not coordinate_C:
 
         print ('❌  ERROR - reading the location, setting, sample date and coordinate csv file failed.')
 
@@ -2092,16 +1865,32 @@ def Process_xspectre_json_v089(project_FP, process):
 
         return None
 
-    for json_FPN in json_FPN_L:
+    # A single sink receives the sample events from all the json files
+    json_sink_C = json_sink(process)
 
-        FN = path.split(json_FPN)[1]
+    # Set the binary store for the spectra (only if spectra_store is set)
+    spectra_store_C = Set_spectra_store(project_FP, process)
 
-        if FN.startswith('whiteref'):
+    # Set the manifest of sources and outputs (only in incremental mode), the white references are dependencies
+    dependency_FPN_L = [process.parameters.point_name_position_sampledate_FPN]
 
-            continue
+    dependency_FPN_L.extend([json_FPN for json_FPN in json_FPN_L if path.split(json_FPN)[1].startswith('whiteref')])
+
+    manifest_C = Set_build_manifest(project_FP, process, json_sink_C, process.parameters.data_src_FP, dependency_FPN_L)
+
+    file_batch_C = json_file_batch(white_reference_C, coordinate_C, json_sink_C, spectra_store_C, manifest_C)
+
+    result = None
+
+    try:
+
+        # Loop the json files, serially or across a pool of worker processes (optional parameter <workers>)
+        result = Loop_csv_rows(project_FP, process, file_batch_C, data_FPN_L, Loop_xspectre_json_files, XSPECTRE_FILE_SHARD_SIZE)
+
+    finally:
+
+        # Close the outputs, also when the loop stopped on an error
+        Close_outputs(file_batch_C, result)
 
-        print('Processing:', json_FPN)
-        
-        Extract_xspectre_json_v089(project_FP, process, json_FPN, white_reference_D, coordinate_D)
 
     # position_date_F.close()
\ No newline at end of file
@@ -22,9 +22,9 @@ from .setDiskPath import SetDiskPath
 
 from .pretty_print import Pprint_parameter
 
-from .json_read_write import Read_json, Dump_json
+from .json_read_write import Read_json, Dump_json, Encode_json, Write_json_text, NUMERIC_LIST_MIN_LENGTH
 
-from .csv_read_write import Read_csv, Read_csv_excel, Write_txt_L, Write_csv_header_data
+from .csv_read_write import Read_csv, Read_csv_chunks, Read_csv_mmap_chunks, Read_csv_excel, Csv_row_bytes, csv_numeric_row, Write_txt_L, Write_csv_header_data
 
 from .project_pilot import Project_pilot_locate, Root_locate, Project_locate, Get_project_path, Job_pilot_locate, Full_path_locate
 
@@ -6,10 +6,23 @@ Created on 4 Jan 2024
 
 # Standard library imports
 
+import codecs
+
 import csv  
 
+import mmap
+
+import warnings
+
+from io import StringIO
+
+from itertools import islice
+
 from os import path
 
+# Third party imports
+import numpy as np
+
 def Read_csv(FPN, mode = 'r'):
 
     """
@@ -40,6 +53,256 @@ def Read_csv(FPN, mode = 'r'):
 
     return (column_L, data_L_L)
 
+def Read_csv_chunks(FPN, chunk_size=1000, mode = 'r'):
+
+    """
+    @brief Reads the header of a CSV file and returns a generator yielding the data rows in chunks.
+
+    @details
+    Only one chunk of rows is held in memory at a time. The header is read when called; the file is then
+    opened again by the generator at the first chunk and closed when the generator is exhausted, closed or
+    discarded.
+
+    @param FPN Full path name to the CSV file.
+    @param chunk_size Number of rows in each chunk.
+    @param mode File open mode (default is 'r').
+    @return tuple (column_L, chunk_iter):
+        column_L: List of column headers.
+        chunk_iter: Generator yielding lists of rows, each row is a list of values.
+        Returns None if file does not exist.
+    """
+
+    if not path.exists(FPN):
+        
+        msg = 'WARNING - csv file not found:\n     %s' %(FPN)
+
+        print (msg)
+        
+        return None
+
+    with open(FPN, mode) as csv_file:
+
+        column_L = next(csv.reader(csv_file))
+
+    def Chunks():
+
+        csv_file = open(FPN, mode)
+
+        try:
+
+            csvreader = csv.reader(csv_file)
+
+            # Skip the header
+            next(csvreader)
+
+            while True:
+
+                data_L_L = list(islice(csvreader, chunk_size))
+
+                if not data_L_L:
+
+                    break
+
+                yield data_L_L
+
+        finally:
+
+            csv_file.close()
+
+    return (column_L, Chunks())
+
+class csv_numeric_row(list):
+    """
+    @brief A csv row read by Read_csv_mmap_chunks with the numeric cells parsed directly from the mapped file.
+
+    @details
+    The list holds only the (str) cells before the first numeric column. The numeric cells are not decoded,
+    they are parsed to the float64 array numeric_A (a row view of the matrix of the chunk). row_bytes holds the
+    line (utf-8, without line break) for the row digest of the build manifest.
+    """
+
+    def __init__(self, cell_L, numeric_A, row_bytes):
+
+        list.__init__(self, cell_L)
+
+        self.numeric_A = numeric_A
+
+        self.row_bytes = row_bytes
+
+def Csv_row_bytes(data_row):
+    """
+    @brief Returns the cells of a csv row joined with the unit separator, as utf-8 bytes.
+
+    @details
+    The text is the same for a row read by the csv module and a csv_numeric_row of the same line.
+
+    @param data_row List of the values in the csv row, or a csv_numeric_row.
+    @return bytes.
+    """
+
+    if isinstance(data_row, csv_numeric_row):
+
+        return data_row.row_bytes.replace(b',', b'\x1f')
+
+    return '\x1f'.join(data_row).encode('utf-8')
+
+def Read_csv_mmap_chunks(FPN, chunk_size=1000, encoding='utf-8', numeric_first_column=None):
+
+    """
+    @brief Memory maps a CSV file and returns its header and a generator yielding the data rows in chunks.
+
+    @details
+    The file is not read through a text buffer: the row boundaries of each chunk are located in the mapped
+    file and only the bytes of the current chunk are copied. Chunks without quote characters are split
+    directly on line breaks and commas, chunks with quotes are decoded and parsed with the csv module. A chunk
+    is extended to the next line break if it ends inside a quoted value spanning several lines.
+
+    With numeric_first_column (the spectral block of the NeoSpectra and FOSS DS2500 exports), the cells from
+    this column to the end of the row are not decoded to str: the numeric bytes of all rows of a chunk without
+    quotes are joined and parsed by numpy in one operation (numpy.fromstring), and the rows are yielded as
+    csv_numeric_row. A chunk with a row with a different number of numeric cells than the first row, or with
+    cells that are not numbers, is yielded as lists of str as without numeric_first_column.
+
+    @param FPN Full path name to the CSV file.
+    @param chunk_size Number of rows in each chunk.
+    @param encoding Text encoding of the file.
+    @param numeric_first_column Optional index of the first of the numeric columns that end each row.
+    @return tuple (column_L, chunk_iter):
+        column_L: List of column headers.
+        chunk_iter: Generator yielding lists of rows, each row is a list of values (or a csv_numeric_row).
+        Returns None if file does not exist or is empty.
+    """
+
+    if not path.exists(FPN) or path.getsize(FPN) == 0:
+        
+        msg = 'WARNING - csv file not found or empty:\n     %s' %(FPN)
+
+        print (msg)
+        
+        return None
+
+    with open(FPN, 'rb') as csv_file:
+
+        mapped_file = mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    utf8 = codecs.lookup(encoding).name == 'utf-8'
+
+    def Read_chunk(start, n_rows):
+
+        end = start
+
+        for _ in range(n_rows):
+
+            end = mapped_file.find(b'\n', end) + 1
+
+            if end == 0:
+
+                end = len(mapped_file)
+
+                break
+
+        chunk = mapped_file[start:end]
+
+        # Extend the chunk if it ends inside a quoted value (odd number of quote characters)
+        while chunk.count(b'"') % 2 and end < len(mapped_file):
+
+            end = mapped_file.find(b'\n', end) + 1 or len(mapped_file)
+
+            chunk = mapped_file[start:end]
+
+        return chunk, end
+
+    def Split_lines(chunk):
+
+        if chunk.endswith(b'\n'):
+
+            chunk = chunk[:-1]
+
+        return [line[:-1] if line.endswith(b'\r') else line for line in chunk.split(b'\n')]
+
+    def Split_row(line):
+
+        text = line.decode(encoding)
+
+        return text.split(',') if text else []
+
+    def Parse_numeric_rows(line_L):
+
+        split_L = [line.split(b',', numeric_first_column) for line in line_L]
+
+        n_cells = numeric_first_column + 1
+
+        if not split_L or any(len(cell_L) != n_cells for cell_L in split_L):
+
+            return None
+
+        n_values = split_L[0][-1].count(b',') + 1
+
+        with warnings.catch_warnings():
+
+            # Cells that are not numbers stop the conversion with a warning, the chunk is then split as text
+            warnings.simplefilter('ignore', DeprecationWarning)
+
+            try:
+
+                numeric_A = np.fromstring(b','.join([cell_L[-1] for cell_L in split_L]), dtype=np.float64, sep=',')
+
+            except ValueError:
+
+                return None
+
+        if numeric_A.size != len(split_L) * n_values:
+
+            return None
+
+        numeric_A = numeric_A.reshape(len(split_L), n_values)
+
+        return [csv_numeric_row([cell.decode(encoding) for cell in cell_L[:-1]], numeric_A[r],
+                                line if utf8 else line.decode(encoding).encode('utf-8'))
+                for r, (line, cell_L) in enumerate(zip(line_L, split_L))]
+
+    def Parse_rows(chunk):
+
+        if b'"' in chunk:
+
+            return list(csv.reader(StringIO(chunk.decode(encoding))))
+
+        line_L = Split_lines(chunk)
+
+        if numeric_first_column is not None:
+
+            row_L = Parse_numeric_rows(line_L)
+
+            if row_L is not None:
+
+                return row_L
+
+        return [Split_row(line) for line in line_L]
+
+    chunk, header_end = Read_chunk(0, 1)
+
+    column_L = list(csv.reader(StringIO(chunk.decode(encoding))))[0]
+
+    def Chunks():
+
+        try:
+
+            start = header_end
+
+            while start < len(mapped_file):
+
+                chunk, end = Read_chunk(start, chunk_size)
+
+                yield Parse_rows(chunk)
+
+                start = end
+
+        finally:
+
+            mapped_file.close()
+
+    return (column_L, Chunks())
+
 def Read_csv_excel(FPN):
 
     """
@@ -8,10 +8,26 @@ Created on 4 Jan 2024
 
 
 
-from os import path
+from os import getpid, path, remove, replace
+
+from math import isfinite
 
 import json
 
+import re
+
+# Default variables
+NUMERIC_LIST_MIN_LENGTH = 4
+
+# Max number of formatted numeric lists kept in an encoding cache, see Encode_json
+NUMERIC_LIST_CACHE_SIZE = 32
+
+NUMERIC_LIST_PLACEHOLDER = '\x00NUM%d'
+
+NUMERIC_LIST_PLACEHOLDER_RE = re.compile(r'"\\u0000NUM(\d+)"')
+
+NON_FINITE_D = {'nan': 'NaN', 'inf': 'Infinity', '-inf': '-Infinity'}
+
 def Read_json(FPN,verbose=0):
     """
     @brief Reads a JSON file and returns its contents as a Python object.
@@ -50,7 +66,7 @@ def Read_json(FPN,verbose=0):
         
     return json_D
     
-def Dump_json(FPN, data, indent=2, verbose=0):
+def Dump_json(FPN, data, indent=2, verbose=0, compact=False, significant_digits=None, atomic=False, skip_unchanged=False):
     """
     @brief Dumps a Python object to a JSON file.
 
@@ -58,24 +74,263 @@ def Dump_json(FPN, data, indent=2, verbose=0):
     @param data The Python object to write to the JSON file.
     @param indent Number of spaces to use for indentation in the output JSON file.
     @param verbose If set to 1, prints status messages during execution. Default is 0.
+    @param compact If True, writes the json without indentation and whitespace, see Encode_json.
+    @param significant_digits If set, number of significant digits for floats in numeric lists, see Encode_json.
+    @param atomic If True, writes to a temporary file that is renamed, see Write_json_text.
+    @param skip_unchanged If True, leaves an existing file with identical content untouched, see Write_json_text.
+    @return The write status ('written', 'changed' or 'skipped') if successful, None otherwise.
     """
     
+    try:
+
+        json_text = Encode_json(data, indent=indent, compact=compact, significant_digits=significant_digits)
+
+    except (TypeError, ValueError):
+
+        msg = '❌ Error writing json file: %s' %(FPN)
+            
+        print (msg)
+            
+        return None
+
+    return Write_json_text(FPN, json_text, verbose, atomic, skip_unchanged)
+
+def Encode_json(data, indent=2, compact=False, significant_digits=None, cache_D=None):
+    """
+    @brief Encodes a Python object to a json string, with a fast path for numeric lists.
+
+    @details
+    Lists (and numpy arrays) of only floats or only integers, typically spectra, are formatted separately
+    and spliced into the json text encoded from the remaining structure. With the default settings the
+    result is identical to json.dumps(data, indent=indent), but the pure Python encoder that json uses
+    when indenting is only applied to the small non-numeric part of the data.
+
+    With a cache dictionary, the formatted numeric lists are kept (with a reference to the list object) and
+    reused when the same list object is encoded again, e.g. the spectra shared by the ai4sh and xspectre
+    formats of a sample event. The lists must not be modified in place once encoded with a cache. The cache
+    is cleared when it holds NUMERIC_LIST_CACHE_SIZE lists.
+
+    @param data The Python object to encode.
+    @param indent Number of spaces to use for indentation, ignored if compact is True.
+    @param compact If True, the json is encoded on a single line without whitespace.
+    @param significant_digits If set, floats in numeric lists are written with this number of significant digits.
+    @param cache_D Optional dictionary caching formatted numeric lists between calls (with the same significant_digits).
+    @return The encoded json string.
+    """
+
+    number_text_L = []
+
+    skeleton = _Replace_numeric_lists(data, number_text_L, significant_digits, cache_D)
+
+    if compact:
+
+        json_text = json.dumps(skeleton, separators=(',', ':'))
+
+        indent = None
+
+        separator = ','
+
+    else:
+
+        json_text = json.dumps(skeleton, indent=indent)
+
+        separator = ', '
+
+    if not number_text_L:
+
+        return json_text
+
+    return _Splice_numeric_lists(json_text, number_text_L, indent, separator)
+
+def _Replace_numeric_lists(data, number_text_L, significant_digits, cache_D=None):
+    """
+    @brief Recursively copies data, replacing numeric lists with placeholders and their formatted values.
+
+    @param data The Python object to copy.
+    @param number_text_L List receiving the formatted values of each numeric list, indexed by the placeholder.
+    @param significant_digits Number of significant digits for floats, or None for full precision.
+    @param cache_D Optional cache of formatted numeric lists, keyed by the id of the list object.
+    @return The copy with placeholders.
+    """
+
+    if isinstance(data, dict):
+
+        return {key: _Replace_numeric_lists(value, number_text_L, significant_digits, cache_D) for key, value in data.items()}
+
+    if cache_D is not None and id(data) in cache_D and cache_D[id(data)][0] is data:
+
+        number_text_L.append(cache_D[id(data)][1])
+
+        return NUMERIC_LIST_PLACEHOLDER % (len(number_text_L)-1)
+
+    original_data = data
+
+    if hasattr(data, 'tolist'):
+
+        # numpy arrays and scalars
+        data = data.tolist()
+
+    if isinstance(data, (list, tuple)):
+
+        text_L = _Format_numeric_list(data, significant_digits)
+
+        if text_L is None:
+
+            return [_Replace_numeric_lists(value, number_text_L, significant_digits, cache_D) for value in data]
+
+        if cache_D is not None:
+
+            if len(cache_D) >= NUMERIC_LIST_CACHE_SIZE:
+
+                cache_D.clear()
+
+            # The list object is kept in the cache, its id can thus not be reused by another object
+            cache_D[id(original_data)] = (original_data, text_L)
+
+        number_text_L.append(text_L)
+
+        return NUMERIC_LIST_PLACEHOLDER % (len(number_text_L)-1)
+
+    return data
+
+def _Format_numeric_list(value_L, significant_digits):
+    """
+    @brief Formats a list of only floats or only integers as json numbers.
+
+    @param value_L The list to format.
+    @param significant_digits Number of significant digits for floats, or None for full precision.
+    @return List of formatted numbers, or None if the list is short or not purely numeric.
+    """
+
+    if len(value_L) < NUMERIC_LIST_MIN_LENGTH:
+
+        return None
+
+    if all(type(value) is float for value in value_L):
+
+        if significant_digits:
+
+            text_L = list(map(('%%.%dg' %(significant_digits)).__mod__, value_L))
+
+            # Keep the values as floats when read back
+            text_L = [text if ('.' in text or 'e' in text or 'n' in text) else text + '.0' for text in text_L]
+
+        else:
+
+            text_L = list(map(float.__repr__, value_L))
+
+        if not isfinite(sum(value_L)):
+
+            text_L = [NON_FINITE_D.get(text, text) for text in text_L]
+
+        return text_L
+
+    if all(type(value) is int for value in value_L):
+
+        return list(map(int.__repr__, value_L))
+
+    return None
+
+def _Splice_numeric_lists(json_text, number_text_L, indent, separator):
+    """
+    @brief Replaces the placeholders in the encoded json with the formatted numeric lists.
+
+    @param json_text The json text with placeholders.
+    @param number_text_L List of formatted values of each numeric list.
+    @param indent Number of spaces used for indentation, or None.
+    @param separator Item separator used when not indenting.
+    @return The complete json string.
+    """
+
+    part_L = []
+
+    position = 0
+
+    for match in NUMERIC_LIST_PLACEHOLDER_RE.finditer(json_text):
+
+        part_L.append(json_text[position:match.start()])
+
+        text_L = number_text_L[int(match.group(1))]
+
+        if indent is None:
+
+            part_L.append('[%s]' %(separator.join(text_L)))
+
+        else:
+
+            line_start = json_text.rfind('\n', 0, match.start()) + 1
+
+            line_pad = ' ' * (len(json_text[line_start:match.start()]) - len(json_text[line_start:match.start()].lstrip(' ')))
+
+            item_pad = line_pad + ' ' * indent
+
+            part_L.append('[\n%s%s\n%s]' %(item_pad, (',\n' + item_pad).join(text_L), line_pad))
+
+        position = match.end()
+
+    part_L.append(json_text[position:])
+
+    return ''.join(part_L)
+
+def Write_json_text(FPN, json_text, verbose=0, atomic=False, skip_unchanged=False):
+    """
+    @brief Writes an already encoded json string to a file.
+
+    @details
+    With atomic set, the json is first written to a temporary file in the same folder that then replaces
+    the destination file, an interrupted write thus never leaves a partially written json file behind.
+    With skip_unchanged set, an existing file with identical content (same size and bytes) is left untouched.
+
+    @param FPN Full path name of the JSON file to write.
+    @param json_text The encoded json string.
+    @param verbose If set to 1, prints status messages during execution. Default is 0.
+    @param atomic If True, writes to a temporary file and renames it to FPN.
+    @param skip_unchanged If True, skips the writing if FPN exists with the identical content.
+    @return 'written' (new file), 'changed' (replaced file), 'skipped' (identical content), or None if the writing failed.
+    """
+
+    json_bytes = json_text.encode('utf-8')
+
+    status = 'written'
+
+    if path.exists(FPN):
+
+        status = 'changed'
+
+        if skip_unchanged and path.getsize(FPN) == len(json_bytes):
+
+            with open(FPN, 'rb') as infile:
+
+                if infile.read() == json_bytes:
+
+                    return 'skipped'
+
     if verbose:
         
         print ('    Writing json file:\n     %s' %(FPN)) 
 
-    with open(FPN, 'w') as outfile:
-        
-        try:
+    dst_FPN = '%s.%s.tmp' %(FPN, getpid()) if atomic else FPN
 
-            json.dump(data, outfile, indent=indent)
+    try:
 
-        except:
+        with open(dst_FPN, 'wb') as outfile:
+
+            outfile.write(json_bytes)
+
+        if atomic:
 
-            msg = '❌ Error writing json file: %s' %(FPN)
+            replace(dst_FPN, FPN)
+
+    except OSError:
+
+        msg = '❌ Error writing json file: %s' %(FPN)
             
-            print (msg)
+        print (msg)
+
+        if atomic and path.exists(dst_FPN):
+
+            remove(dst_FPN)
             
-            return None
+        return None
         
-    return True
\ No newline at end of file
+    return status
@@ -0,0 +1,54 @@
+'''
+Created on 17 October 2026
+
+Tests of the configuration digest of the build manifest
+
+@author: thomasgumbricht
+'''
+
+# Package application imports
+from src.utils import Struct
+
+from src.lib.build_manifest import build_manifest
+
+def Process(dst_FP, spectra_precision_D, **parameters_D):
+    """
+    @brief Returns a process with nested parameters, built as by the job json files.
+    """
+
+    return Struct({'verbose': 0, 'parameters': {'dst_FP': dst_FP, 'incremental': True,
+                                                'spectra_precision': spectra_precision_D, **parameters_D}})
+
+def test_config_digest_nested_parameters(tmp_path):
+
+    dst_FP = str(tmp_path / 'ai4sh' / 'method')
+
+    # Both processes are kept, the nested parameters are thus separate objects
+    process_L = [Process(dst_FP, {'ai4sh': 'float32', 'xspectre': 'int16'}) for i in range(2)]
+
+    digest_L = [build_manifest(str(tmp_path), process, 'data', []).new_D['config_digest'] for process in process_L]
+
+    assert digest_L[0] == digest_L[1]
+
+    other_C = build_manifest(str(tmp_path), Process(dst_FP, {'ai4sh': 'float32', 'xspectre': 'float32'}), 'data', [])
+
+    assert other_C.new_D['config_digest'] != digest_L[0]
+
+
+def test_config_digest_runtime_parameters(tmp_path):
+
+    dst_FP = str(tmp_path / 'ai4sh' / 'method')
+
+    spectra_precision_D = {'ai4sh': 'float32'}
+
+    digest = build_manifest(str(tmp_path), Process(dst_FP, spectra_precision_D), 'data', []).new_D['config_digest']
+
+    runtime_C = build_manifest(str(tmp_path), Process(dst_FP, spectra_precision_D, workers=4, worker_shard_size=500,
+                                                      writer_workers=2, writer_mode='process', writer_queue_size=64,
+                                                      csv_chunk_size=1000, csv_reader='mmap'), 'data', [])
+
+    assert runtime_C.new_D['config_digest'] == digest
+
+    output_C = build_manifest(str(tmp_path), Process(dst_FP, spectra_precision_D, json_output='ndjson'), 'data', [])
+
+    assert output_C.new_D['config_digest'] != digest
@@ -0,0 +1,96 @@
+'''
+Created on 17 October 2026
+
+Tests of the memory mapped csv reader against the csv module reader
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+from itertools import chain
+
+# Third party imports
+import numpy as np
+
+import pytest
+
+# Package application imports
+from src.utils import Read_csv, Read_csv_mmap_chunks, Csv_row_bytes, csv_numeric_row
+
+from src.lib.spectra_block import Spectra_row_blocks
+
+FIRST_COLUMN = 2
+
+def Write_spectra_csv(FPN, line_end='\n'):
+    """
+    @brief Writes a csv file with two metadata columns and 5 spectral columns, with a quoted row and a row that is not a number.
+    """
+
+    rng = np.random.default_rng(7)
+
+    line_L = ['sample,site,' + ','.join(['%s' % (w) for w in range(1350, 1400, 10)])]
+
+    for r in range(23):
+
+        line_L.append('s%s,site-%s,%s' % (r, r % 3, ','.join(['%r' % (v) for v in rng.uniform(0, 100, 5).tolist()])))
+
+    # A quoted metadata cell and a spectral cell that is not a number
+    line_L[9] = '"s8, repeated",site-2,' + line_L[9].split(',', FIRST_COLUMN)[-1]
+
+    line_L[17] = 's16,site-1,0.5,0.25,n/a,0.75,1.0'
+
+    with open(FPN, 'w', newline='') as csv_file:
+
+        csv_file.write(line_end.join(line_L) + line_end)
+
+def Mmap_rows(FPN, chunk_size):
+
+    column_L, chunk_iter = Read_csv_mmap_chunks(FPN, chunk_size, numeric_first_column=FIRST_COLUMN)
+
+    return column_L, list(chain.from_iterable(chunk_iter))
+
+@pytest.mark.parametrize('line_end', ['\n', '\r\n'])
+@pytest.mark.parametrize('chunk_size', [1, 4, 10])
+def test_mmap_spectra_as_csv_reader(tmp_path, line_end, chunk_size):
+
+    FPN = str(tmp_path / 'spectra.csv')
+
+    Write_spectra_csv(FPN, line_end)
+
+    column_L, data_L_L = Read_csv(FPN)
+
+    mmap_column_L, row_L = Mmap_rows(FPN, chunk_size)
+
+    assert mmap_column_L == column_L
+
+    assert len(row_L) == len(data_L_L)
+
+    # The rows of the chunks without quotes or cells that are not numbers are parsed from the mapped file
+    assert any(isinstance(row, csv_numeric_row) for row in row_L)
+
+    for row, data_row in zip(row_L, data_L_L):
+
+        assert list(row) == data_row[:len(row)]
+
+        assert Csv_row_bytes(row) == Csv_row_bytes(data_row)
+
+    for (_, spectra_A, _), (_, mmap_spectra_A, _) in zip(Spectra_row_blocks(data_L_L, FIRST_COLUMN, 'percent', block_size=5),
+                                                         Spectra_row_blocks(row_L, FIRST_COLUMN, 'percent', block_size=5)):
+
+        if spectra_A is None:
+
+            assert mmap_spectra_A is None
+
+        else:
+
+            assert np.array_equal(mmap_spectra_A, spectra_A)
+
+def test_mmap_without_numeric_columns(tmp_path):
+
+    FPN = str(tmp_path / 'spectra.csv')
+
+    Write_spectra_csv(FPN)
+
+    column_L, chunk_iter = Read_csv_mmap_chunks(FPN, 4)
+
+    assert [column_L, list(chain.from_iterable(chunk_iter))] == list(Read_csv(FPN))
@@ -0,0 +1,91 @@
+'''
+Created on 17 October 2026
+
+Tests of the fast json encoder against json.dumps
+
+@author: thomasgumbricht
+'''
+
+# Standard library imports
+import json
+
+# Third party imports
+import numpy as np
+
+import pytest
+
+# Package application imports
+from src.utils import Encode_json
+
+def Sample_event():
+    """
+    @brief Returns a sample event like document with short and long, flat and nested numeric lists.
+    """
+
+    rng = np.random.default_rng(3)
+
+    return {'id': 'se-sear-001', 'name': 'Sörby åker', 'empty_L': [], 'empty_D': {}, 'flag_L': [True, False, True, False],
+            'short_L': [1.5, 2.5], 'int_L': list(range(-3, 9)), 'big_int_L': [2**63, -2**40, 0, 7],
+            'float_L': rng.uniform(-1, 1, 12).tolist(), 'tuple': (0.1, 0.2, 0.3, 0.4, 0.5),
+            'mixed_L': [1, 2.0, 3, 4.5], 'string_L': ['a', 'b', 'c', 'd'],
+            'non_finite_L': [0.25, float('nan'), float('inf'), -float('inf'), -0.0],
+            'nested_L': [[0.5, 1.5, 2.5, 3.5], [4, 5, 6, 7], [[1e-12, 2e20, 3.0, 4.0]], {'x_L': [1.0, 2.0, 3.0, 4.0]}],
+            'record_L': [{'value': [0.1, 0.2, 0.3, 0.4], 'unit': 'reflectance'} for i in range(3)]}
+
+def Numpy_event():
+    """
+    @brief Returns a document with numpy arrays and the same document with the arrays as lists.
+    """
+
+    rng = np.random.default_rng(5)
+
+    array_D = {'float64_A': rng.uniform(0, 1, 16), 'float32_A': rng.uniform(0, 1, 16).astype(np.float32),
+               'int16_A': rng.integers(-32768, 32767, 16, dtype=np.int16), 'matrix_A': rng.uniform(0, 1, (3, 5)),
+               'short_A': np.array([1.0, 2.0]), 'scalar': np.float64(0.125)}
+
+    return array_D, {key: value.tolist() for key, value in array_D.items()}
+
+@pytest.mark.parametrize('indent', [2, None, 4, 0])
+def test_encode_json_indent(indent):
+
+    data = Sample_event()
+
+    assert Encode_json(data, indent=indent) == json.dumps(data, indent=indent)
+
+def test_encode_json_compact():
+
+    data = Sample_event()
+
+    assert Encode_json(data, compact=True) == json.dumps(data, separators=(',', ':'))
+
+@pytest.mark.parametrize('indent', [2, None, 4])
+def test_encode_json_numpy(indent):
+
+    array_D, list_D = Numpy_event()
+
+    assert Encode_json(array_D, indent=indent) == json.dumps(list_D, indent=indent)
+
+    assert Encode_json(array_D, compact=True) == json.dumps(list_D, separators=(',', ':'))
+
+def test_encode_json_cache():
+
+    data = Sample_event()
+
+    # The ai4sh and xspectre formats of a sample event share the spectra list
+    data['xspectre'] = {'float_L': data['float_L']}
+
+    cache_D = {}
+
+    expected = json.dumps(data, indent=2)
+
+    assert Encode_json(data, cache_D=cache_D) == expected
+
+    assert Encode_json(data, cache_D=cache_D) == expected
+
+def test_encode_json_top_level_list():
+
+    data = [0.5, 1.5, 2.5, 3.5, float('nan')]
+
+    assert Encode_json(data) == json.dumps(data, indent=2)
+
+    assert Encode_json(data, compact=True) == json.dumps(data, separators=(',', ':'))
@@ -0,0 +1,131 @@
+'''
+Created on 17 October 2026
+
+Tests of the output precision policy for spectral arrays
+
+@author: thomasgumbricht
+'''
+
+# Third party imports
+import numpy as np
+
+# Package application imports
+from src.utils import Struct
+
+from src.lib.common import common_json_db
+
+from src.lib.spectra_block import Spectra_row_blocks
+
+from src.lib.spectra_2_OSSL import Get_spectra_resampler
+
+from src.lib.spectra_precision import Spectra_precision_policy, Quantize_spectra, Dequantize_spectra, INT16_MISSING_VALUE
+
+def Reflectance_A():
+    """
+    @brief Returns reflectance like test spectra in the range 0 to 1.
+    """
+
+    return np.random.default_rng(1).uniform(0, 1, 2048)
+
+def test_float32_round_trip():
+
+    value_A = Reflectance_A()
+
+    quantized_A, encoding_D = Quantize_spectra(value_A, Spectra_precision_policy('float32', 'reflectance_value'))
+
+    assert quantized_A.dtype == np.float32
+
+    assert encoding_D['dtype'] == 'float32'
+
+    assert np.max(np.abs(Dequantize_spectra(quantized_A, encoding_D) - value_A)) <= encoding_D['max_abs_error']
+
+    # Spectra already cast to float32 when parsed get the same error bound
+    assert Quantize_spectra(quantized_A, Spectra_precision_policy('float32', 'reflectance_value'))[1] == encoding_D
+
+def test_int16_round_trip():
+
+    value_A = Reflectance_A()
+
+    for policy in ['int16', {'dtype': 'int16', 'scale': 0.001, 'offset': -1}]:
+
+        policy_D = Spectra_precision_policy(policy, 'reflectance_value')
+
+        quantized_A, encoding_D = Quantize_spectra(value_A, policy_D)
+
+        assert quantized_A.dtype == np.int16
+
+        assert encoding_D['max_abs_error'] == policy_D['scale'] / 2
+
+        # Tolerance for the floating point rounding of the scaling
+        assert np.max(np.abs(Dequantize_spectra(quantized_A, encoding_D) - value_A)) <= encoding_D['max_abs_error'] + 1e-12
+
+def test_int16_missing_values():
+
+    value_A = np.array([0.5, np.nan, 0.25, 10.0])
+
+    quantized_A, encoding_D = Quantize_spectra(value_A, Spectra_precision_policy('int16', 'reflectance_value'))
+
+    # NaN and out of range values are stored as the missing value and restored as NaN
+    assert quantized_A.tolist() == [5000, INT16_MISSING_VALUE, 2500, INT16_MISSING_VALUE]
+
+    restored_A = Dequantize_spectra(quantized_A, encoding_D)
+
+    assert np.isnan(restored_A[[1, 3]]).all()
+
+    assert np.allclose(restored_A[[0, 2]], [0.5, 0.25])
+
+def test_float32_missing_values():
+
+    quantized_A, encoding_D = Quantize_spectra([0.5, np.nan], Spectra_precision_policy('float32', 'reflectance_value'))
+
+    assert np.isnan(Dequantize_spectra(quantized_A, encoding_D)[1])
+
+def test_encoding_written_with_values():
+
+    spectra_precision_D = {'reflectance_value': {'dtype': 'int16', 'scale': 0.001, 'offset': -1}, 'default': 'float32'}
+
+    process = Struct({'verbose': 0, 'parameters': {'spectra_precision': spectra_precision_D}})
+
+    json_db_C = common_json_db('.', process, None)
+
+    value_A = Reflectance_A()
+
+    stored_D = json_db_C._Store_array('reflectance_value', value_A)
+
+    assert stored_D['encoding'] == {'dtype': 'int16', 'scale': 0.001, 'offset': -1.0,
+                                    'missing_value': INT16_MISSING_VALUE, 'max_abs_error': 0.0005}
+
+    assert np.max(np.abs(Dequantize_spectra(stored_D['values'], stored_D['encoding']) - value_A)) <= 0.0005 + 1e-12
+
+    # float32 values are embedded with their encoding, the list restores the float32 values exactly
+    stored_D = json_db_C._Store_array('spectra_value', value_A)
+
+    assert stored_D['encoding']['dtype'] == 'float32'
+
+    assert np.array_equal(np.array(stored_D['values'], dtype=np.float32), value_A.astype(np.float32))
+
+def test_float32_cast_when_parsed():
+
+    process = Struct({'verbose': 0, 'parameters': {'spectra_precision': {'spectra_value': 'float32'}}})
+
+    json_db_C = common_json_db('.', process, None)
+
+    wavelength_L = list(range(1100, 1120, 2))
+
+    data_L_L = [['sample_%s' %(r)] + ['%.6f' %(value) for value in np.random.default_rng(r).uniform(0, 1, len(wavelength_L))] for r in range(5)]
+
+    resampler_C = Get_spectra_resampler(wavelength_L, 1100, 1118, 1, False)
+
+    for dataset, dtype in [('spectra_value', np.float32), ('reflectance_value', np.float64)]:
+
+        for data_row, spectra_A, resampled_A in Spectra_row_blocks(data_L_L, 1, 'absorbance_ln', block_size=2, resampler_C=resampler_C,
+                                                                   dtype=json_db_C._Spectra_parse_dtype(dataset)):
+
+            reflectance_A = 1 / np.exp(np.array(data_row[1:], dtype=np.float64))
+
+            assert spectra_A.dtype == dtype
+
+            assert np.array_equal(spectra_A, reflectance_A.astype(dtype))
+
+            # The resampling is done in float64, before the cast
+            assert np.array_equal(resampled_A, resampler_C._Resample(reflectance_A))